@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark process-pool offload of parsing and serialization
+
+Serves a large synthetic comment thread from a local stub and renders it
+from several threads at once, the way the MCP server does, with offload
+off and on. Small requests run alongside to show how much the big ones
+stall the rest of the process.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.reddit_tools import RedditTools
+
+
+def make_thread(comments: int, replies: int) -> bytes:
+    """Build a raw comments page with `comments` top-level comments"""
+    def comment(cid: str, depth: int) -> dict:
+        children = [comment(f"{cid}_{i}", depth + 1) for i in range(replies)] if depth < 3 else []
+        return {"kind": "t1", "data": {
+            "id": cid, "author": f"user{cid}", "body": "lorem ipsum dolor sit amet " * 8,
+            "score": 1, "created_utc": 1700000000, "parent_id": "t3_post",
+            "replies": {"data": {"children": children}} if children else ""
+        }}
+
+    post = {"kind": "t3", "data": {"id": "post", "title": "Big thread", "author": "op",
+                                    "subreddit": "bench", "score": 1, "num_comments": comments,
+                                    "created_utc": 1700000000, "url": "", "permalink": "/r/bench/post"}}
+    return json.dumps([
+        {"data": {"children": [post]}},
+        {"data": {"children": [comment(str(i), 0) for i in range(comments)]}}
+    ]).encode()
+
+
+def start_stub(big: bytes) -> ThreadingHTTPServer:
+    small = json.dumps({"kind": "t5", "data": {"display_name": "bench", "subscribers": 1}}).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = small if "about.json" in self.path else big
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(base_url: str, offload_threshold, threads: int, calls: int):
+    tools = RedditTools(cache_ttl=0, requests_per_minute=10 ** 6, burst=10 ** 6,
+                        max_connections=threads + 1, offload_threshold=offload_threshold)
+    tools.base_url = base_url
+    # Warm the process pool so worker start-up isn't measured
+    with tools.rendering(indent=2):
+        tools.get_post_with_comments("bench", "post")
+
+    small_latencies = []
+    done = threading.Event()
+
+    def heavy():
+        with tools.rendering(indent=2):
+            for _ in range(calls):
+                tools.get_post_with_comments("bench", "post")
+
+    def light():
+        with tools.rendering(indent=2):
+            while not done.is_set():
+                started = time.perf_counter()
+                tools.get_subreddit_about("bench")
+                small_latencies.append(time.perf_counter() - started)
+
+    workers = [threading.Thread(target=heavy) for _ in range(threads)]
+    prober = threading.Thread(target=light)
+    started = time.perf_counter()
+    prober.start()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    prober.join()
+    tools.close()
+
+    small_latencies.sort()
+    return {
+        "big_per_sec": threads * calls / elapsed,
+        "small_p50_ms": statistics.median(small_latencies) * 1000,
+        "small_p99_ms": small_latencies[int(len(small_latencies) * 0.99) - 1] * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--comments", type=int, default=200, help="Top-level comments in the thread")
+    parser.add_argument("--replies", type=int, default=2, help="Replies per comment, three levels deep")
+    parser.add_argument("--threads", type=int, default=4, help="Concurrent big requests")
+    parser.add_argument("--calls", type=int, default=5, help="Big requests per thread")
+    parser.add_argument("--threshold", type=int, default=256 * 1024, help="Offload threshold in bytes")
+    args = parser.parse_args()
+
+    big = make_thread(args.comments, args.replies)
+    stub = start_stub(big)
+    base_url = f"http://127.0.0.1:{stub.server_port}"
+    print(f"Payload: {len(big) / 1024:.0f} KiB, {args.threads} threads x {args.calls} calls")
+    print(f"{'mode':<10} {'big req/s':>10} {'small p50 ms':>13} {'small p99 ms':>13}")
+    for mode, threshold in (("inline", None), ("offload", args.threshold)):
+        result = run(base_url, threshold, args.threads, args.calls)
+        print(f"{mode:<10} {result['big_per_sec']:>10.1f} "
+              f"{result['small_p50_ms']:>13.1f} {result['small_p99_ms']:>13.1f}")
+    stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
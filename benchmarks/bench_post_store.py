@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark the columnar post store against a list of RedditPost models
+
+Builds the same synthetic posts both ways and reports retained memory,
+then times the common local queries: filter by subreddit and score,
+top-k by score, and materializing a page of results for serialization.
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.post_store import PostStore
+from tools.reddit_tools import RedditPost
+
+SUBREDDITS = ["python", "programming", "news", "science", "askreddit", "pics", "gaming", "movies"]
+
+
+def make_fields(count: int, seed: int = 0):
+    """Yield RedditPost field dicts shaped like real listing entries"""
+    rng = random.Random(seed)
+    for i in range(count):
+        subreddit = rng.choice(SUBREDDITS)
+        post_id = f"p{i:07x}"
+        yield dict(
+            id=post_id,
+            title=f"Post number {i} about {subreddit} " + "words " * rng.randint(3, 15),
+            author=f"user{rng.randint(0, count // 20)}",
+            subreddit=subreddit,
+            score=rng.randint(0, 50000),
+            num_comments=rng.randint(0, 3000),
+            created_utc=1700000000.0 + i * 7,
+            url=f"https://example.com/{post_id}",
+            permalink=f"https://reddit.com/r/{subreddit}/comments/{post_id}/",
+            selftext="lorem ipsum dolor sit amet " * rng.randint(0, 10) or None,
+            thumbnail=None,
+            is_video=False,
+            is_self=rng.random() < 0.3
+        )
+
+
+def measure(build):
+    """Return (object, bytes retained, seconds to build)"""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    value = build()
+    elapsed = time.perf_counter() - started
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return value, retained, elapsed
+
+
+def timed(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--posts", type=int, default=100_000, help="Posts to store")
+    parser.add_argument("--top", type=int, default=100, help="k for the top-k query")
+    args = parser.parse_args()
+
+    models, model_bytes, model_build = measure(
+        lambda: [RedditPost(**fields) for fields in make_fields(args.posts)])
+
+    def build_store():
+        store = PostStore()
+        store.add_many(make_fields(args.posts))
+        return store
+
+    store, store_bytes, store_build = measure(build_store)
+
+    print(f"{args.posts} posts")
+    print(f"{'':<10} {'MiB':>8} {'build s':>8} {'filter ms':>10} {'top-k ms':>9} {'page ms':>8}")
+
+    def model_filter():
+        return [p for p in models if p.subreddit.lower() == "python" and p.score >= 1000]
+
+    def model_top():
+        return sorted(model_filter(), key=lambda p: p.score, reverse=True)[:args.top]
+
+    def model_page():
+        return [p.model_dump() for p in model_top()]
+
+    def store_filter():
+        return store.filter(subreddit="python", min_score=1000)
+
+    def store_top():
+        return store.top_k(store_filter(), args.top)
+
+    def store_page():
+        return store.to_dicts(store_top())
+
+    for name, retained, build, queries in (
+            ("models", model_bytes, model_build, (model_filter, model_top, model_page)),
+            ("store", store_bytes, store_build, (store_filter, store_top, store_page))):
+        filter_s, top_s, page_s = (timed(query) for query in queries)
+        print(f"{name:<10} {retained / 2 ** 20:>8.1f} {build:>8.2f} "
+              f"{filter_s * 1000:>10.1f} {top_s * 1000:>9.1f} {page_s * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark MCP server cold start: spawn to first `initialize` response
+
+Run with --max-ms to fail (exit status 1) when the median start-up time
+regresses past a budget.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+INITIALIZE = {
+    "jsonrpc": "2.0",
+    "id": 1,
+    "method": "initialize",
+    "params": {
+        "protocolVersion": "2024-11-05",
+        "capabilities": {},
+        "clientInfo": {"name": "bench-startup", "version": "1.0.0"}
+    }
+}
+
+
+def time_startup(script: str) -> float:
+    """Spawn `script` over stdio and return seconds until it answers initialize"""
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, script)],
+        cwd=ROOT,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        process.stdin.write((json.dumps(INITIALIZE) + "\n").encode())
+        process.stdin.flush()
+        while True:
+            line = process.stdout.readline()
+            if not line:
+                raise RuntimeError(f"{script} exited before answering initialize")
+            message = json.loads(line)
+            if message.get("id") == 1:
+                return time.perf_counter() - started
+    finally:
+        process.kill()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("scripts", nargs="*", default=["reddit_mcp_server.py"],
+                        help="Server scripts to start (default: reddit_mcp_server.py)")
+    parser.add_argument("--runs", type=int, default=10, help="Start-ups per server")
+    parser.add_argument("--max-ms", type=float, help="Fail if a median start-up exceeds this")
+    args = parser.parse_args()
+
+    failed = False
+    for script in args.scripts:
+        times = sorted(time_startup(script) * 1000 for _ in range(args.runs))
+        median = statistics.median(times)
+        print(f"{script}: median {median:.0f} ms, min {times[0]:.0f} ms, max {times[-1]:.0f} ms")
+        if args.max_ms is not None and median > args.max_ms:
+            print(f"  regression: median above {args.max_ms:.0f} ms budget")
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Benchmark every RedditTools method and both MCP servers against the Reddit stub
+
+Starts benchmarks/reddit_stub.py in its own process and times each
+RedditTools method called directly, then each tool called over stdio
+through reddit_mcp_server.py and mcpreddit.py. Caching is off, so every
+call reaches the stub; each call uses different arguments where it can.
+
+For runs on real data, record once (needs network access, and runs at
+Reddit's rate limit) and replay from then on:
+
+    python benchmarks/bench_suite.py --record recordings/ --subreddits python,rust
+    python benchmarks/bench_suite.py --replay recordings/ --subreddits python,rust
+
+Save results with --output and compare a later run with --baseline; the
+run fails (exit status 1) when a median regresses past --tolerance.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import reddit_stub
+from tools.reddit_tools import RedditTools
+
+QUERIES = ["python", "release", "question guide", "performance"]
+# Slowdowns smaller than this are timer noise, whatever the tolerance
+NOISE_MS = 1.0
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    ordered = sorted(latencies) or [0.0]
+    return {
+        "calls": len(latencies) + errors,
+        "errors": errors,
+        "p50_ms": round(statistics.median(ordered) * 1000, 2),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+        "per_second": round((len(latencies) + errors) / elapsed, 1) if elapsed else 0.0
+    }
+
+
+def time_calls(calls: List[Callable[[], Any]]) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    started = time.perf_counter()
+    for call in calls:
+        t = time.perf_counter()
+        try:
+            call()
+            latencies.append(time.perf_counter() - t)
+        except Exception:
+            errors += 1
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def method_cases(tools: RedditTools, subreddits: List[str], calls: int) -> Dict[str, List[Callable[[], Any]]]:
+    """Calls to time per RedditTools method"""
+    subs = list(itertools.islice(itertools.cycle(subreddits), calls))
+    queries = list(itertools.islice(itertools.cycle(QUERIES), calls))
+    # Comment pages need real post ids
+    post_ids = [(post.subreddit, post.id) for post in tools.get_reddit_post(subreddits[0], "hot", 100).posts]
+    posts = list(itertools.islice(itertools.cycle(post_ids), calls)) if post_ids else []
+    now = time.time()
+    return {
+        "get_reddit_post": [lambda s=s: tools.get_reddit_post(s, "hot", 25) for s in subs],
+        "get_reddit_post(new, 100)": [lambda s=s: tools.get_reddit_post(s, "new", 100) for s in subs],
+        "search_post": [lambda q=q, s=s: tools.search_post(q, s) for q, s in zip(queries, subs)],
+        "search_post(all)": [lambda q=q: tools.search_post(q) for q in queries],
+        "search_subreddits": [lambda q=q: tools.search_subreddits(q) for q in queries],
+        "get_subreddit_about": [lambda s=s: tools.get_subreddit_about(s) for s in subs],
+        "get_popular_post": [lambda: tools.get_popular_post(25)] * calls,
+        "get_all_post": [lambda: tools.get_all_post("hot", 25)] * calls,
+        "get_post_by_id": [lambda p=p: tools.get_post_by_id(*p) for p in posts],
+        "get_post_with_comments": [lambda p=p: tools.get_post_with_comments(*p) for p in posts],
+        "analyze_posts": [lambda s=s: tools.analyze_posts(subreddit=s, limit=100) for s in subs],
+        "get_deduplicated_posts": [lambda s=s: tools.get_deduplicated_posts([s], limit=100) for s in subs],
+        "get_posts_in_range": [lambda s=s: tools.get_posts_in_range(s, now - 3 * 3600, now, max_pages=3)
+                               for s in subs],
+        "get_rising_terms": [lambda: tools.get_rising_terms(min_count=1)] * calls
+    }
+
+
+def bench_methods(base_url: str, subreddits: List[str], calls: int, polite: bool) -> Dict[str, Any]:
+    rate = 60.0 if polite else 10.0 ** 6
+    tools = RedditTools(cache_ttl=0, requests_per_minute=rate, burst=10, base_url=base_url)
+    results = {}
+    for name, cases in method_cases(tools, subreddits, calls).items():
+        results[name] = time_calls(cases)
+    tools.close()
+    return results
+
+
+class StdioClient:
+    """A minimal MCP client for a server spawned over stdio"""
+
+    def __init__(self, argv: List[str]):
+        self.process = subprocess.Popen(argv, cwd=ROOT, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL, text=True)
+        self._ids = itertools.count(1)
+        self.request("initialize", {"protocolVersion": "2024-11-05", "capabilities": {},
+                                    "clientInfo": {"name": "bench-suite", "version": "1.0.0"}})
+        self.send({"jsonrpc": "2.0", "method": "notifications/initialized"})
+
+    def send(self, message: Dict[str, Any]) -> None:
+        self.process.stdin.write(json.dumps(message) + "\n")
+        self.process.stdin.flush()
+
+    def request(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        request_id = next(self._ids)
+        self.send({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+        while True:
+            line = self.process.stdout.readline()
+            if not line:
+                raise RuntimeError("Server exited")
+            message = json.loads(line)
+            if message.get("id") == request_id:
+                return message
+
+    def call_tool(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        response = self.request("tools/call", {"name": name, "arguments": arguments})
+        if "error" in response or response.get("result", {}).get("isError"):
+            raise RuntimeError(f"{name} failed: {response}")
+        return response
+
+    def close(self) -> None:
+        self.process.kill()
+        self.process.wait()
+
+
+def tool_cases(subreddits: List[str], post_ids: List[Tuple[str, str]], calls: int) -> Dict[str, List[Dict[str, Any]]]:
+    """Arguments to time per MCP tool; each server offers some of them"""
+    subs = list(itertools.islice(itertools.cycle(subreddits), calls))
+    queries = list(itertools.islice(itertools.cycle(QUERIES), calls))
+    posts = list(itertools.islice(itertools.cycle(post_ids), calls)) if post_ids else []
+    now = time.time()
+    return {
+        "get_reddit_posts": [{"subreddit": s} for s in subs],
+        "search_reddit_posts": [{"query": q, "subreddit": s} for q, s in zip(queries, subs)],
+        "search_subreddits": [{"query": q} for q in queries],
+        "get_subreddit_info": [{"subreddit": s} for s in subs],
+        "get_popular_posts": [{"limit": 25}] * calls,
+        "get_all_posts": [{"sort": "hot"}] * calls,
+        "get_post_with_comments": [{"subreddit": s, "post_id": p} for s, p in posts],
+        "analyze_reddit_posts": [{"subreddit": s, "limit": 100} for s in subs],
+        "get_deduplicated_posts": [{"subreddits": [s], "limit": 100} for s in subs],
+        "get_posts_in_range": [{"subreddit": s, "start": now - 3 * 3600, "end": now} for s in subs],
+        "get_rising_terms": [{"min_count": 1}] * calls
+    }
+
+
+def bench_server(script: str, base_url: str, subreddits: List[str], post_ids: List[Tuple[str, str]],
+                 calls: int, polite: bool) -> Dict[str, Any]:
+    client = StdioClient([sys.executable, os.path.join(ROOT, script), "--base-url", base_url,
+                          "--cache-ttl", "0", "--requests-per-minute", "60" if polite else "1000000"])
+    try:
+        offered = {tool["name"] for tool in client.request("tools/list", {})["result"]["tools"]}
+        return {name: time_calls([lambda a=a: client.call_tool(name, a) for a in cases])
+                for name, cases in tool_cases(subreddits, post_ids, calls).items() if name in offered}
+    finally:
+        client.close()
+
+
+def print_results(title: str, results: Dict[str, Any]) -> None:
+    print(f"\n{title}")
+    print(f"  {'call':<28} {'calls':>6} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'calls/s':>9}")
+    for name, r in results.items():
+        print(f"  {name:<28} {r['calls']:>6} {r['errors']:>6} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} "
+              f"{r['per_second']:>9.1f}")
+
+
+def regressions(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    found = []
+    for section, cases in results.items():
+        for name, r in cases.items():
+            before = baseline.get(section, {}).get(name)
+            if (before and r["p50_ms"] > before["p50_ms"] * (1 + tolerance)
+                    and r["p50_ms"] - before["p50_ms"] > NOISE_MS):
+                found.append(f"{section} / {name}: p50 {before['p50_ms']:.2f} -> {r['p50_ms']:.2f} ms")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20, help="Calls per method or tool")
+    parser.add_argument("--subreddits", default="bench,python,rust,linux",
+                        help="Comma-separated subreddits to query")
+    parser.add_argument("--servers", default="reddit_mcp_server.py,mcpreddit.py",
+                        help="Comma-separated server scripts to benchmark (empty: none)")
+    parser.add_argument("--output", metavar="PATH", help="Write results as JSON")
+    parser.add_argument("--baseline", metavar="PATH", help="Results of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Slowdown of a median over the baseline counted as a regression")
+    reddit_stub.add_arguments(parser)
+    args = parser.parse_args()
+
+    subreddits = [s for s in args.subreddits.split(",") if s]
+    stub, base_url = reddit_stub.spawn(args)
+    # Recording goes to Reddit itself, so keep to its rate limit
+    polite = bool(args.record)
+    results: Dict[str, Any] = {}
+    try:
+        results["RedditTools"] = bench_methods(base_url, subreddits, args.calls, polite)
+        print_results("RedditTools", results["RedditTools"])
+
+        probe = RedditTools(cache_ttl=0, base_url=base_url, requests_per_minute=10.0 ** 6)
+        post_ids = [(post.subreddit, post.id) for post in probe.get_reddit_post(subreddits[0], "hot", 100).posts]
+        for script in filter(None, args.servers.split(",")):
+            results[script] = bench_server(script, base_url, subreddits, post_ids, args.calls, polite)
+            print_results(script, results[script])
+    finally:
+        stub.kill()
+        stub.wait()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    failed = False
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for line in found:
+            print(f"regression: {line}")
+        failed = bool(found)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""
+Load-test an MCP server with a mix of tool calls against the Reddit stub
+
+Starts benchmarks/reddit_stub.py and the server, connects over stdio or
+the SSE transport, and replays tool calls drawn from --mix for --duration
+seconds. With --concurrency N each of N callers sends its next call as
+soon as the previous one is answered; with --rate R calls are sent on a
+Poisson schedule at R per second whatever the server's progress, and
+latency counts from the scheduled send time, so a server falling behind
+shows up as growing latency instead of a lower send rate.
+
+Every --interval seconds it prints throughput, latency percentiles,
+errors and the server's RSS; at the end a summary per tool. Run with
+--output to keep the numbers, e.g. before each release:
+
+    python benchmarks/load_test.py reddit_mcp_server.py --concurrency 32 --duration 60
+    python benchmarks/load_test.py mcpreddit.py --transport sse --clients 8 --rate 200
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+import reddit_stub
+
+DEFAULT_MIX = ("get_reddit_posts=5,search_reddit_posts=2,get_subreddit_info=1,"
+               "get_post_with_comments=2,analyze_reddit_posts=1,get_posts_in_range=1")
+QUERIES = ["python", "release", "question guide", "performance", "linux", "memory"]
+
+# Called with the latency in seconds, an error message or None, and the response
+Callback = Callable[[float, Optional[str], Optional[Dict[str, Any]]], None]
+
+
+class Connection:
+    """A client session: sends JSON-RPC requests and matches up their responses"""
+
+    def __init__(self):
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, Tuple[float, Callback]] = {}
+        self._lock = threading.Lock()
+
+    def _send(self, message: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def call(self, method: str, params: Dict[str, Any], done: Callback, sent_at: Optional[float] = None) -> None:
+        """Send a request; `done` is called from the reader thread when it is answered"""
+        request_id = next(self._ids)
+        with self._lock:
+            self._pending[request_id] = (sent_at or time.perf_counter(), done)
+        self._send({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+
+    def call_sync(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        answered = threading.Event()
+        result: Dict[str, Any] = {}
+
+        def done(latency: float, error: Optional[str], response: Optional[Dict[str, Any]]) -> None:
+            result["error"] = error
+            result["response"] = response
+            answered.set()
+
+        self.call(method, params, done)
+        if not answered.wait(60):
+            raise RuntimeError(f"No answer to {method}")
+        if result["error"]:
+            raise RuntimeError(result["error"])
+        return result["response"]
+
+    def initialize(self) -> None:
+        self.call_sync("initialize", {"protocolVersion": "2024-11-05", "capabilities": {},
+                                      "clientInfo": {"name": "load-test", "version": "1.0.0"}})
+        self._send({"jsonrpc": "2.0", "method": "notifications/initialized"})
+
+    def _received(self, line: str) -> None:
+        message = json.loads(line)
+        with self._lock:
+            pending = self._pending.pop(message.get("id"), None)
+        if pending is None:
+            return
+        sent_at, done = pending
+        latency = time.perf_counter() - sent_at
+        error = None
+        if "error" in message:
+            error = message["error"].get("message", "error")
+        elif message.get("result", {}).get("isError"):
+            error = message["result"]["content"][0].get("text", "error")
+        done(latency, error, message)
+
+    def fail_pending(self, reason: str) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for sent_at, done in pending.values():
+            done(time.perf_counter() - sent_at, reason, None)
+
+    def close(self) -> None:
+        pass
+
+
+class StdioConnection(Connection):
+    """The server's own stdin and stdout"""
+
+    def __init__(self, process: subprocess.Popen):
+        super().__init__()
+        self.process = process
+        self._write_lock = threading.Lock()
+        threading.Thread(target=self._read, name="stdio-reader", daemon=True).start()
+
+    def _send(self, message: Dict[str, Any]) -> None:
+        with self._write_lock:
+            self.process.stdin.write((json.dumps(message) + "\n").encode())
+            self.process.stdin.flush()
+
+    def _read(self) -> None:
+        for line in self.process.stdout:
+            self._received(line.decode())
+        self.fail_pending("server exited")
+
+
+class SSEConnection(Connection):
+    """One session on the SSE transport: an event stream plus a POST per request"""
+
+    def __init__(self, host: str, port: int):
+        super().__init__()
+        self.host = host
+        self.port = port
+        self._local = threading.local()
+        self._stream = http.client.HTTPConnection(host, port, timeout=None)
+        self._stream.request("GET", "/sse", headers={"Accept": "text/event-stream"})
+        self._response = self._stream.getresponse()
+        self._endpoint: Optional[str] = None
+        self._ready = threading.Event()
+        threading.Thread(target=self._read, name="sse-reader", daemon=True).start()
+        if not self._ready.wait(10):
+            raise RuntimeError("No endpoint event from the SSE stream")
+
+    def _send(self, message: Dict[str, Any]) -> None:
+        # A connection per sending thread; POSTs are answered with 202 straight away
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = http.client.HTTPConnection(self.host, self.port)
+        body = json.dumps(message).encode()
+        connection.request("POST", self._endpoint, body=body, headers={"Content-Type": "application/json"})
+        response = connection.getresponse()
+        response.read()
+
+    def _read(self) -> None:
+        event, data = "message", []
+        try:
+            for raw in self._response:
+                line = raw.decode().rstrip("\r\n")
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:"):
+                    data.append(line[5:].strip())
+                elif not line and data:
+                    payload = "\n".join(data)
+                    if event == "endpoint":
+                        self._endpoint = payload
+                        self._ready.set()
+                    elif event == "message":
+                        self._received(payload)
+                    event, data = "message", []
+        except (OSError, ValueError, AttributeError):
+            # close() pulls the socket out from under the read
+            pass
+        self.fail_pending("event stream closed")
+
+    def close(self) -> None:
+        self._stream.close()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def rss_bytes(pid: int) -> Optional[int]:
+    """Resident set size of a process, from /proc (Linux) or ps"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return int(subprocess.check_output(["ps", "-o", "rss=", "-p", str(pid)])) * 1024
+    except (OSError, ValueError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in filter(None, text.split(",")):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+class Workload:
+    """Random arguments for each tool, over a fixed population of subreddits and posts"""
+
+    def __init__(self, mix: Dict[str, float], subreddits: List[str], posts: List[Tuple[str, str]], seed: int):
+        self.tools = list(mix)
+        self.weights = [mix[name] for name in self.tools]
+        self.subreddits = subreddits
+        self.posts = posts
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def next_call(self) -> Tuple[str, Dict[str, Any]]:
+        with self._lock:
+            rng = self._rng
+            tool = rng.choices(self.tools, self.weights)[0]
+            subreddit = rng.choice(self.subreddits)
+            query = rng.choice(QUERIES)
+            post = rng.choice(self.posts) if self.posts else (subreddit, "0")
+        arguments = {
+            "get_reddit_posts": {"subreddit": subreddit, "sort": "hot"},
+            "search_reddit_posts": {"query": query, "subreddit": subreddit},
+            "search_subreddits": {"query": query},
+            "get_subreddit_info": {"subreddit": subreddit},
+            "get_popular_posts": {},
+            "get_all_posts": {},
+            "get_post_with_comments": {"subreddit": post[0], "post_id": post[1]},
+            "analyze_reddit_posts": {"subreddit": subreddit, "limit": 100},
+            "get_deduplicated_posts": {"subreddits": [subreddit], "limit": 100},
+            "get_rising_terms": {"min_count": 1},
+            "get_posts_in_range": {"subreddit": subreddit, "start": time.time() - 3 * 3600},
+            "get_server_stats": {}
+        }.get(tool, {})
+        return tool, arguments
+
+
+class Recorder:
+    """Collects call outcomes and summarizes them per interval and per tool"""
+
+    def __init__(self):
+        self.samples: List[Tuple[float, str, float, bool]] = []
+        self.errors: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._reported = 0
+
+    def record(self, tool: str, latency: float, error: Optional[str]) -> None:
+        with self._lock:
+            self.samples.append((time.perf_counter(), tool, latency, error is not None))
+            if error is not None:
+                self.errors.setdefault(tool, error)
+
+    @staticmethod
+    def summarize(samples: List[Tuple[float, str, float, bool]], seconds: float) -> Dict[str, Any]:
+        if not samples:
+            return {"calls": 0, "per_second": 0.0, "errors": 0, "p50_ms": None, "p95_ms": None, "p99_ms": None}
+        latencies = np.array([sample[2] for sample in samples]) * 1000
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        errors = sum(sample[3] for sample in samples)
+        return {
+            "calls": len(samples),
+            "per_second": round(len(samples) / seconds, 1),
+            "errors": errors,
+            "error_rate": round(errors / len(samples), 4),
+            "p50_ms": round(float(p50), 2),
+            "p95_ms": round(float(p95), 2),
+            "p99_ms": round(float(p99), 2)
+        }
+
+    def interval(self, seconds: float) -> Dict[str, Any]:
+        with self._lock:
+            samples = self.samples[self._reported:]
+            self._reported = len(self.samples)
+        return self.summarize(samples, seconds)
+
+    def by_tool(self, seconds: float) -> Dict[str, Any]:
+        with self._lock:
+            samples = list(self.samples)
+        tools = sorted({sample[1] for sample in samples})
+        return {tool: self.summarize([s for s in samples if s[1] == tool], seconds) for tool in tools}
+
+
+def start_server(args: argparse.Namespace, base_url: str) -> Tuple[subprocess.Popen, List[Connection]]:
+    argv = [sys.executable, os.path.join(ROOT, args.server), "--base-url", base_url,
+            "--requests-per-minute", str(args.requests_per_minute), "--cache-ttl", str(args.cache_ttl)]
+    argv += args.server_arg
+    if args.transport == "stdio":
+        process = subprocess.Popen(argv, cwd=ROOT, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                   stderr=subprocess.DEVNULL)
+        connections: List[Connection] = [StdioConnection(process)]
+    else:
+        port = free_port()
+        process = subprocess.Popen(argv + ["--transport", "sse", "--port", str(port)], cwd=ROOT,
+                                   stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                   stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline or process.poll() is not None:
+                    process.kill()
+                    raise RuntimeError(f"{args.server} did not start listening on port {port}")
+                time.sleep(0.1)
+        connections = [SSEConnection("127.0.0.1", port) for _ in range(args.clients)]
+    for connection in connections:
+        connection.initialize()
+    return process, connections
+
+
+def discover_posts(connection: Connection, subreddits: List[str]) -> List[Tuple[str, str]]:
+    """Ids of real posts in the stub, for comment page calls"""
+    posts = []
+    for subreddit in subreddits[:5]:
+        response = connection.call_sync("tools/call", {"name": "get_reddit_posts",
+                                                       "arguments": {"subreddit": subreddit, "limit": 25}})
+        text = response["result"]["content"][0]["text"]
+        posts += [(post["subreddit"], post["id"]) for post in json.loads(text)["posts"]]
+    return posts
+
+
+def run_load(args: argparse.Namespace, connections: List[Connection], workload: Workload,
+             recorder: Recorder, stop: threading.Event) -> None:
+    """Send calls until `stop` is set, closed-loop or open-loop"""
+    def send(connection: Connection, sent_at: Optional[float] = None,
+             then: Optional[Callable[[], None]] = None) -> None:
+        tool, arguments = workload.next_call()
+
+        def done(latency: float, error: Optional[str], response: Any) -> None:
+            recorder.record(tool, latency, error)
+            if then is not None and not stop.is_set():
+                then()
+
+        try:
+            connection.call("tools/call", {"name": tool, "arguments": arguments}, done, sent_at)
+        except Exception as e:
+            recorder.record(tool, 0.0, str(e))
+
+    if args.rate:
+        # Open loop: Poisson arrivals, round-robin over the sessions
+        rng = random.Random(args.seed + 1)
+        next_at = time.perf_counter()
+        for connection in itertools.cycle(connections):
+            next_at += rng.expovariate(args.rate)
+            delay = next_at - time.perf_counter()
+            if stop.wait(delay) if delay > 0 else stop.is_set():
+                return
+            if args.transport == "sse":
+                # A POST waits for its 202, which mustn't hold up the schedule
+                threading.Thread(target=send, args=(connection, next_at), daemon=True).start()
+            else:
+                send(connection, next_at)
+    else:
+        # Closed loop: each caller sends again as soon as it is answered
+        for caller in range(args.concurrency):
+            connection = connections[caller % len(connections)]
+
+            def loop(connection=connection):
+                # Sending from the reader thread would block it on SSE POSTs
+                threading.Thread(target=send, args=(connection, None, loop), daemon=True).start()
+
+            loop()
+        stop.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("server", nargs="?", default="reddit_mcp_server.py", help="Server script to load")
+    parser.add_argument("--transport", choices=["stdio", "sse"], default="stdio")
+    parser.add_argument("--clients", type=int, default=4, help="SSE sessions to spread calls over")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", type=int, default=8, help="Calls kept in flight (closed loop)")
+    load.add_argument("--rate", type=float, help="Calls per second on a Poisson schedule (open loop)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--interval", type=float, default=5.0, help="Seconds between progress lines")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="tool=weight pairs, comma-separated")
+    parser.add_argument("--subreddits", type=int, default=50, help="Distinct subreddits the calls are spread over")
+    parser.add_argument("--cache-ttl", type=float, default=60.0, help="Server cache TTL")
+    parser.add_argument("--requests-per-minute", type=float, default=10.0 ** 6, help="Server upstream rate limit")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", metavar="PATH", help="Write the summary and timeline as JSON")
+    parser.add_argument("--server-arg", action="append", default=[], metavar="ARG",
+                        help="Extra server command-line argument (repeatable)")
+    reddit_stub.add_arguments(parser)
+    parser.set_defaults(latency=0.05)
+    args = parser.parse_args()
+
+    stub, base_url = reddit_stub.spawn(args)
+    process, connections = None, []
+    try:
+        process, connections = start_server(args, base_url)
+        offered = {tool["name"] for tool in connections[0].call_sync("tools/list", {})["result"]["tools"]}
+        mix = parse_mix(args.mix)
+        skipped = sorted(set(mix) - offered)
+        if skipped:
+            print(f"{args.server} has no {', '.join(skipped)}; left out of the mix")
+        mix = {name: weight for name, weight in mix.items() if name in offered}
+        subreddits = [f"load{i}" for i in range(args.subreddits)]
+        workload = Workload(mix, subreddits, discover_posts(connections[0], subreddits), args.seed)
+
+        recorder = Recorder()
+        stop = threading.Event()
+        mode = f"rate {args.rate:g}/s" if args.rate else f"concurrency {args.concurrency}"
+        print(f"{args.server} over {args.transport}, {mode}, stub latency {args.latency * 1000:.0f} ms")
+        print(f"{'time':>6} {'calls/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7} {'RSS MiB':>8}")
+        driver = threading.Thread(target=run_load, args=(args, connections, workload, recorder, stop), daemon=True)
+        started = time.perf_counter()
+        driver.start()
+        timeline = []
+        while time.perf_counter() - started < args.duration:
+            time.sleep(min(args.interval, args.duration - (time.perf_counter() - started)))
+            elapsed = time.perf_counter() - started
+            point = recorder.interval(args.interval)
+            point["t"] = round(elapsed, 1)
+            point["rss_bytes"] = rss_bytes(process.pid)
+            timeline.append(point)
+            rss = f"{point['rss_bytes'] / 2 ** 20:.0f}" if point["rss_bytes"] else "n/a"
+            p = {key: "-" if point[key] is None else f"{point[key]:.1f}" for key in ("p50_ms", "p95_ms", "p99_ms")}
+            print(f"{elapsed:>6.0f} {point['per_second']:>9.1f} {p['p50_ms']:>9} {p['p95_ms']:>9} "
+                  f"{p['p99_ms']:>9} {point['errors']:>7} {rss:>8}")
+        stop.set()
+        elapsed = time.perf_counter() - started
+
+        total = Recorder.summarize(recorder.samples, elapsed)
+        tools = recorder.by_tool(elapsed)
+        print(f"\nTotal: {total['calls']} calls, {total['per_second']} calls/s, p50 {total['p50_ms']} ms, "
+              f"p95 {total['p95_ms']} ms, p99 {total['p99_ms']} ms, error rate {total.get('error_rate', 0):.2%}")
+        print(f"  {'tool':<26} {'calls':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        for tool, r in tools.items():
+            print(f"  {tool:<26} {r['calls']:>7} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f} "
+                  f"{r['errors']:>7}")
+        for tool, error in recorder.errors.items():
+            print(f"  first {tool} error: {error[:200]}")
+        peak = max((point["rss_bytes"] or 0 for point in timeline), default=0)
+        if peak:
+            print(f"Peak RSS: {peak / 2 ** 20:.0f} MiB")
+
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump({"server": args.server, "transport": args.transport, "mode": mode,
+                           "total": total, "tools": tools, "timeline": timeline}, f, indent=2)
+    finally:
+        for connection in connections:
+            connection.close()
+        if process is not None:
+            process.kill()
+            process.wait()
+        stub.kill()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
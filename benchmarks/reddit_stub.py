@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Reddit JSON API, for offline benchmarks
+
+By default responses are synthetic: listings, searches, subreddit and user
+about pages and comment threads are generated from the request URL, so the same
+URL always gets the same body. Their size and the delay before each
+response are configurable.
+
+With --record DIR the stub instead forwards every request to Reddit and
+saves the response under DIR; with --replay DIR it serves those saved
+responses (and 404 for anything not recorded), so a benchmark can be run
+against real data once captured.
+
+Point RedditTools at it with base_url=..., or the MCP servers with
+--base-url. The first line printed is the address being served.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import zlib
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+WORDS = (
+    "python rust release update question guide help build error server data model "
+    "linux windows game news science space energy market policy study report video "
+    "first new best worst open source project tool library design review performance "
+    "memory cache network latency test bug fix feature version support community "
+    "weekly thread discussion daily photo story today finally anyone why how"
+).split()
+
+EPOCH = 1_700_000_000
+# Reddit never pages further back than this in a listing
+LISTING_CAP = 1000
+
+
+def _base36(n: int) -> str:
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    out = ""
+    while True:
+        n, r = divmod(n, 36)
+        out = digits[r] + out
+        if not n:
+            return out
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _listing(children: List[Dict[str, Any]], after: Optional[str] = None) -> Dict[str, Any]:
+    return {"kind": "Listing", "data": {"after": after, "before": None,
+                                        "dist": len(children), "children": children}}
+
+
+class SyntheticReddit:
+    """
+    Generates Reddit API responses deterministically from their URL
+
+    Post ids encode the listing they came from and their position in it,
+    so `after` cursors and comment pages for listed posts resolve without
+    any state. Listings are newest first, one post every `post_interval`
+    seconds back from `now`.
+    """
+
+    def __init__(self, listing_size: int = LISTING_CAP, comments: int = 50, replies: int = 2,
+                 depth: int = 3, body_words: int = 30, post_interval: float = 60.0,
+                 now: Optional[float] = None):
+        """
+        Args:
+            listing_size: Posts in each listing before it runs out
+            comments: Top-level comments per thread
+            replies: Replies to each comment, down to `depth`
+            depth: Levels of replies below the top-level comments
+            body_words: Words in each self-post and comment body
+            post_interval: Seconds between consecutive posts in a listing
+            now: Creation time of the newest post (default: start-up time)
+        """
+        self.listing_size = min(listing_size, LISTING_CAP)
+        self.comments = comments
+        self.replies = replies
+        self.depth = depth
+        self.body_words = body_words
+        self.post_interval = post_interval
+        self.now = time.time() if now is None else now
+
+    def _post_id(self, source: str, index: int) -> str:
+        # Four characters of the source, then the index
+        return _base36(zlib.crc32(source.encode()) % 36 ** 4).rjust(4, "0") + _base36(index)
+
+    def _index_of(self, post_id: str) -> int:
+        try:
+            return int(post_id[4:], 36)
+        except ValueError:
+            return 0
+
+    def post(self, subreddit: str, index: int, source: Optional[str] = None,
+             query: Optional[str] = None) -> Dict[str, Any]:
+        """The `index`th post (0 is newest) of a listing"""
+        source = source or subreddit
+        rng = random.Random(f"{source}/{index}")
+        post_id = self._post_id(source, index)
+        title = _sentence(rng, rng.randint(4, 12))
+        if query:
+            title = f"{title} {query}"
+        is_self = rng.random() < 0.5
+        permalink = f"/r/{subreddit}/comments/{post_id}/{title[:30].replace(' ', '_')}/"
+        return {"kind": "t3", "data": {
+            "id": post_id,
+            "name": f"t3_{post_id}",
+            "title": title,
+            "author": f"user{rng.randint(1, 5000)}",
+            "subreddit": subreddit,
+            "score": int(rng.paretovariate(1.2) * 10),
+            "upvote_ratio": round(rng.uniform(0.5, 1.0), 2),
+            "num_comments": rng.randint(0, 500),
+            "created_utc": self.now - index * self.post_interval,
+            "url": f"https://reddit.com{permalink}" if is_self else f"https://example.com/{source}/{index}",
+            "permalink": permalink,
+            "selftext": _sentence(rng, self.body_words) if is_self else "",
+            "thumbnail": "self" if is_self else "default",
+            "is_video": False,
+            "is_self": is_self,
+            "over_18": False
+        }}
+
+    def listing(self, subreddit: str, params: Dict[str, str], source: Optional[str] = None,
+                query: Optional[str] = None) -> Dict[str, Any]:
+        """A page of posts, honoring `limit` and `after`"""
+        limit = max(1, min(int(params.get("limit", 25)), 100))
+        after = params.get("after")
+        start = self._index_of(after[3:]) + 1 if after else 0
+        end = min(start + limit, self.listing_size)
+        children = [self.post(subreddit, i, source, query) for i in range(start, end)]
+        next_after = children[-1]["data"]["name"] if children and end < self.listing_size else None
+        return _listing(children, next_after)
+
+    def search(self, subreddit: Optional[str], params: Dict[str, str]) -> Dict[str, Any]:
+        query = params.get("q", "")
+        # Global results are spread over a handful of subreddits
+        source = f"search:{subreddit or ''}:{query}"
+        page = self.listing(subreddit or "all", params, source, query)
+        if not subreddit:
+            for child in page["data"]["children"]:
+                data = child["data"]
+                data["subreddit"] = f"{query.split()[0] if query else 'sub'}{zlib.crc32(data['id'].encode()) % 8}"
+        return page
+
+    def about(self, subreddit: str) -> Dict[str, Any]:
+        rng = random.Random(f"about/{subreddit}")
+        return {"kind": "t5", "data": {
+            "name": f"t5_{self._post_id(subreddit, 0)}",
+            "display_name": subreddit,
+            "title": _sentence(rng, 4).title(),
+            "public_description": _sentence(rng, 20),
+            "subscribers": rng.randint(100, 10_000_000),
+            "active_user_count": rng.randint(1, 50_000),
+            "created_utc": EPOCH - rng.randint(0, 10 ** 8),
+            "over18": False,
+            "url": f"/r/{subreddit}/",
+            "icon_img": "",
+            "banner_background_image": ""
+        }}
+
+    def user(self, name: str) -> Optional[Dict[str, Any]]:
+        """An account's about page; None for the 2% of names that are deleted accounts"""
+        rng = random.Random(f"user/{name}")
+        if rng.random() < 0.02:
+            return None
+        if rng.random() < 0.01:
+            return {"kind": "t2", "data": {"name": name, "is_suspended": True}}
+        link_karma = int(rng.paretovariate(1.1) * 50)
+        comment_karma = int(rng.paretovariate(1.1) * 200)
+        return {"kind": "t2", "data": {
+            "name": name,
+            "id": _base36(zlib.crc32(name.encode())),
+            "link_karma": link_karma,
+            "comment_karma": comment_karma,
+            "total_karma": link_karma + comment_karma,
+            "created_utc": EPOCH - rng.randint(0, 5 * 10 ** 8),
+            "is_mod": rng.random() < 0.1,
+            "is_employee": False,
+            "verified": True,
+            "has_verified_email": rng.random() < 0.8,
+            "icon_img": ""
+        }}
+
+    def subreddit_search(self, params: Dict[str, str]) -> Dict[str, Any]:
+        query = params.get("q", "sub")
+        limit = max(1, min(int(params.get("limit", 25)), 100))
+        return _listing([self.about(f"{query.replace(' ', '')}{i}") for i in range(limit)])
+
+    def _comment(self, rng: random.Random, comment_id: str, parent: str, level: int) -> Dict[str, Any]:
+        replies = ""
+        if level < self.depth and self.replies:
+            replies = _listing([self._comment(rng, f"{comment_id}{_base36(i)}", f"t1_{comment_id}", level + 1)
+                                for i in range(self.replies)])
+        return {"kind": "t1", "data": {
+            "id": comment_id,
+            "name": f"t1_{comment_id}",
+            "author": f"user{rng.randint(1, 5000)}",
+            "body": _sentence(rng, self.body_words),
+            "score": rng.randint(-5, 500),
+            "created_utc": self.now - rng.randint(0, 86400),
+            "edited": False,
+            "parent_id": parent,
+            "replies": replies
+        }}
+
+    def thread(self, subreddit: str, post_id: str) -> List[Dict[str, Any]]:
+        """A post and its comment tree, as returned by /comments/<id>.json"""
+        post = self.post(subreddit, self._index_of(post_id))
+        # Keep the requested id even if it wasn't one of ours
+        post["data"]["id"] = post_id
+        post["data"]["name"] = f"t3_{post_id}"
+        rng = random.Random(f"comments/{post_id}")
+        tree = [self._comment(rng, f"{post_id}{_base36(i)}", f"t3_{post_id}", 0)
+                for i in range(self.comments)]
+        return [_listing([post]), _listing(tree)]
+
+    def respond(self, path: str, params: Dict[str, str]) -> Tuple[int, Any]:
+        """Status and JSON body for a request path"""
+        parts = [part for part in path.split("/") if part]
+        if parts and parts[-1].endswith(".json"):
+            parts[-1] = parts[-1][:-len(".json")]
+        if parts == ["search"]:
+            return 200, self.search(None, params)
+        if parts == ["subreddits", "search"]:
+            return 200, self.subreddit_search(params)
+        if len(parts) == 3 and parts[0] == "user" and parts[2] == "about":
+            user = self.user(parts[1])
+            if user is None:
+                return 404, {"message": "Not Found", "error": 404}
+            return 200, user
+        if len(parts) >= 2 and parts[0] == "r":
+            subreddit = parts[1]
+            rest = parts[2:]
+            if not rest:
+                return 200, self.listing(subreddit, params, f"{subreddit}/hot")
+            if rest == ["search"]:
+                return 200, self.search(subreddit, params)
+            if rest == ["about"]:
+                return 200, self.about(subreddit)
+            if rest[0] == "comments" and len(rest) >= 2:
+                return 200, self.thread(subreddit, rest[1])
+            if len(rest) == 1:
+                # Each sort is its own listing, except that `new` is the canonical order
+                sort = rest[0]
+                return 200, self.listing(subreddit, params, subreddit if sort == "new" else f"{subreddit}/{sort}")
+        return 404, {"message": "Not Found", "error": 404}
+
+
+class Recordings:
+    """Responses saved by --record, one JSON file per request"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + ".json")
+
+    def save(self, key: str, status: int, body: bytes) -> None:
+        path = self._path(key)
+        with open(path + ".tmp", "w") as f:
+            json.dump({"request": key, "status": status, "body": body.decode("utf-8", "replace")}, f)
+        os.replace(path + ".tmp", path)
+
+    def load(self, key: str) -> Optional[Tuple[int, bytes]]:
+        try:
+            with open(self._path(key)) as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return None
+        return saved["status"], saved["body"].encode()
+
+
+def request_key(path: str, params: Dict[str, str]) -> str:
+    """A request's path and query, independent of parameter order"""
+    query = urlencode(sorted(params.items()))
+    return f"{path.rstrip('/').lower()}?{query}" if query else path.rstrip("/").lower()
+
+
+class StubServer:
+    """
+    The stub's HTTP server, in synthetic, record or replay mode
+
+    Every response is delayed by `latency` plus up to `jitter` seconds.
+    """
+
+    def __init__(self, reddit: Optional[SyntheticReddit] = None, record: Optional[str] = None,
+                 replay: Optional[str] = None, upstream: str = "https://www.reddit.com",
+                 latency: float = 0.0, jitter: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self.reddit = reddit or SyntheticReddit()
+        self.recordings = Recordings(record or replay) if record or replay else None
+        self.recording = bool(record)
+        self.upstream = upstream.rstrip("/")
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self._session = None
+        self._lock = threading.Lock()
+        # Synthetic bodies are cheap to cache and the stub shouldn't be the bottleneck
+        self._synthetic = lru_cache(maxsize=1024)(self._render_synthetic)
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                split = urlsplit(self.path)
+                status, body = stub.handle(split.path, dict(parse_qsl(split.query)))
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=UTF-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _render_synthetic(self, key: str) -> Tuple[int, bytes]:
+        path, _, query = key.partition("?")
+        status, body = self.reddit.respond(path, dict(parse_qsl(query)))
+        return status, json.dumps(body).encode()
+
+    def _forward(self, path: str, params: Dict[str, str]) -> Tuple[int, bytes]:
+        import requests
+        if self._session is None:
+            self._session = requests.Session()
+            self._session.headers["User-Agent"] = "reddit-stub-recorder/1.0"
+        response = self._session.get(f"{self.upstream}{path}", params=params, timeout=30)
+        return response.status_code, response.content
+
+    def handle(self, path: str, params: Dict[str, str]) -> Tuple[int, bytes]:
+        with self._lock:
+            self.requests += 1
+        key = request_key(path, params)
+        if self.recording:
+            status, body = self._forward(path, params)
+            self.recordings.save(key, status, body)
+            return status, body
+
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            time.sleep(delay)
+        if self.recordings is not None:
+            saved = self.recordings.load(key)
+            return saved if saved is not None else (404, b'{"message": "Not recorded", "error": 404}')
+        return self._synthetic(key)
+
+    def start(self) -> "StubServer":
+        """Serve in a daemon thread"""
+        threading.Thread(target=self.httpd.serve_forever, name="reddit-stub", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Stub options, shared with the benchmark scripts that start one"""
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before each response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Up to this many extra seconds, at random")
+    parser.add_argument("--listing-size", type=int, default=LISTING_CAP, help="Posts per synthetic listing")
+    parser.add_argument("--comments", type=int, default=50, help="Top-level comments per synthetic thread")
+    parser.add_argument("--replies", type=int, default=2, help="Replies per synthetic comment")
+    parser.add_argument("--depth", type=int, default=3, help="Reply levels in synthetic threads")
+    parser.add_argument("--body-words", type=int, default=30, help="Words per synthetic self-post and comment")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--record", metavar="DIR", help="Forward requests to Reddit and save the responses in DIR")
+    mode.add_argument("--replay", metavar="DIR", help="Serve responses saved by --record from DIR")
+    parser.add_argument("--upstream", default="https://www.reddit.com", help="Where --record forwards requests")
+
+
+def from_arguments(args: argparse.Namespace, host: str = "127.0.0.1", port: int = 0) -> StubServer:
+    reddit = SyntheticReddit(listing_size=args.listing_size, comments=args.comments, replies=args.replies,
+                             depth=args.depth, body_words=args.body_words)
+    return StubServer(reddit, record=args.record, replay=args.replay, upstream=args.upstream,
+                      latency=args.latency, jitter=args.jitter, host=host, port=port)
+
+
+def spawn(args: argparse.Namespace) -> Tuple[subprocess.Popen, str]:
+    """Run the stub in its own process, so it doesn't compete for the GIL; returns it and its URL"""
+    argv = [sys.executable, os.path.abspath(__file__), "--port", "0",
+            "--latency", str(args.latency), "--jitter", str(args.jitter),
+            "--listing-size", str(args.listing_size), "--comments", str(args.comments),
+            "--replies", str(args.replies), "--depth", str(args.depth),
+            "--body-words", str(args.body_words)]
+    if args.record:
+        argv += ["--record", args.record, "--upstream", args.upstream]
+    if args.replay:
+        argv += ["--replay", args.replay]
+    process = subprocess.Popen(argv, stdout=subprocess.PIPE, text=True)
+    url = process.stdout.readline().strip()
+    if not url:
+        process.kill()
+        raise RuntimeError("Reddit stub failed to start")
+    return process, url
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800, help="Port to serve on (0: any free port)")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    stub = from_arguments(args, args.host, args.port)
+    print(stub.url, flush=True)
+    try:
+        stub.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"Served {stub.requests} requests", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,107 @@
+import anyio
+import argparse
+import logging
+import threading
+import time
 from fastmcp import FastMCP
-from tools.reddit_tools import RedditTools
-from typing import Optional
+from fastmcp.server.dependencies import get_context
+from tools.cancellation import CancelToken, run_with_token
+from tools import log_pipeline
+from tools.metrics import Metrics
+from tools.scheduling import DEFAULT_CLIENT, client_scope
+from tools import tracing
+from tools.tracing import span
+from functools import partial
+from typing import Any, Callable, Dict, Hashable, List, Optional
 
 # Initialize the MCP server
 mcp = FastMCP("reddit-mcp")
 
-# Initialize Reddit tools
-reddit_tools = RedditTools()
+# Reddit tools, built on the first tool call so start-up doesn't wait for it
+_reddit_tools = None
+
+# Latency histograms and counters, shared with RedditTools
+registry = Metrics(prefix="reddit_")
+
+# RedditTools options set from the command line
+tools_options = {"metrics": registry}
+
+# Server metrics
+metrics = {"tool_calls": 0, "cancelled": 0, "stale": 0}
+
+# Memory profiler, built by the first memory_profile call
+_memory_profiler = None
+
+# Guards the client's creation and the metrics updated from worker threads
+_lock = threading.Lock()
+
+
+def get_reddit_tools():
+    """Return the shared RedditTools client, creating it on first use"""
+    global _reddit_tools
+    if _reddit_tools is None:
+        # The watchlist warmer and the first tool call may get here together
+        with _lock:
+            if _reddit_tools is None:
+                from tools.reddit_tools import RedditTools
+                _reddit_tools = RedditTools(**tools_options)
+    return _reddit_tools
+
+
+def _client_id() -> Hashable:
+    """Identify the calling client so upstream slots are shared fairly between sessions"""
+    try:
+        return get_context().session_id
+    except RuntimeError:
+        return DEFAULT_CLIENT
+
+
+def _call_as(client_id: Hashable, fn: Callable[..., Any], *args) -> Dict[str, Any]:
+    with client_scope(client_id), get_reddit_tools().tracking_staleness() as staleness, \
+            span("tool_call", tool=fn.__name__):
+        value = fn(*args)
+        with registry.timer("serialize_seconds", kind="tool_result"), span("serialize", kind="tool_result"):
+            result = value.model_dump()
+    if staleness.stale:
+        # Reddit is failing; this came from an expired cache entry
+        with _lock:
+            metrics["stale"] += 1
+        result["stale"] = True
+        result["stale_age_seconds"] = round(staleness.age, 1)
+    return result
+
+
+async def _run_tool(fn: Callable[..., Any], *args) -> Dict[str, Any]:
+    """
+    Run a blocking RedditTools call in a worker thread, returning its result as a dict
+    
+    When the client sends notifications/cancelled the awaiting task is
+    cancelled; the token then aborts the in-flight upstream fetch and any
+    work spawned for it, instead of letting the thread run to completion.
+    """
+    token = CancelToken()
+    metrics["tool_calls"] += 1
+    started = time.perf_counter()
+    registry.add("tool_calls_in_flight", 1)
+    try:
+        return await anyio.to_thread.run_sync(
+            partial(run_with_token, token, _call_as, _client_id(), fn, *args),
+            abandon_on_cancel=True
+        )
+    except anyio.get_cancelled_exc_class():
+        token.cancel()
+        metrics["cancelled"] += 1
+        raise
+    except Exception:
+        registry.inc("tool_errors_total", tool=fn.__name__)
+        raise
+    finally:
+        registry.add("tool_calls_in_flight", -1)
+        registry.observe("tool_call_seconds", time.perf_counter() - started, tool=fn.__name__)
 
 
 @mcp.tool()
-def get_reddit_posts(
+async def get_reddit_posts(
     subreddit: str,
     sort: str = "hot",
     limit: int = 25,
@@ -30,12 +121,12 @@ def get_reddit_posts(
     Returns:
         Dictionary containing posts and pagination info
     """
-    result = reddit_tools.get_reddit_post(subreddit, sort, limit, time, after)
-    return result.model_dump()
+    result = await _run_tool(get_reddit_tools().get_reddit_post, subreddit, sort, limit, time, after)
+    return result
 
 
 @mcp.tool()
-def search_reddit_posts(
+async def search_reddit_posts(
     query: str,
     subreddit: Optional[str] = None,
     sort: str = "relevance",
@@ -55,12 +146,12 @@ def search_reddit_posts(
     Returns:
         Dictionary containing search results
     """
-    result = reddit_tools.search_post(query, subreddit, sort, limit, time)
-    return result.model_dump()
+    result = await _run_tool(get_reddit_tools().search_post, query, subreddit, sort, limit, time)
+    return result
 
 
 @mcp.tool()
-def search_subreddits(query: str, limit: int = 25) -> dict:
+async def search_subreddits(query: str, limit: int = 25) -> dict:
     """
     Search for subreddits by name or description
     
@@ -71,12 +162,12 @@ def search_subreddits(query: str, limit: int = 25) -> dict:
     Returns:
         Dictionary containing matching subreddits
     """
-    result = reddit_tools.search_subreddits(query, limit)
-    return result.model_dump()
+    result = await _run_tool(get_reddit_tools().search_subreddits, query, limit)
+    return result
 
 
 @mcp.tool()
-def get_subreddit_info(subreddit: str) -> dict:
+async def get_subreddit_info(subreddit: str) -> dict:
     """
     Get detailed information about a specific subreddit
     
@@ -86,12 +177,38 @@ def get_subreddit_info(subreddit: str) -> dict:
     Returns:
         Dictionary containing subreddit metadata including description, subscriber count, etc.
     """
-    result = reddit_tools.get_subreddit_about(subreddit)
-    return result.model_dump()
+    result = await _run_tool(get_reddit_tools().get_subreddit_about, subreddit)
+    return result
 
 
 @mcp.tool()
-def get_popular_posts(limit: int = 25, geo_filter: Optional[str] = None) -> dict:
+async def get_post_with_comments(
+    subreddit: str,
+    post_id: str,
+    sort: str = "best",
+    limit: int = 10,
+    with_authors: bool = False
+) -> dict:
+    """
+    Get a specific Reddit post with its comments
+    
+    Args:
+        subreddit: Name of the subreddit
+        post_id: ID of the post
+        sort: Comment sort method - best, top, new, controversial, old, qa (default: best)
+        limit: Number of top-level comments, max 50 (default: 10)
+        with_authors: Add the karma and account age of every author in the thread (default: false)
+    
+    Returns:
+        Dictionary containing the post, its comments and, if asked for, their authors
+    """
+    result = await _run_tool(get_reddit_tools().get_post_with_comments, subreddit, post_id, sort,
+                             min(limit, 50), with_authors)
+    return result
+
+
+@mcp.tool()
+async def get_popular_posts(limit: int = 25, geo_filter: Optional[str] = None) -> dict:
     """
     Get popular posts from across Reddit
     
@@ -102,12 +219,12 @@ def get_popular_posts(limit: int = 25, geo_filter: Optional[str] = None) -> dict
     Returns:
         Dictionary containing popular posts
     """
-    result = reddit_tools.get_popular_post(limit, geo_filter)
-    return result.model_dump()
+    result = await _run_tool(get_reddit_tools().get_popular_post, limit, geo_filter)
+    return result
 
 
 @mcp.tool()
-def get_all_posts(
+async def get_all_posts(
     sort: str = "hot",
     limit: int = 25,
     time: str = "day",
@@ -125,10 +242,235 @@ def get_all_posts(
     Returns:
         Dictionary containing posts from r/all
     """
-    result = reddit_tools.get_all_post(sort, limit, time, after)
-    return result.model_dump()
+    result = await _run_tool(get_reddit_tools().get_all_post, sort, limit, time, after)
+    return result
+
+
+@mcp.tool()
+async def analyze_reddit_posts(
+    subreddit: Optional[str] = None,
+    query: Optional[str] = None,
+    sort: str = "new",
+    time: str = "day",
+    limit: int = 500,
+    top_n: int = 10,
+    include_selftext: bool = False
+) -> dict:
+    """
+    Compute aggregates over a subreddit listing or search results server-side
+    
+    Args:
+        subreddit: Subreddit to analyze; r/all when omitted without a query
+        query: Analyze search results for this query instead of a listing (optional)
+        sort: Sort method - 'hot', 'new', 'top', 'rising' for listings; with a query 'relevance', 'hot', 'top', 'new', 'comments' (default: 'new')
+        time: Time period for top posts and searches - 'hour', 'day', 'week', 'month', 'year', 'all' (default: 'day')
+        limit: Number of posts to analyze, max 1000 (default: 500)
+        top_n: Number of top authors and keywords to return (default: 10)
+        include_selftext: Count keywords in post bodies as well as titles (default: False)
+    
+    Returns:
+        Dictionary with top authors, score and comment percentiles, posts per UTC hour and top keywords
+    """
+    result = await _run_tool(get_reddit_tools().analyze_posts, subreddit, query, sort, time, limit, top_n,
+                             include_selftext)
+    return result
+
+
+@mcp.tool()
+async def get_deduplicated_posts(
+    subreddits: Optional[List[str]] = None,
+    query: Optional[str] = None,
+    sort: str = "hot",
+    time: str = "day",
+    limit: int = 100,
+    threshold: float = 0.7
+) -> dict:
+    """
+    Get posts from several subreddits or a search with duplicates collapsed into clusters
+    
+    Args:
+        subreddits: Subreddits to combine; r/all when omitted without a query
+        query: Search for this query instead, across the subreddits if given (optional)
+        sort: Sort method - 'hot', 'new', 'top', 'rising' for listings; with a query 'relevance', 'hot', 'top', 'new', 'comments' (default: 'hot')
+        time: Time period for top posts and searches - 'hour', 'day', 'week', 'month', 'year', 'all' (default: 'day')
+        limit: Number of posts to fetch before clustering, max 1000 (default: 100)
+        threshold: Title/text similarity needed to merge posts, 0-1 (default: 0.7)
+    
+    Returns:
+        Dictionary of clusters, each a post plus references to its duplicates and crossposts
+    """
+    result = await _run_tool(get_reddit_tools().get_deduplicated_posts, subreddits, query, sort, time, limit,
+                             threshold)
+    return result
+
+@mcp.tool()
+async def get_rising_terms(
+    hours: float = 6,
+    baseline_hours: float = 48,
+    top_n: int = 20,
+    min_count: int = 3
+) -> dict:
+    """
+    Title terms appearing in more posts recently than in the preceding period
+    
+    Counted across every subreddit listing the server has fetched; makes no Reddit requests.
+    
+    Args:
+        hours: Length of the recent period in hours (default: 6)
+        baseline_hours: Length of the preceding period to compare with (default: 48)
+        top_n: Number of terms to return (default: 20)
+        min_count: Minimum number of recent posts a term must appear in (default: 3)
+    
+    Returns:
+        Dictionary of rising terms with recent and baseline counts and their lift
+    """
+    result = await _run_tool(get_reddit_tools().get_rising_terms, hours, baseline_hours, top_n, min_count)
+    return result
+
+@mcp.tool()
+async def get_posts_in_range(
+    subreddit: str,
+    start: float,
+    end: Optional[float] = None,
+    limit: int = 1000
+) -> dict:
+    """
+    Get a subreddit's posts created between two times
+    
+    Args:
+        subreddit: Name of the subreddit
+        start: Earliest creation time, UTC timestamp
+        end: Latest creation time, UTC timestamp (default: now)
+        limit: Maximum number of posts, max 1000 (default: 1000)
+    
+    Returns:
+        Dictionary containing the posts in the range, newest first
+    """
+    result = await _run_tool(get_reddit_tools().get_posts_in_range, subreddit, start, end, min(limit, 1000))
+    return result
+
+
+
+@mcp.tool()
+async def get_server_stats() -> dict:
+    """
+    Server and upstream statistics
+    
+    Returns:
+        Dictionary with tool call counters, every recorded metric (call and
+        upstream latency histograms, parse and serialize times, response
+        sizes, cache lookups, rate-limit waits, in-flight counts) and the
+        upstream client's cache, scheduler and circuit breaker state, and
+        logging queue, drop and sampling counts
+    """
+    return {
+        "server": dict(metrics),
+        "metrics": registry.snapshot(),
+        "upstream": get_reddit_tools().stats(),
+        "logging": log_pipeline.stats()
+    }
+
+
+@mcp.tool()
+async def memory_profile(action: str = "report", interval: float = 60.0, top: int = 15) -> dict:
+    """
+    Switch memory profiling on or off at runtime, or report on it
+    
+    While on, tracemalloc snapshots are taken every `interval` seconds and
+    live memory is attributed to regions (response bodies, listings,
+    comment trees, caches). Profiling slows the server, so stop it when done.
+    
+    Args:
+        action: "start", "stop", "snapshot" (take one now) or "report" (default: report)
+        interval: Seconds between snapshots, applied on start (default: 60)
+        top: Allocating lines listed (default: 15)
+    
+    Returns:
+        Dictionary with the snapshot history, live bytes per region, the top
+        allocating lines and their growth, and the bytes each cache retains
+    """
+    global _memory_profiler
+    if _memory_profiler is None:
+        from tools.memory_profile import MemoryProfiler
+        tools = get_reddit_tools()
+        _memory_profiler = MemoryProfiler(tools.memory_regions(), tools.memory_usage)
+    # Snapshots and cache walks take a while on a large heap
+    return await anyio.to_thread.run_sync(partial(_memory_profiler.control, action, interval, min(top, 100)))
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reddit MCP server")
+    parser.add_argument("--transport", choices=["stdio", "sse"], default="stdio",
+                        help="stdio for a single client, sse for a shared local server")
+    parser.add_argument("--host", default="127.0.0.1", help="Loopback address for the SSE transport")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the SSE transport")
+    parser.add_argument("--unix-socket", help="Serve the SSE transport on a Unix socket instead")
+    parser.add_argument("--listing-window", type=float, metavar="SECONDS",
+                        help="Keep this much of each subreddit's newest posts locally and "
+                             "answer new/top listings from it")
+    parser.add_argument("--prefetch-comments", type=int, default=0, metavar="K",
+                        help="After serving a listing, prefetch comments of its top K posts "
+                             "(adapted to the observed hit rate)")
+    parser.add_argument("--hedge", action="store_true",
+                        help="Send a second copy of upstream requests slower than their recent p95 "
+                             "(for at most 5%% of requests)")
+    parser.add_argument("--base-url", default="https://www.reddit.com",
+                        help="Reddit API address; point at benchmarks/reddit_stub.py to run offline")
+    parser.add_argument("--requests-per-minute", type=float, default=60.0,
+                        help="Sustained upstream request rate")
+    parser.add_argument("--cache-ttl", type=float, default=60.0,
+                        help="Seconds a fetched result is served from cache")
+    parser.add_argument("--metrics-file", metavar="PATH",
+                        help="Write metrics in the Prometheus text format to this file periodically")
+    parser.add_argument("--metrics-interval", type=float, default=15.0, metavar="SECONDS",
+                        help="How often to rewrite --metrics-file")
+    parser.add_argument("--trace-file", metavar="PATH",
+                        help="Write spans of sampled tool calls to this file (Chrome trace format "
+                             "for a .json path, else JSON lines)")
+    parser.add_argument("--trace-sample", type=float, default=1.0, metavar="RATE",
+                        help="Share of tool calls traced, 0 to 1")
+    parser.add_argument("--trace-min-ms", type=float, default=0.0, metavar="MS",
+                        help="Only write traces of tool calls taking at least this long")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"], default="INFO")
+    parser.add_argument("--log-format", choices=["text", "json"], default="text",
+                        help="Log lines as text or as one JSON object each")
+    parser.add_argument("--log-sample", action="append", metavar="CATEGORY=RATE",
+                        help="Log only this share of a category's events, e.g. request=0.01 "
+                             "(categories: request, cancel, tool_error, session)")
+    parser.add_argument("--watchlist", metavar="PATH",
+                        help="JSON watchlist of listings, searches and subreddits to pre-fetch "
+                             "at startup and keep refreshed")
+    args = parser.parse_args()
+    log_pipeline.configure(getattr(logging, args.log_level), args.log_format,
+                           log_pipeline.parse_sample_rates(args.log_sample))
+    tools_options["listing_window"] = args.listing_window
+    tools_options["prefetch_comments"] = args.prefetch_comments
+    tools_options["hedge"] = args.hedge
+    tools_options["base_url"] = args.base_url
+    tools_options["requests_per_minute"] = args.requests_per_minute
+    tools_options["cache_ttl"] = args.cache_ttl
+    if args.metrics_file:
+        registry.start_dump(args.metrics_file, args.metrics_interval)
+    if args.trace_file:
+        tracing.configure(args.trace_file, args.trace_sample, args.trace_min_ms / 1000)
+    
+    if args.watchlist:
+        # Warm the cache in the background; the server answers right away
+        def warm():
+            from tools.warming import CacheWarmer, Watchlist
+            CacheWarmer(get_reddit_tools(), Watchlist.load(args.watchlist)).run()
+        
+        threading.Thread(target=warm, name="cache-warmer", daemon=True).start()
+    
     # Run the MCP server
-    mcp.run()
\ No newline at end of file
+    if args.transport == "sse":
+        # One long-running process: every client shares one RedditTools' connection
+        # pool, cache and rate limiter
+        if args.unix_socket:
+            mcp.run(transport="sse", uvicorn_config={"uds": args.unix_socket})
+        else:
+            mcp.run(transport="sse", host=args.host, port=args.port)
+    else:
+        mcp.run()
+    tracing.shutdown()
+    log_pipeline.shutdown()
\ No newline at end of file
@@ -1,21 +1,71 @@
 #!/usr/bin/env python3
 """
-Simple CLI to fetch a specific Reddit post using the Reddit tools
+Bulk-export Reddit posts and subreddit listings as NDJSON
+
+Reads one item per line from a file or stdin:
+
+    AngionMethod/fwqiri                                  a post with its comments
+    https://www.reddit.com/r/AngionMethod/comments/fwqiri/...
+    r/python                                             a subreddit's listing
+    python
+
+and writes one JSON line per item as soon as it is fetched, in completion
+order: {"item": ..., "result": ...} or {"item": ..., "error": ...}. Each
+item is a single request. Only a bounded number of items are read ahead of
+the output, so memory stays flat however long the input is.
+
+    python reddit_cli.py posts.txt --concurrency 8 --output export.ndjson.gz
+    cat subreddits.txt | python reddit_cli.py - --sort new --limit 100 --gzip > new.ndjson.gz
 """
 
+import argparse
+import gzip
 import json
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import IO, Any, Dict, Iterable, Iterator, Optional, Set, Tuple
 from tools.reddit_tools import RedditTools
+from tools.scheduling import Priority, client_scope, priority_scope
+
+# A post as a permalink, sub/id or "sub id"; anything else names a subreddit
+_POST_URL = re.compile(r"/r/([^/\s]+)/comments/([a-z0-9]+)", re.IGNORECASE)
+_POST_PAIR = re.compile(r"^(?:/?r/)?([^/\s]+)[/\s]+([a-z0-9]+)/?$", re.IGNORECASE)
+_SUBREDDIT = re.compile(r"^(?:/?r/)?([^/\s]+)/?$", re.IGNORECASE)
+
+
+def parse_item(line: str) -> Optional[Tuple[str, str, Optional[str]]]:
+    """
+    Parse an input line into ("post", subreddit, post_id) or ("subreddit", name, None)
+
+    Blank lines and lines starting with # are skipped (None).
+    """
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    match = _POST_URL.search(line)
+    if match:
+        return "post", match.group(1), match.group(2)
+    # Before pairs, or "r/python" would read as post "python" in r/r
+    match = _SUBREDDIT.match(line)
+    if match:
+        return "subreddit", match.group(1), None
+    match = _POST_PAIR.match(line)
+    if match:
+        return "post", match.group(1), match.group(2)
+    raise ValueError(f"Not a post or subreddit: {line}")
+
+
+def fetch_reddit_post(subreddit: str, post_id: str, reddit_tools: Optional[RedditTools] = None,
+                      top_comments: int = 3) -> Dict[str, Any]:
+    """Fetch a specific Reddit post and its top comments, in one request"""
+    reddit_tools = reddit_tools or RedditTools()
 
-def fetch_reddit_post(subreddit: str, post_id: str):
-    """Fetch a specific Reddit post and its comments"""
-    reddit_tools = RedditTools()
-    
     try:
-        # Get the post by ID
-        post = reddit_tools.get_post_by_id(subreddit, post_id)
-        
-        # Create a formatted output
-        output = {
+        thread = reddit_tools.get_post_with_comments(subreddit, post_id, limit=max(top_comments, 1))
+        post = thread.post
+        return {
             "post": {
                 "title": post.title,
                 "author": post.author,
@@ -26,43 +76,147 @@ def fetch_reddit_post(subreddit: str, post_id: str):
                 "url": post.url,
                 "permalink": post.permalink,
                 "content": post.selftext
-            }
+            },
+            "top_comments": [
+                {
+                    "author": comment.author,
+                    "score": comment.score,
+                    "body": comment.body,
+                    "created": comment.created_utc
+                }
+                for comment in thread.comments[:top_comments] if comment.body
+            ]
         }
-        
-        # Note: The current implementation doesn't fetch comments directly,
-        # but we can get the full thread data including comments
-        url = f"https://www.reddit.com/r/{subreddit}/comments/{post_id}.json"
-        params = {"raw_json": 1}
-        headers = {"User-Agent": reddit_tools.get_user_agent()}
-        
-        import requests
-        response = requests.get(url, headers=headers, params=params)
-        data = response.json()
-        
-        # Extract comments if available
-        if len(data) > 1:
-            comments_data = data[1].get("data", {}).get("children", [])
-            comments = []
-            
-            for comment_data in comments_data[:3]:  # Get top 3 comments
-                if comment_data.get("kind") == "t1":  # t1 is comment type
-                    comment = comment_data.get("data", {})
-                    if comment.get("body"):
-                        comments.append({
-                            "author": comment.get("author", "[deleted]"),
-                            "score": comment.get("score", 0),
-                            "body": comment.get("body", ""),
-                            "created": comment.get("created_utc", 0)
-                        })
-            
-            output["top_comments"] = comments
-        
-        return output
-        
+
     except Exception as e:
         return {"error": str(e)}
 
+
+def export_item(reddit_tools: RedditTools, item: Tuple[str, str, Optional[str]], line: str,
+                args: argparse.Namespace) -> Tuple[str, bool]:
+    """Fetch one item and return its output line, and whether it succeeded"""
+    kind, name, post_id = item
+    try:
+        # Results come back as JSON text, never built into models. An export
+        # is bulk work: interactive calls sharing the client go first
+        with reddit_tools.rendering(indent=None), client_scope("exporter"), \
+                priority_scope(Priority.BULK):
+            if kind == "post":
+                text = reddit_tools.get_post_with_comments(name, post_id, sort=args.comment_sort,
+                                                           limit=args.comments, with_authors=args.authors)
+            else:
+                text = reddit_tools.get_reddit_post(name, sort=args.sort, limit=args.limit, time=args.time)
+        return f'{{"item": {json.dumps(line)}, "result": {text}}}\n', True
+    except Exception as e:
+        return json.dumps({"item": line, "error": str(e)}) + "\n", False
+
+
+def read_items(lines: Iterable[str]) -> Iterator[Tuple[Tuple[str, str, Optional[str]], str]]:
+    """Parsed items with their input lines; unparseable lines are reported and skipped"""
+    for number, line in enumerate(lines, 1):
+        try:
+            item = parse_item(line)
+        except ValueError as e:
+            print(f"line {number}: {e}", file=sys.stderr)
+            continue
+        if item is not None:
+            yield item, line.strip()
+
+
+def export(reddit_tools: RedditTools, lines: Iterable[str], out: IO[str], args: argparse.Namespace) -> Dict[str, int]:
+    """
+    Export every item in `lines` to `out` with bounded concurrency
+
+    At most 2 x `args.concurrency` items are in flight or waiting to be
+    written, which keeps workers busy while bounding memory.
+
+    Returns:
+        Counts of items exported and failed
+    """
+    counts = {"items": 0, "errors": 0}
+    pending: Set[Future] = set()
+
+    def drain() -> None:
+        nonlocal pending
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            line, ok = future.result()
+            out.write(line)
+            counts["items"] += 1
+            if not ok:
+                counts["errors"] += 1
+
+    with ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="export") as executor:
+        try:
+            for item, line in read_items(lines):
+                if len(pending) >= 2 * args.concurrency:
+                    drain()
+                pending.add(executor.submit(export_item, reddit_tools, item, line, args))
+            while pending:
+                drain()
+        except KeyboardInterrupt:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+    return counts
+
+
+def open_output(path: Optional[str], compress: bool) -> IO[str]:
+    """The output stream: a file or stdout, gzip-compressed if asked or named .gz"""
+    if path is None or path == "-":
+        if compress:
+            return gzip.open(sys.stdout.buffer, "wt", encoding="utf-8")
+        return sys.stdout
+    if compress or path.endswith(".gz"):
+        return gzip.open(path, "wt", encoding="utf-8")
+    return open(path, "w", encoding="utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input", nargs="?", default="-",
+                        help="File of posts and subreddits, one per line (default: stdin)")
+    parser.add_argument("--output", "-o", metavar="PATH", help="NDJSON file to write (default: stdout)")
+    parser.add_argument("--gzip", action="store_true", help="Compress the output (implied by a .gz path)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Items fetched at once")
+    parser.add_argument("--requests-per-minute", type=float, default=60.0, help="Upstream rate limit")
+    parser.add_argument("--sort", choices=["hot", "new", "top", "rising"], default="hot",
+                        help="Listing sort for subreddit items")
+    parser.add_argument("--time", choices=["hour", "day", "week", "month", "year", "all"], default="day",
+                        help="Period for --sort top")
+    parser.add_argument("--limit", type=int, default=100, help="Posts per subreddit, max 100")
+    parser.add_argument("--comments", type=int, default=10, help="Top-level comments per post")
+    parser.add_argument("--comment-sort", default="best",
+                        choices=["best", "top", "new", "controversial", "old", "qa"])
+    parser.add_argument("--authors", action="store_true",
+                        help="Add the karma and account age of each post's and comment's author")
+    parser.add_argument("--offload-threshold", type=int, metavar="BYTES",
+                        help="Decode, parse and serialize responses of at least this size in worker processes")
+    parser.add_argument("--base-url", default="https://www.reddit.com",
+                        help="Reddit API base URL, e.g. a local stub")
+    args = parser.parse_args()
+
+    # Nothing is fetched twice in an export, so the cache only needs to hold
+    # results in flight
+    reddit_tools = RedditTools(cache_ttl=0, requests_per_minute=args.requests_per_minute,
+                               max_connections=args.concurrency, base_url=args.base_url,
+                               max_cache_entries=args.concurrency, max_stored_posts=20_000,
+                               offload_threshold=args.offload_threshold)
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    out = open_output(args.output, args.gzip)
+    started = time.monotonic()
+    try:
+        counts = export(reddit_tools, source, out, args)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        else:
+            out.flush()
+        if source is not sys.stdin:
+            source.close()
+        reddit_tools.close()
+    print(f"Exported {counts['items']} items ({counts['errors']} failed) in "
+          f"{time.monotonic() - started:.1f}s", file=sys.stderr)
+
+
 if __name__ == "__main__":
-    # Fetch the SABRE techniques post
-    result = fetch_reddit_post("AngionMethod", "fwqiri")
-    print(json.dumps(result, indent=2))
\ No newline at end of file
+    main()
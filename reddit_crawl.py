@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Crawl subreddit listings into NDJSON, resuming where an earlier run stopped
+
+    python reddit_crawl.py python rust golang --output crawl.ndjson --max-pages 10
+    python reddit_crawl.py --subreddits-file subs.txt --output crawl.ndjson
+
+Every page is committed to crawl.ndjson.journal once its posts are written.
+Run the same command again after a crash, a restart or a give-up on
+throttling: finished pages are skipped, and each post is written exactly once.
+"""
+
+import argparse
+import json
+import logging
+import sys
+from tools.crawl import Crawler
+from tools.reddit_tools import RedditTools
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("subreddits", nargs="*", help="Subreddits to crawl")
+    parser.add_argument("--subreddits-file", metavar="PATH", help="File of subreddits, one per line")
+    parser.add_argument("--output", "-o", required=True, metavar="PATH", help="NDJSON file of posts")
+    parser.add_argument("--journal", metavar="PATH", help="Journal file (default: OUTPUT.journal)")
+    parser.add_argument("--sort", choices=["new", "hot", "top", "rising"], default="new")
+    parser.add_argument("--time", choices=["hour", "day", "week", "month", "year", "all"], default="all",
+                        help="Period for --sort top")
+    parser.add_argument("--max-pages", type=int, help="Pages of 100 posts per subreddit (default: all)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Subreddits crawled at once")
+    parser.add_argument("--requests-per-minute", type=float, default=60.0, help="Upstream rate limit")
+    parser.add_argument("--no-sync", action="store_true",
+                        help="Don't fsync after each page (faster; a crash of the machine may lose pages)")
+    parser.add_argument("--base-url", default="https://www.reddit.com",
+                        help="Reddit API base URL, e.g. a local stub")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    subreddits = list(args.subreddits)
+    if args.subreddits_file:
+        with open(args.subreddits_file, encoding="utf-8") as f:
+            subreddits += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    if not subreddits:
+        parser.error("no subreddits given")
+
+    # Every page is fetched once, so there is nothing to cache
+    reddit_tools = RedditTools(cache_ttl=0, requests_per_minute=args.requests_per_minute,
+                               max_connections=args.concurrency, base_url=args.base_url,
+                               max_cache_entries=args.concurrency)
+    crawler = Crawler(reddit_tools, args.output, args.journal, sort=args.sort, time_filter=args.time,
+                      max_pages=args.max_pages, concurrency=args.concurrency, sync=not args.no_sync)
+    try:
+        result = crawler.run(subreddits)
+    finally:
+        crawler.close()
+        reddit_tools.close()
+    print(json.dumps(result, indent=2))
+    sys.exit(1 if result["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
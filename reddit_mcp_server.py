@@ -6,37 +6,275 @@ Reddit MCP Server - A simple MCP server for Reddit API access
 import sys
 import json
 import logging
-from typing import Any, Dict, List, Optional
-from tools.reddit_tools import RedditTools
+import argparse
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Union
+from tools.cancellation import CancelToken, RequestCancelled, cancel_scope
+from tools import log_pipeline
+from tools.log_pipeline import event
+from tools.metrics import Metrics
+from tools.scheduling import DEFAULT_CLIENT, FairExecutor, client_scope, current_client
+from tools import tracing
+from tools.tracing import span
 
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Initialize Reddit tools
-reddit_tools = RedditTools()
+TOOLS = [
+    {
+        "name": "get_reddit_posts",
+        "description": "Get posts from a specific subreddit",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "subreddit": {"type": "string", "description": "Name of the subreddit"},
+                "sort": {"type": "string", "enum": ["hot", "new", "top", "rising"], "default": "hot"},
+                "limit": {"type": "integer", "minimum": 1, "maximum": 100, "default": 25},
+                "time": {"type": "string", "enum": ["hour", "day", "week", "month", "year", "all"], "default": "day"},
+                "after": {"type": "string", "description": "Pagination token"}
+            },
+            "required": ["subreddit"]
+        }
+    },
+    {
+        "name": "search_reddit_posts",
+        "description": "Search for posts across Reddit",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "query": {"type": "string", "description": "Search query"},
+                "subreddit": {"type": "string", "description": "Limit to specific subreddit"},
+                "sort": {"type": "string", "enum": ["relevance", "hot", "top", "new", "comments"], "default": "relevance"},
+                "limit": {"type": "integer", "minimum": 1, "maximum": 100, "default": 25},
+                "time": {"type": "string", "enum": ["hour", "day", "week", "month", "year", "all"], "default": "all"}
+            },
+            "required": ["query"]
+        }
+    },
+    {
+        "name": "search_subreddits",
+        "description": "Search for subreddits by name or description",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "query": {"type": "string", "description": "Search query"},
+                "limit": {"type": "integer", "minimum": 1, "maximum": 100, "default": 25}
+            },
+            "required": ["query"]
+        }
+    },
+    {
+        "name": "get_subreddit_info",
+        "description": "Get detailed information about a subreddit",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "subreddit": {"type": "string", "description": "Name of the subreddit"}
+            },
+            "required": ["subreddit"]
+        }
+    },
+    {
+        "name": "get_post_with_comments",
+        "description": "Get a specific Reddit post with its comments",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "subreddit": {"type": "string", "description": "Name of the subreddit"},
+                "post_id": {"type": "string", "description": "ID of the post"},
+                "sort": {"type": "string", "enum": ["best", "top", "new", "controversial", "old", "qa"], "default": "best"},
+                "limit": {"type": "integer", "minimum": 1, "maximum": 50, "default": 10},
+                "with_authors": {"type": "boolean", "default": False,
+                                 "description": "Add the karma and account age of every author in the thread"}
+            },
+            "required": ["subreddit", "post_id"]
+        }
+    },
+    {
+        "name": "analyze_reddit_posts",
+        "description": "Compute aggregates (top authors, score percentiles, posts per hour, top keywords) over a subreddit listing or search results, returning only the summary",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "subreddit": {"type": "string", "description": "Subreddit to analyze (r/all if omitted)"},
+                "query": {"type": "string", "description": "Analyze search results for this query instead"},
+                "sort": {"type": "string", "enum": ["hot", "new", "top", "rising", "relevance", "comments"], "default": "new",
+                         "description": "Listings take hot, new, top or rising; searches (with a query) take relevance, hot, top, new or comments"},
+                "time": {"type": "string", "enum": ["hour", "day", "week", "month", "year", "all"], "default": "day"},
+                "limit": {"type": "integer", "minimum": 1, "maximum": 1000, "default": 500},
+                "top_n": {"type": "integer", "minimum": 1, "maximum": 100, "default": 10},
+                "include_selftext": {"type": "boolean", "default": False}
+            }
+        }
+    },
+    {
+        "name": "get_deduplicated_posts",
+        "description": "Get posts from several subreddits or a search with duplicate links, crossposts and near-identical posts collapsed into clusters",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "subreddits": {"type": "array", "items": {"type": "string"}, "description": "Subreddits to combine (r/all if omitted)"},
+                "query": {"type": "string", "description": "Search for this query instead, across the subreddits if given"},
+                "sort": {"type": "string", "enum": ["hot", "new", "top", "rising", "relevance", "comments"], "default": "hot",
+                         "description": "Listings take hot, new, top or rising; searches (with a query) take relevance, hot, top, new or comments"},
+                "time": {"type": "string", "enum": ["hour", "day", "week", "month", "year", "all"], "default": "day"},
+                "limit": {"type": "integer", "minimum": 1, "maximum": 1000, "default": 100},
+                "threshold": {"type": "number", "minimum": 0, "maximum": 1, "default": 0.7}
+            }
+        }
+    },
+    {
+        "name": "get_rising_terms",
+        "description": "Title terms appearing in more posts recently than in the preceding period, across every subreddit the server has fetched",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "hours": {"type": "number", "minimum": 1, "maximum": 72, "default": 6},
+                "baseline_hours": {"type": "number", "minimum": 1, "maximum": 144, "default": 48},
+                "top_n": {"type": "integer", "minimum": 1, "maximum": 100, "default": 20},
+                "min_count": {"type": "integer", "minimum": 1, "default": 3}
+            }
+        }
+    },
+    {
+        "name": "get_posts_in_range",
+        "description": "Get a subreddit's posts created between two times, newest first",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "subreddit": {"type": "string", "description": "Name of the subreddit"},
+                "start": {"type": "number", "description": "Earliest creation time, UTC timestamp"},
+                "end": {"type": "number", "description": "Latest creation time, UTC timestamp (default: now)"},
+                "limit": {"type": "integer", "minimum": 1, "maximum": 1000, "default": 1000}
+            },
+            "required": ["subreddit", "start"]
+        }
+    },
+    {
+        "name": "get_server_stats",
+        "description": "Server and upstream statistics: call and upstream latency histograms, parse and serialize times, response sizes, cache hit ratios, rate-limit waits and in-flight counts",
+        "inputSchema": {
+            "type": "object",
+            "properties": {}
+        }
+    },
+    {
+        "name": "memory_profile",
+        "description": "Switch memory profiling on or off at runtime, or report on it: periodic tracemalloc snapshots with live memory by region (response bodies, listings, comment trees, caches), the top allocating lines, their growth, and the bytes each cache retains. Slows the server while on",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "action": {"type": "string", "enum": ["start", "stop", "snapshot", "report"], "default": "report"},
+                "interval": {"type": "number", "minimum": 1, "description": "Seconds between snapshots, on start", "default": 60},
+                "top": {"type": "integer", "minimum": 1, "maximum": 100, "default": 15}
+            }
+        }
+    }
+]
+
+# tools/list never changes, so its payload is serialized once
+TOOLS_JSON = json.dumps(TOOLS)
+
+# A response that is already serialized JSON, or a dict to serialize
+Response = Union[str, Dict[str, Any]]
+
 
 class RedditMCPServer:
-    def __init__(self):
-        self.reddit_tools = RedditTools()
+    def __init__(self, max_workers: int = 8, watchlist: Optional[str] = None, **tools_options):
+        """
+        Args:
+            max_workers: Tool calls run at once
+            watchlist: JSON watchlist of listings and searches to keep warm in the cache
+            tools_options: Keyword arguments for the shared RedditTools client
+        """
+        # Shared with RedditTools, so one registry holds every metric
+        self.registry = Metrics(prefix="reddit_")
+        self.tools_options = {"metrics": self.registry, **tools_options}
+        self.watchlist = watchlist
+        self._warmer = None
+        # Built on the first tool call: importing pydantic and requests and
+        # setting up the client would otherwise delay the initialize response
+        self._reddit_tools = None
+        self._memory_profiler = None
+        # Tool calls are queued per client and served round-robin, so one
+        # heavy client can't starve the others
+        self.executor = FairExecutor(max_workers=max_workers, thread_name_prefix="tool-call")
+        self.metrics = {"requests": 0, "tool_calls": 0, "cancelled": 0, "errors": 0, "stale": 0}
+        self._pending: Dict[Any, CancelToken] = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+    
+    @property
+    def reddit_tools(self):
+        """The server's shared RedditTools client, created on first use"""
+        if self._reddit_tools is None:
+            with self._lock:
+                if self._reddit_tools is None:
+                    from tools.reddit_tools import RedditTools
+                    self._reddit_tools = RedditTools(**self.tools_options)
+        return self._reddit_tools
     
-    def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
-        """Handle incoming MCP requests"""
+    @property
+    def memory_profiler(self):
+        """Memory profiler over the shared RedditTools client, created on first use"""
+        tools = self.reddit_tools
+        with self._lock:
+            if self._memory_profiler is None:
+                from tools.memory_profile import MemoryProfiler
+                self._memory_profiler = MemoryProfiler(tools.memory_regions(), tools.memory_usage)
+            return self._memory_profiler
+    
+    def handle_request(self, request: Dict[str, Any],
+                       client_id: Hashable = DEFAULT_CLIENT) -> Optional[Dict[str, Any]]:
+        """Handle incoming MCP requests, returning None for notifications"""
         method = request.get("method", "")
         params = request.get("params", {})
         request_id = request.get("id")
         
-        logger.info(f"Handling request: {method}")
+        event(logger, "request", "Handling request: %s", method)
+        self._count("requests")
         
         if method == "initialize":
             return self._handle_initialize(request_id)
         elif method == "tools/list":
             return self._handle_tools_list(request_id)
         elif method == "tools/call":
-            return self._handle_tool_call(params, request_id)
+            with client_scope(client_id):
+                return self._handle_tool_call(params, request_id, self._track(request_id, client_id))
+        elif method == "notifications/cancelled":
+            self._handle_cancelled(params, client_id)
+            return None
+        elif method.startswith("notifications/"):
+            return None
         else:
             return self._error_response(request_id, -32601, f"Method not found: {method}")
     
+    def _count(self, name: str, amount: int = 1):
+        """Increment a server metric"""
+        with self._lock:
+            self.metrics[name] = self.metrics.get(name, 0) + amount
+    
+    def _track(self, request_id: Any, client_id: Hashable = DEFAULT_CLIENT) -> CancelToken:
+        """Register a cancel token for an in-flight request"""
+        token = CancelToken()
+        if request_id is not None:
+            with self._lock:
+                self._pending[(client_id, request_id)] = token
+        return token
+    
+    def _handle_cancelled(self, params: Dict[str, Any], client_id: Hashable = DEFAULT_CLIENT):
+        """Cancel an in-flight request, aborting its upstream fetches"""
+        request_id = params.get("requestId")
+        with self._lock:
+            token = self._pending.get((client_id, request_id))
+        
+        if token is None:
+            event(logger, "cancel", "Ignoring cancellation for unknown request: %s", request_id)
+            return
+        
+        event(logger, "cancel", "Cancelling request %s: %s", request_id, params.get("reason", "no reason given"))
+        token.cancel()
+    
     def _handle_initialize(self, request_id: Any) -> Dict[str, Any]:
         """Handle initialization request"""
         return {
@@ -56,147 +294,164 @@ class RedditMCPServer:
     
     def _handle_tools_list(self, request_id: Any) -> Dict[str, Any]:
         """Return list of available tools"""
-        tools = [
-            {
-                "name": "get_reddit_posts",
-                "description": "Get posts from a specific subreddit",
-                "inputSchema": {
-                    "type": "object",
-                    "properties": {
-                        "subreddit": {"type": "string", "description": "Name of the subreddit"},
-                        "sort": {"type": "string", "enum": ["hot", "new", "top", "rising"], "default": "hot"},
-                        "limit": {"type": "integer", "minimum": 1, "maximum": 100, "default": 25},
-                        "time": {"type": "string", "enum": ["hour", "day", "week", "month", "year", "all"], "default": "day"},
-                        "after": {"type": "string", "description": "Pagination token"}
-                    },
-                    "required": ["subreddit"]
-                }
-            },
-            {
-                "name": "search_reddit_posts",
-                "description": "Search for posts across Reddit",
-                "inputSchema": {
-                    "type": "object",
-                    "properties": {
-                        "query": {"type": "string", "description": "Search query"},
-                        "subreddit": {"type": "string", "description": "Limit to specific subreddit"},
-                        "sort": {"type": "string", "enum": ["relevance", "hot", "top", "new", "comments"], "default": "relevance"},
-                        "limit": {"type": "integer", "minimum": 1, "maximum": 100, "default": 25},
-                        "time": {"type": "string", "enum": ["hour", "day", "week", "month", "year", "all"], "default": "all"}
-                    },
-                    "required": ["query"]
-                }
-            },
-            {
-                "name": "search_subreddits",
-                "description": "Search for subreddits by name or description",
-                "inputSchema": {
-                    "type": "object",
-                    "properties": {
-                        "query": {"type": "string", "description": "Search query"},
-                        "limit": {"type": "integer", "minimum": 1, "maximum": 100, "default": 25}
-                    },
-                    "required": ["query"]
-                }
-            },
-            {
-                "name": "get_subreddit_info",
-                "description": "Get detailed information about a subreddit",
-                "inputSchema": {
-                    "type": "object",
-                    "properties": {
-                        "subreddit": {"type": "string", "description": "Name of the subreddit"}
-                    },
-                    "required": ["subreddit"]
-                }
-            },
-            {
-                "name": "get_post_with_comments",
-                "description": "Get a specific Reddit post with its comments",
-                "inputSchema": {
-                    "type": "object",
-                    "properties": {
-                        "subreddit": {"type": "string", "description": "Name of the subreddit"},
-                        "post_id": {"type": "string", "description": "ID of the post"},
-                        "sort": {"type": "string", "enum": ["best", "top", "new", "controversial", "old", "qa"], "default": "best"},
-                        "limit": {"type": "integer", "minimum": 1, "maximum": 50, "default": 10}
-                    },
-                    "required": ["subreddit", "post_id"]
-                }
-            }
-        ]
-        
         return {
             "jsonrpc": "2.0",
             "id": request_id,
             "result": {
-                "tools": tools
+                "tools": TOOLS
             }
         }
     
-    def _handle_tool_call(self, params: Dict[str, Any], request_id: Any) -> Dict[str, Any]:
-        """Handle tool execution"""
+    def _handle_tool_call(self, params: Dict[str, Any], request_id: Any,
+                          token: Optional[CancelToken] = None) -> Optional[Dict[str, Any]]:
+        """Handle tool execution, returning None if the request was cancelled"""
         tool_name = params.get("name")
         arguments = params.get("arguments", {})
+        token = token or CancelToken()
+        key = (current_client(), request_id)
+        self._count("tool_calls")
+        started = time.perf_counter()
+        self.registry.add("tool_calls_in_flight", 1)
         
-        try:
-            if tool_name == "get_reddit_posts":
-                result = self.reddit_tools.get_reddit_post(
-                    subreddit=arguments["subreddit"],
-                    sort=arguments.get("sort", "hot"),
-                    limit=arguments.get("limit", 25),
-                    time=arguments.get("time", "day"),
-                    after=arguments.get("after")
-                )
-            elif tool_name == "search_reddit_posts":
-                result = self.reddit_tools.search_post(
-                    query=arguments["query"],
-                    subreddit=arguments.get("subreddit"),
-                    sort=arguments.get("sort", "relevance"),
-                    limit=arguments.get("limit", 25),
-                    time=arguments.get("time", "all")
-                )
-            elif tool_name == "search_subreddits":
-                result = self.reddit_tools.search_subreddits(
-                    query=arguments["query"],
-                    limit=arguments.get("limit", 25)
-                )
-            elif tool_name == "get_subreddit_info":
-                result = self.reddit_tools.get_subreddit_about(
-                    subreddit=arguments["subreddit"]
-                )
-            elif tool_name == "get_post_with_comments":
-                result = self.reddit_tools.get_post_with_comments(
-                    subreddit=arguments["subreddit"],
-                    post_id=arguments["post_id"],
-                    sort=arguments.get("sort", "best"),
-                    limit=arguments.get("limit", 10)
-                )
-            else:
-                return self._error_response(request_id, -32602, f"Unknown tool: {tool_name}")
-            
-            # Convert result to dict if it has model_dump method
-            if hasattr(result, 'model_dump'):
-                result_data = result.model_dump()
-            else:
-                result_data = result
-            
-            return {
-                "jsonrpc": "2.0",
-                "id": request_id,
-                "result": {
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": json.dumps(result_data, indent=2)
-                        }
-                    ]
+        with span("tool_call", tool=tool_name, request_id=request_id):
+            try:
+                token.raise_if_cancelled()
+                # Fetch methods return serialized JSON here; large payloads are
+                # rendered in the offload process pool when it is enabled
+                with cancel_scope(token), self.reddit_tools.rendering(indent=2), \
+                        self.reddit_tools.tracking_staleness() as staleness:
+                    result = self._call_tool(tool_name, arguments)
+                token.raise_if_cancelled()
+                
+                if result is None:
+                    return self._error_response(request_id, -32602, f"Unknown tool: {tool_name}")
+                
+                if isinstance(result, str):
+                    text = result
+                else:
+                    with self.registry.timer("serialize_seconds", kind="tool_result"), \
+                            span("serialize", kind="tool_result"):
+                        if hasattr(result, 'model_dump'):
+                            text = json.dumps(result.model_dump(), indent=2)
+                        else:
+                            text = json.dumps(result, indent=2)
+                
+                response = {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "result": {
+                        "content": [
+                            {
+                                "type": "text",
+                                "text": text
+                            }
+                        ]
+                    }
                 }
-            }
-            
-        except Exception as e:
-            logger.error(f"Error executing tool {tool_name}: {str(e)}")
-            return self._error_response(request_id, -32603, str(e))
+                if staleness.stale:
+                    # Reddit is failing; this came from an expired cache entry
+                    self._count("stale")
+                    response["result"]["_meta"] = {"stale": True, "age_seconds": round(staleness.age, 1)}
+                return response
+                
+            except RequestCancelled:
+                # Cancelled requests get no response
+                event(logger, "cancel", "Tool %s cancelled (request %s)", tool_name, request_id)
+                self._count("cancelled")
+                return None
+            except Exception as e:
+                event(logger, "tool_error", "Error executing tool %s: %s", tool_name, e,
+                      level=logging.ERROR, tool=tool_name, request_id=request_id)
+                self._count("errors")
+                self.registry.inc("tool_errors_total", tool=tool_name)
+                return self._error_response(request_id, -32603, str(e))
+            finally:
+                self.registry.add("tool_calls_in_flight", -1)
+                self.registry.observe("tool_call_seconds", time.perf_counter() - started, tool=tool_name)
+                with self._lock:
+                    if self._pending.get(key) is token:
+                        del self._pending[key]
+    
+    def _call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Any:
+        """Dispatch a tool call to RedditTools, returning None for unknown tools"""
+        if tool_name == "get_reddit_posts":
+            result = self.reddit_tools.get_reddit_post(
+                subreddit=arguments["subreddit"],
+                sort=arguments.get("sort", "hot"),
+                limit=arguments.get("limit", 25),
+                time=arguments.get("time", "day"),
+                after=arguments.get("after")
+            )
+        elif tool_name == "search_reddit_posts":
+            result = self.reddit_tools.search_post(
+                query=arguments["query"],
+                subreddit=arguments.get("subreddit"),
+                sort=arguments.get("sort", "relevance"),
+                limit=arguments.get("limit", 25),
+                time=arguments.get("time", "all")
+            )
+        elif tool_name == "search_subreddits":
+            result = self.reddit_tools.search_subreddits(
+                query=arguments["query"],
+                limit=arguments.get("limit", 25)
+            )
+        elif tool_name == "get_subreddit_info":
+            result = self.reddit_tools.get_subreddit_about(
+                subreddit=arguments["subreddit"]
+            )
+        elif tool_name == "get_post_with_comments":
+            result = self.reddit_tools.get_post_with_comments(
+                subreddit=arguments["subreddit"],
+                post_id=arguments["post_id"],
+                sort=arguments.get("sort", "best"),
+                limit=arguments.get("limit", 10),
+                with_authors=arguments.get("with_authors", False)
+            )
+        elif tool_name == "analyze_reddit_posts":
+            result = self.reddit_tools.analyze_posts(
+                subreddit=arguments.get("subreddit"),
+                query=arguments.get("query"),
+                sort=arguments.get("sort", "new"),
+                time=arguments.get("time", "day"),
+                limit=arguments.get("limit", 500),
+                top_n=arguments.get("top_n", 10),
+                include_selftext=arguments.get("include_selftext", False)
+            )
+        elif tool_name == "get_deduplicated_posts":
+            result = self.reddit_tools.get_deduplicated_posts(
+                subreddits=arguments.get("subreddits"),
+                query=arguments.get("query"),
+                sort=arguments.get("sort", "hot"),
+                time=arguments.get("time", "day"),
+                limit=arguments.get("limit", 100),
+                threshold=arguments.get("threshold", 0.7)
+            )
+        elif tool_name == "get_rising_terms":
+            result = self.reddit_tools.get_rising_terms(
+                hours=arguments.get("hours", 6),
+                baseline_hours=arguments.get("baseline_hours", 48),
+                top_n=arguments.get("top_n", 20),
+                min_count=arguments.get("min_count", 3)
+            )
+        elif tool_name == "get_posts_in_range":
+            result = self.reddit_tools.get_posts_in_range(
+                subreddit=arguments["subreddit"],
+                start=arguments["start"],
+                end=arguments.get("end"),
+                limit=arguments.get("limit", 1000)
+            )
+        elif tool_name == "get_server_stats":
+            result = self.server_stats()
+        elif tool_name == "memory_profile":
+            result = self.memory_profiler.control(
+                action=arguments.get("action", "report"),
+                interval=arguments.get("interval"),
+                top=arguments.get("top", 15)
+            )
+        else:
+            return None
+        
+        return result
     
     def _error_response(self, request_id: Any, code: int, message: str) -> Dict[str, Any]:
         """Create error response"""
@@ -209,9 +464,122 @@ class RedditMCPServer:
             }
         }
     
+    def _write(self, response: Optional[Response]):
+        """Write a response to stdout"""
+        if response is None:
+            return
+        line = response if isinstance(response, str) else json.dumps(response)
+        with self._write_lock:
+            sys.stdout.write(line + "\n")
+            sys.stdout.flush()
+    
+    def _dispatch(self, request: Dict[str, Any],
+                  write: Optional[Callable[[Response], None]] = None,
+                  client_id: Hashable = DEFAULT_CLIENT):
+        """Handle a request, running tool calls on the worker pool"""
+        write = write or self._write
+        if request.get("method") == "tools/list":
+            event(logger, "request", "Handling request: %s", "tools/list")
+            self._count("requests")
+            # Splice the id into the pre-serialized tool list
+            write(f'{{"jsonrpc": "2.0", "id": {json.dumps(request.get("id"))}, '
+                  f'"result": {{"tools": {TOOLS_JSON}}}}}')
+            return
+        if request.get("method") != "tools/call":
+            response = self.handle_request(request, client_id)
+            if response is not None:
+                write(response)
+            return
+        
+        # Track the token before queueing so a cancellation that arrives
+        # while the call is still waiting for a worker is honored
+        request_id = request.get("id")
+        token = self._track(request_id, client_id)
+        event(logger, "request", "Handling request: %s", "tools/call")
+        self._count("requests")
+        
+        def run_call():
+            try:
+                with client_scope(client_id):
+                    response = self._handle_tool_call(request.get("params", {}), request_id, token)
+            except Exception as e:
+                logger.error("Unexpected error: %s", e)
+                response = self._error_response(request_id, -32603, str(e))
+            if response is not None:
+                write(response)
+        
+        self.executor.submit(client_id, run_call)
+    
+    def _disconnect(self, client_id: Hashable):
+        """Cancel everything still in flight for a client that went away"""
+        with self._lock:
+            pending = [token for (owner, _), token in self._pending.items() if owner == client_id]
+        for token in pending:
+            token.cancel()
+    
+    def serve_sse(self, host: str = "127.0.0.1", port: int = 8765, unix_socket: Optional[str] = None):
+        """
+        Serve many clients at once over HTTP with Server-Sent Events
+        
+        All clients share this server's RedditTools, so they share its
+        connection pool, cache and rate limiter.
+        """
+        logger.info("Reddit MCP Server starting (SSE transport)...")
+        self._start_warming()
+        from tools.sse_transport import SSETransport
+        transport = SSETransport(self._dispatch, host=host, port=port,
+                                 unix_socket=unix_socket, on_disconnect=self._disconnect)
+        try:
+            transport.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Server shutting down...")
+        if self._warmer is not None:
+            self._warmer.stop()
+        self.executor.shutdown(wait=True)
+        self._log_stats()
+    
+    def _start_warming(self) -> None:
+        """Start keeping the watchlist warm, without delaying the first response"""
+        if self.watchlist is None:
+            return
+        
+        def start():
+            try:
+                from tools.warming import CacheWarmer, Watchlist
+                self._warmer = CacheWarmer(self.reddit_tools, Watchlist.load(self.watchlist))
+            except Exception as e:
+                logger.error("Cannot load watchlist %s: %s", self.watchlist, e)
+                return
+            self._warmer.run()
+        
+        threading.Thread(target=start, name="cache-warmer", daemon=True).start()
+    
+    def server_stats(self) -> Dict[str, Any]:
+        """Server counters, every recorded metric and upstream client statistics"""
+        with self._lock:
+            server = dict(self.metrics)
+        return {
+            "server": server,
+            "metrics": self.registry.snapshot(),
+            "upstream": self.reddit_tools.stats(),
+            "logging": log_pipeline.stats()
+        }
+    
+    def _log_stats(self) -> None:
+        """Log server and upstream client statistics"""
+        logger.info("Server metrics: %s", self.metrics)
+        if self._reddit_tools is not None:
+            logger.info("Upstream scheduling: %s", self._reddit_tools.scheduler.stats())
+            logger.info("Upstream circuit breaker: %s", self._reddit_tools.breaker.stats())
+            if self._reddit_tools.hedging is not None:
+                logger.info("Hedged requests: %s", self._reddit_tools.hedging.stats())
+            if self._reddit_tools.prefetch is not None:
+                logger.info("Comment prefetch: %s", self._reddit_tools.prefetch.stats())
+    
     def run(self):
         """Run the MCP server"""
         logger.info("Reddit MCP Server starting...")
+        self._start_warming()
         
         # Read from stdin and write to stdout
         while True:
@@ -221,25 +589,91 @@ class RedditMCPServer:
                     break
                 
                 request = json.loads(line.strip())
-                response = self.handle_request(request)
-                
-                print(json.dumps(response))
-                sys.stdout.flush()
+                self._dispatch(request)
                 
             except json.JSONDecodeError as e:
-                logger.error(f"Invalid JSON: {e}")
-                error_response = self._error_response(None, -32700, "Parse error")
-                print(json.dumps(error_response))
-                sys.stdout.flush()
+                logger.error("Invalid JSON: %s", e)
+                self._write(self._error_response(None, -32700, "Parse error"))
             except KeyboardInterrupt:
                 logger.info("Server shutting down...")
+                with self._lock:
+                    pending = list(self._pending.values())
+                for token in pending:
+                    token.cancel()
                 break
             except Exception as e:
-                logger.error(f"Unexpected error: {e}")
-                error_response = self._error_response(None, -32603, str(e))
-                print(json.dumps(error_response))
-                sys.stdout.flush()
+                logger.error("Unexpected error: %s", e)
+                self._write(self._error_response(None, -32603, str(e)))
+        
+        # Let in-flight tool calls finish writing their responses
+        if self._warmer is not None:
+            self._warmer.stop()
+        self.executor.shutdown(wait=True)
+        self._log_stats()
 
 if __name__ == "__main__":
-    server = RedditMCPServer()
-    server.run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Reddit MCP Server")
+    parser.add_argument("--transport", choices=["stdio", "sse"], default="stdio",
+                        help="stdio for a single client, sse for a shared local server")
+    parser.add_argument("--host", default="127.0.0.1", help="Loopback address for the SSE transport")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the SSE transport")
+    parser.add_argument("--unix-socket", help="Serve the SSE transport on a Unix socket instead")
+    parser.add_argument("--offload-threshold", type=int,
+                        help="Parse and serialize upstream responses of at least this many bytes in a process pool")
+    parser.add_argument("--listing-window", type=float, metavar="SECONDS",
+                        help="Keep this much of each subreddit's newest posts locally and "
+                             "answer new/top listings from it")
+    parser.add_argument("--prefetch-comments", type=int, default=0, metavar="K",
+                        help="After serving a listing, prefetch comments of its top K posts "
+                             "(adapted to the observed hit rate)")
+    parser.add_argument("--hedge", action="store_true",
+                        help="Send a second copy of upstream requests slower than their recent p95 "
+                             "(for at most 5%% of requests)")
+    parser.add_argument("--base-url", default="https://www.reddit.com",
+                        help="Reddit API address; point at benchmarks/reddit_stub.py to run offline")
+    parser.add_argument("--requests-per-minute", type=float, default=60.0,
+                        help="Sustained upstream request rate")
+    parser.add_argument("--cache-ttl", type=float, default=60.0,
+                        help="Seconds a fetched result is served from cache")
+    parser.add_argument("--metrics-file", metavar="PATH",
+                        help="Write metrics in the Prometheus text format to this file periodically")
+    parser.add_argument("--metrics-interval", type=float, default=15.0, metavar="SECONDS",
+                        help="How often to rewrite --metrics-file")
+    parser.add_argument("--trace-file", metavar="PATH",
+                        help="Write spans of sampled tool calls to this file (Chrome trace format "
+                             "for a .json path, else JSON lines)")
+    parser.add_argument("--trace-sample", type=float, default=1.0, metavar="RATE",
+                        help="Share of tool calls traced, 0 to 1")
+    parser.add_argument("--trace-min-ms", type=float, default=0.0, metavar="MS",
+                        help="Only write traces of tool calls taking at least this long")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"], default="INFO")
+    parser.add_argument("--log-format", choices=["text", "json"], default="text",
+                        help="Log lines as text or as one JSON object each")
+    parser.add_argument("--log-sample", action="append", metavar="CATEGORY=RATE",
+                        help="Log only this share of a category's events, e.g. request=0.01 "
+                             "(categories: request, cancel, tool_error, session)")
+    parser.add_argument("--watchlist", metavar="PATH",
+                        help="JSON watchlist of listings, searches and subreddits to pre-fetch "
+                             "at startup and keep refreshed")
+    args = parser.parse_args()
+    log_pipeline.configure(getattr(logging, args.log_level), args.log_format,
+                           log_pipeline.parse_sample_rates(args.log_sample))
+    
+    server = RedditMCPServer(watchlist=args.watchlist,
+                             offload_threshold=args.offload_threshold,
+                             listing_window=args.listing_window,
+                             prefetch_comments=args.prefetch_comments,
+                             hedge=args.hedge,
+                             base_url=args.base_url,
+                             requests_per_minute=args.requests_per_minute,
+                             cache_ttl=args.cache_ttl)
+    if args.metrics_file:
+        server.registry.start_dump(args.metrics_file, args.metrics_interval)
+    if args.trace_file:
+        tracing.configure(args.trace_file, args.trace_sample, args.trace_min_ms / 1000)
+    if args.transport == "sse":
+        server.serve_sse(args.host, args.port, args.unix_socket)
+    else:
+        server.run()
+    tracing.shutdown()
+    log_pipeline.shutdown()
\ No newline at end of file
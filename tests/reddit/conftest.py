@@ -0,0 +1,75 @@
+"""
+Offline tests for the Reddit tools and servers
+
+Run with `python -m pytest tests/reddit` from the repository root. Every
+request goes to benchmarks/reddit_stub.py served in-process; nothing
+touches the network.
+"""
+
+import os
+import sys
+from typing import Dict, Tuple
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "benchmarks")]
+
+from reddit_stub import StubServer, SyntheticReddit  # noqa: E402
+
+
+class FlakyStub(StubServer):
+    """The stub, answering 500 to everything while `failing` is set"""
+
+    failing = False
+
+    def handle(self, path: str, params: Dict[str, str]) -> Tuple[int, bytes]:
+        if self.failing:
+            with self._lock:
+                self.requests += 1
+            return 500, b'{"message": "Internal Server Error", "error": 500}'
+        return super().handle(path, params)
+
+
+@pytest.fixture
+def stub():
+    server = FlakyStub(SyntheticReddit(listing_size=300, comments=5, replies=1, depth=1)).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def make_tools(stub):
+    """Build RedditTools clients pointed at the stub, closed after the test"""
+    from tools.reddit_tools import RedditTools
+    created = []
+
+    def make(**options):
+        options.setdefault("requests_per_minute", 60_000)
+        options.setdefault("burst", 100)
+        tools = RedditTools(base_url=stub.url, **options)
+        created.append(tools)
+        return tools
+
+    yield make
+    for tools in created:
+        tools.close()
+
+
+@pytest.fixture
+def make_server(stub):
+    """Build RedditMCPServers whose client is pointed at the stub, shut down after the test"""
+    from reddit_mcp_server import RedditMCPServer
+    created = []
+
+    def make(**options):
+        options.setdefault("requests_per_minute", 60_000)
+        options.setdefault("burst", 100)
+        server = RedditMCPServer(base_url=stub.url, **options)
+        created.append(server)
+        return server
+
+    yield make
+    for server in created:
+        server.executor.shutdown(wait=False)
+        server.reddit_tools.close()
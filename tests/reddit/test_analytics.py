@@ -0,0 +1,60 @@
+import pytest
+
+from tools.analytics import analyze_posts
+from tools.reddit_tools import RedditPost
+
+
+def post(post_id, title, author="a", score=1, comments=0, hour=0, selftext=None):
+    return RedditPost(id=post_id, title=title, author=author, subreddit="python", score=score,
+                      num_comments=comments, created_utc=86400 * 10 + hour * 3600, url="",
+                      permalink=f"https://reddit.com/r/python/comments/{post_id}/x/", selftext=selftext)
+
+
+def test_aggregates():
+    posts = [
+        post("a", "Parser release notes", author="alice", score=10, comments=1, hour=1),
+        post("b", "Parser benchmarks", author="alice", score=20, comments=2, hour=1),
+        post("c", "Release party", author="bob", score=30, comments=3, hour=5, selftext="parser"),
+        post("d", "Removed", author="[deleted]", score=40, comments=4, hour=23),
+    ]
+    result = analyze_posts(posts, top_n=2, percentiles=(50, 100))
+    assert result.post_count == 4
+    assert [(item.value, item.count) for item in result.top_authors] == [("alice", 2), ("bob", 1)]
+    assert result.score_percentiles == {"p50": 25.0, "p100": 40.0}
+    assert result.comment_percentiles == {"p50": 2.5, "p100": 4.0}
+    assert result.posts_by_hour[1] == 2 and result.posts_by_hour[5] == 1 and result.posts_by_hour[23] == 1
+    assert sum(result.posts_by_hour) == 4
+    assert [(item.value, item.count) for item in result.top_keywords] == [("parser", 2), ("release", 2)]
+    assert result.earliest_utc == 86400 * 10 + 3600
+    assert result.latest_utc == 86400 * 10 + 23 * 3600
+
+    with_text = analyze_posts(posts, top_n=1, include_selftext=True)
+    assert [(item.value, item.count) for item in with_text.top_keywords] == [("parser", 3)]
+
+
+def test_no_posts():
+    result = analyze_posts([])
+    assert result.post_count == 0
+    assert result.top_authors == [] and result.top_keywords == []
+    assert result.score_percentiles == {}
+    assert result.posts_by_hour == [0] * 24
+    assert result.earliest_utc is None
+
+
+def test_pages_through_the_listing(make_tools, stub):
+    tools = make_tools()
+    result = tools.analyze_posts("python", sort="new", limit=250)
+    assert result.post_count == 250
+    assert stub.requests == 3
+    assert sum(result.posts_by_hour) == 250
+    # A second run is served from the cache
+    tools.analyze_posts("python", sort="new", limit=250)
+    assert stub.requests == 3
+
+
+@pytest.mark.parametrize("sort, query", [("relevance", None), ("comments", None), ("rising", "async")])
+def test_sort_must_suit_the_listing_or_search(make_tools, stub, sort, query):
+    tools = make_tools()
+    with pytest.raises(ValueError, match=f"Sort '{sort}'"):
+        tools.analyze_posts("python", query=query, sort=sort)
+    assert stub.requests == 0
@@ -0,0 +1,95 @@
+import threading
+import time
+
+import pytest
+
+from tools.cache import TTLCache
+from tools.cancellation import RequestCancelled
+
+
+def test_concurrent_misses_share_one_load():
+    cache = TTLCache(ttl=60)
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def load():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("key", load)))
+               for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    started.wait()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == [1]
+    assert results == ["value"] * 6
+    assert cache.misses == 1
+
+
+def test_failed_load_is_shared_and_not_cached():
+    cache = TTLCache(ttl=60)
+
+    def fail():
+        raise ValueError("upstream")
+
+    with pytest.raises(ValueError):
+        cache.get_or_load("key", fail)
+    assert cache.get("key") is None
+    assert cache.get_or_load("key", lambda: 1) == 1
+
+
+def test_cancelled_leader_lets_a_follower_load_again():
+    cache = TTLCache(ttl=60)
+    entered = threading.Event()
+    release = threading.Event()
+
+    def cancelled():
+        entered.set()
+        release.wait()
+        raise RequestCancelled("client went away")
+
+    leader = threading.Thread(target=lambda: pytest.raises(RequestCancelled, cache.get_or_load,
+                                                           "key", cancelled))
+    leader.start()
+    entered.wait()
+    result = []
+    follower = threading.Thread(target=lambda: result.append(cache.get_or_load("key", lambda: "fresh")))
+    follower.start()
+    time.sleep(0.05)
+    release.set()
+    leader.join()
+    follower.join()
+    assert result == ["fresh"]
+
+
+def test_expiry_stale_reads_and_refresh():
+    cache = TTLCache(ttl=0.05)
+    cache.set("key", "old")
+    assert cache.get("key") == "old"
+    time.sleep(0.08)
+    assert cache.get("key") is None
+    value, age = cache.get_stale("key", max_stale=10)
+    assert value == "old" and age >= 0.05
+    assert cache.get_stale("key", max_stale=0.0) is None
+
+    cache.set("key", "cached", ttl=60)
+    assert cache.get_or_load("key", lambda: "new") == "cached"
+    assert cache.get_or_load("key", lambda: "new", refresh=True) == "new"
+
+
+def test_least_recently_used_is_evicted():
+    cache = TTLCache(ttl=60, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
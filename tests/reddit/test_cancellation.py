@@ -0,0 +1,82 @@
+import threading
+import time
+
+import pytest
+
+from tools.cancellation import CancelToken, RequestCancelled, cancel_scope
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_callbacks_run_once_and_late_ones_run_at_once():
+    token = CancelToken()
+    calls = []
+    remove = token.add_callback(lambda: calls.append("registered"))
+    token.add_callback(lambda: calls.append("removed"))()
+    token.cancel()
+    token.cancel()
+    token.add_callback(lambda: calls.append("late"))
+    remove()
+    assert calls == ["registered", "late"]
+    with pytest.raises(RequestCancelled):
+        token.raise_if_cancelled()
+
+
+def test_cancel_aborts_a_rate_limit_wait(make_tools, stub):
+    tools = make_tools(requests_per_minute=6, burst=1)
+    tools.get_reddit_post("python", limit=5)
+    token = CancelToken()
+    threading.Timer(0.1, token.cancel).start()
+    started = time.monotonic()
+    # The next token is 10 s away
+    with cancel_scope(token), pytest.raises(RequestCancelled):
+        tools.get_reddit_post("rust", limit=5)
+    assert time.monotonic() - started < 1.0
+    assert stub.requests == 1
+
+
+def test_cancelled_tool_call_gets_no_response(make_server, stub):
+    server = make_server()
+    stub.latency = 0.3
+    responses = []
+    call = {"jsonrpc": "2.0", "id": 7, "method": "tools/call",
+            "params": {"name": "get_reddit_posts", "arguments": {"subreddit": "python"}}}
+    server._dispatch(call, responses.append, "client")
+    wait_until(lambda: stub.requests == 1)
+    server._dispatch({"jsonrpc": "2.0", "method": "notifications/cancelled", "params": {"requestId": 7}},
+                     responses.append, "client")
+    wait_until(lambda: server.metrics["cancelled"] == 1)
+    assert responses == []
+    assert not server._pending
+
+
+def test_cancellation_is_scoped_to_the_client(make_server, stub):
+    server = make_server()
+    stub.latency = 0.2
+    responses = []
+    call = {"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+            "params": {"name": "get_reddit_posts", "arguments": {"subreddit": "python"}}}
+    server._dispatch(call, responses.append, "owner")
+    server._dispatch({"jsonrpc": "2.0", "method": "notifications/cancelled", "params": {"requestId": 1}},
+                     responses.append, "someone-else")
+    wait_until(lambda: responses)
+    assert responses[0]["id"] == 1 and "result" in responses[0]
+    assert server.metrics["cancelled"] == 0
+
+
+def test_disconnect_cancels_the_clients_calls(make_server, stub):
+    server = make_server(requests_per_minute=6, burst=1)
+    server.reddit_tools.get_reddit_post("python", limit=5)
+    responses = []
+    call = {"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+            "params": {"name": "get_reddit_posts", "arguments": {"subreddit": "rust"}}}
+    server._dispatch(call, responses.append, "client")
+    wait_until(lambda: server._pending)
+    server._disconnect("client")
+    wait_until(lambda: server.metrics["cancelled"] == 1, timeout=2.0)
+    assert responses == []
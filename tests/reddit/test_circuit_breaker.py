@@ -0,0 +1,62 @@
+import time
+
+from tools.circuit_breaker import CircuitBreaker
+
+
+def breaker(**options):
+    options.setdefault("open_seconds", 0.05)
+    return CircuitBreaker(failure_rate=0.5, window=4, min_calls=4, **options)
+
+
+def test_opens_once_failure_rate_is_reached():
+    circuit = breaker()
+    for ok in (True, False, True):
+        circuit.record(ok)
+    assert circuit.state == CircuitBreaker.CLOSED
+    circuit.record(False)
+    assert circuit.state == CircuitBreaker.OPEN
+    assert not circuit.allow()
+    assert circuit.rejected == 1
+    assert 0 < circuit.retry_after() <= 0.05
+
+
+def test_slow_successes_count_as_failures():
+    circuit = breaker(latency_threshold=1.0)
+    for _ in range(4):
+        circuit.record(True, latency=2.0)
+    assert circuit.state == CircuitBreaker.OPEN
+
+
+def test_half_open_probe_closes_on_success():
+    circuit = breaker()
+    for _ in range(4):
+        circuit.record(False)
+    time.sleep(0.06)
+    assert circuit.allow()
+    assert circuit.state == CircuitBreaker.HALF_OPEN
+    # Only one probe at a time
+    assert not circuit.allow()
+    circuit.record(True)
+    assert circuit.state == CircuitBreaker.CLOSED
+    assert circuit.allow()
+
+
+def test_half_open_probe_reopens_on_failure():
+    circuit = breaker()
+    for _ in range(4):
+        circuit.record(False)
+    time.sleep(0.06)
+    assert circuit.allow()
+    circuit.record(False)
+    assert circuit.state == CircuitBreaker.OPEN
+    assert circuit.times_opened == 2
+
+
+def test_released_probe_frees_the_slot():
+    circuit = breaker()
+    for _ in range(4):
+        circuit.record(False)
+    time.sleep(0.06)
+    assert circuit.allow()
+    circuit.release()
+    assert circuit.allow()
@@ -0,0 +1,99 @@
+import json
+import os
+
+import pytest
+
+from tools.crawl import CrawlJournal, Crawler
+from tools.scheduling import Priority
+
+
+def read_ids(path):
+    with open(path) as f:
+        return [json.loads(line)["id"] for line in f]
+
+
+def test_crawl_writes_every_post_once(make_tools, tmp_path, stub):
+    output = str(tmp_path / "crawl.ndjson")
+    crawler = Crawler(make_tools(), output, concurrency=2, sync=False)
+    result = crawler.run(["python", "rust", "Python"])
+    crawler.close()
+    assert result == {"pages": 6, "posts": 600, "finished": 2, "subreddits": 2, "failed": {}}
+    ids = read_ids(output)
+    assert len(ids) == len(set(ids)) == 600
+
+    # Nothing is left to fetch
+    calls = stub.requests
+    crawler = Crawler(make_tools(), output, sync=False)
+    assert crawler.run(["python", "rust"])["pages"] == 6
+    crawler.close()
+    assert stub.requests == calls
+
+
+def test_resume_after_crash_drops_uncommitted_output(make_tools, tmp_path, stub):
+    output = str(tmp_path / "crawl.ndjson")
+    crawler = Crawler(make_tools(), output, max_pages=1, sync=False)
+    crawler.run(["python"])
+    crawler.close()
+    committed = os.path.getsize(output)
+
+    # A crash after writing posts but before committing them, mid-way through a journal line
+    with open(output, "a") as f:
+        f.write('{"id": "uncommitted"}\n')
+    with open(output + ".journal", "a") as f:
+        f.write('{"subreddit": "python", "cur')
+
+    journal = CrawlJournal(output + ".journal")
+    assert journal.units == 1
+    assert journal.output_length == committed
+    assert journal.progress["python"].done
+    journal.close()
+
+    calls = stub.requests
+    crawler = Crawler(make_tools(), output, sync=False)
+    assert os.path.getsize(output) == committed
+    crawler.journal.progress["python"].done = False
+    result = crawler.run(["python"])
+    crawler.close()
+    # Only the two pages after the committed one are fetched
+    assert stub.requests - calls == 2
+    assert result["pages"] == 3
+    ids = read_ids(output)
+    assert "uncommitted" not in ids
+    assert len(ids) == len(set(ids)) == 300
+
+
+def test_failed_subreddit_is_left_for_the_next_run(make_tools, tmp_path, stub):
+    output = str(tmp_path / "crawl.ndjson")
+    stub.failing = True
+    crawler = Crawler(make_tools(), output, retries=1, sync=False)
+    result = crawler.run(["python"])
+    crawler.close()
+    assert "python" in result["failed"]
+    assert result["finished"] == 0
+
+    stub.failing = False
+    crawler = Crawler(make_tools(), output, retries=1, sync=False)
+    result = crawler.run(["python"])
+    crawler.close()
+    assert result["failed"] == {} and result["finished"] == 1
+
+
+def test_output_shorter_than_journal_is_refused(make_tools, tmp_path):
+    output = str(tmp_path / "crawl.ndjson")
+    crawler = Crawler(make_tools(), output, max_pages=1, sync=False)
+    crawler.run(["python"])
+    crawler.close()
+    with open(output, "r+") as f:
+        f.truncate(10)
+    with pytest.raises(RuntimeError):
+        Crawler(make_tools(), output)
+
+
+def test_crawl_runs_at_bulk_priority(make_tools, tmp_path):
+    tools = make_tools()
+    crawler = Crawler(tools, str(tmp_path / "crawl.ndjson"), max_pages=2, sync=False)
+    crawler.run(["python"])
+    crawler.close()
+    latencies = tools.scheduler.latencies
+    assert latencies[Priority.BULK].count == 2
+    assert latencies[Priority.INTERACTIVE].count == 0
@@ -0,0 +1,47 @@
+import pytest
+
+from tools.dedup import cluster_posts, normalize_url
+from tools.reddit_tools import RedditPost
+
+
+def post(post_id, title, url, score=1, subreddit="python"):
+    return RedditPost(id=post_id, title=title, author="a", subreddit=subreddit, score=score,
+                      num_comments=0, created_utc=0, url=url,
+                      permalink=f"https://reddit.com/r/{subreddit}/comments/{post_id}/x/")
+
+
+def test_normalize_url():
+    assert normalize_url("https://www.example.com/a/?utm_source=x&b=2#top") == "example.com/a?b=2"
+    assert normalize_url("https://youtu.be/abc") == normalize_url("https://www.youtube.com/watch?v=abc")
+    assert normalize_url("/r/python/comments/xyz12/title/") == "reddit:xyz12"
+    assert normalize_url("") is None
+
+
+def test_same_link_crosspost_and_similar_title_are_merged():
+    posts = [
+        post("a", "New release of the parser library", "https://example.com/release", score=5),
+        post("b", "Parser library released", "https://www.example.com/release/?utm_source=x", score=9),
+        post("c", "Crosspost", "/r/python/comments/a/new_release/", subreddit="programming"),
+        post("d", "Ask: which web framework should a beginner learn first in 2024",
+             "https://reddit.com/r/python/comments/d/x/"),
+        post("e", "Ask: which web framework should a beginner learn first in 2024?",
+             "https://reddit.com/r/python/comments/e/x/"),
+        post("f", "Something else entirely", "https://other.org/page"),
+    ]
+    result = cluster_posts(posts, threshold=0.6)
+    assert result.post_count == 6
+    assert result.cluster_count == 3
+    leads = {cluster.post.id: {dup.id for dup in cluster.duplicates} for cluster in result.clusters}
+    # Clusters are led by their highest scoring post
+    assert leads["b"] == {"a", "c"}
+    assert len(leads.get("d", leads.get("e", set()))) == 1
+    assert leads["f"] == set()
+
+
+def test_sort_must_suit_the_listing_or_search(make_tools, stub):
+    tools = make_tools()
+    with pytest.raises(ValueError, match="does not apply to listings"):
+        tools.get_deduplicated_posts(["python", "rust"], sort="relevance")
+    with pytest.raises(ValueError, match="does not apply to searches"):
+        tools.get_deduplicated_posts(["python"], query="async", sort="rising")
+    assert stub.requests == 0
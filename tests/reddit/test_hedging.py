@@ -0,0 +1,56 @@
+from tools.hedging import HedgePolicy, endpoint_of
+
+
+def test_endpoint_of():
+    assert endpoint_of("https://www.reddit.com/r/python/comments/abc.json") == "comments"
+    assert endpoint_of("https://www.reddit.com/r/python/search.json?q=x") == "search"
+    assert endpoint_of("https://www.reddit.com/user/spez/about.json") == "about"
+    assert endpoint_of("https://www.reddit.com/r/python/new.json") == "listing"
+
+
+def test_hedges_after_the_percentile_within_budget():
+    policy = HedgePolicy(percentile=90, budget=0.1, min_samples=20, min_delay=0.0)
+    assert policy.delay("listing") is None
+    for latency in range(1, 21):
+        policy.observe("listing", latency / 10)
+    assert 1.8 <= policy.delay("listing") <= 2.0
+    hedges = 0
+    for _ in range(100):
+        policy.delay("listing")
+        hedges += policy.try_hedge()
+    assert hedges <= 11
+
+
+def hedged_tools(make_tools, **options):
+    tools = make_tools(hedge=True, **options)
+    tools.hedging = HedgePolicy(budget=1.0, min_samples=10, min_delay=0.05)
+    for _ in range(10):
+        tools.hedging.observe("listing", 0.05)
+    return tools
+
+
+def test_slow_request_is_hedged(make_tools, stub):
+    tools = hedged_tools(make_tools)
+    stub.latency = 0.3
+    tools.get_reddit_post("python", limit=5)
+    assert stub.requests == 2
+    assert tools.hedging.hedged == 1
+
+
+def test_no_hedge_without_a_spare_rate_limit_token(make_tools, stub):
+    tools = hedged_tools(make_tools, requests_per_minute=60, burst=1)
+    stub.latency = 0.3
+    tools.get_reddit_post("python", limit=5)
+    assert stub.requests == 1
+    assert tools.hedging.hedged == 0
+
+
+def test_latency_excludes_the_rate_limit_wait(make_tools, stub):
+    tools = make_tools(hedge=True, requests_per_minute=300, burst=1)
+    observed = []
+    tools.hedging.observe = lambda endpoint, latency: observed.append(latency)
+    tools.get_reddit_post("python", limit=5)
+    tools.get_reddit_post("rust", limit=5)
+    # The second request waited about 0.2 s for a token
+    assert len(observed) == 2
+    assert max(observed) < 0.15
@@ -0,0 +1,117 @@
+import time
+
+from tools.listing_window import ListingWindow
+
+
+def fields(post_id, created):
+    return {"id": post_id, "title": f"post {post_id}", "author": "a", "subreddit": "python", "score": 1,
+            "num_comments": 0, "created_utc": created, "url": "", "permalink": "", "selftext": None,
+            "thumbnail": None, "is_video": False, "is_self": True}
+
+
+class Listing:
+    """A `new` listing of posts created once a minute, served a page of `size` at a time"""
+
+    def __init__(self, count, size=10):
+        self.posts = [fields(f"p{i}", 1000.0 + 60 * i) for i in range(count)]
+        self.size = size
+        self.fetches = 0
+
+    def add(self, count):
+        start = len(self.posts)
+        self.posts += [fields(f"p{i}", 1000.0 + 60 * i) for i in range(start, start + count)]
+
+    def fetch_page(self, after):
+        self.fetches += 1
+        newest_first = self.posts[::-1]
+        start = 0
+        if after:
+            start = next(i for i, post in enumerate(newest_first) if f"t3_{post['id']}" == after) + 1
+        page = newest_first[start:start + self.size]
+        more = start + self.size < len(newest_first)
+        return page, f"t3_{page[-1]['id']}" if page and more else None
+
+
+def ids(result):
+    store, rows, _ = result
+    return [post["id"] for post in store.to_dicts(rows)]
+
+
+def test_refresh_pulls_only_the_new_head():
+    listing = Listing(25)
+    window = ListingWindow("python", span=86400)
+    window.refresh(listing.fetch_page, now=5000)
+    assert len(window.store) == 10 and listing.fetches == 1
+
+    listing.add(3)
+    window.refresh(listing.fetch_page, now=5000)
+    assert listing.fetches == 2
+    assert ids(window.query("new", 3, None, now=5000)) == ["p27", "p26", "p25"]
+
+
+def test_extend_pages_back_until_the_period_is_covered():
+    listing = Listing(25)
+    window = ListingWindow("python", span=86400)
+    window.refresh(listing.fetch_page, now=5000)
+    window.extend(listing.fetch_page, start=0)
+    assert window.complete and len(window.store) == 25
+    assert listing.fetches == 3
+
+
+def test_new_pages_continue_with_after_tokens():
+    listing = Listing(25)
+    window = ListingWindow("python", span=86400)
+    window.refresh(listing.fetch_page, now=5000)
+    first = window.query("new", 5, None, now=5000)
+    assert ids(first) == ["p24", "p23", "p22", "p21", "p20"]
+    second = window.query("new", 5, None, now=5000, after=first[2])
+    assert ids(second) == ["p19", "p18", "p17", "p16", "p15"]
+    # The rest is older than the window holds, so it has to come from upstream
+    assert window.query("new", 5, None, now=5000, after=second[2]) is None
+
+
+def test_a_gap_restarts_the_window():
+    listing = Listing(5, size=2)
+    window = ListingWindow("python", span=86400)
+    window.refresh(listing.fetch_page, now=5000)
+    listing.add(30)
+    window.refresh(listing.fetch_page, now=5000, max_pages=2)
+    # Four posts fetched, none overlapping: the old two can't be kept
+    assert [post["id"] for post in window.store.to_dicts(window.store.rows())] == ["p34", "p33", "p32", "p31"]
+
+
+def test_tools_answer_new_and_top_from_the_window(make_tools, stub):
+    tools = make_tools(listing_window=86400)
+    upstream = make_tools()
+
+    first = tools.get_reddit_post("python", sort="new", limit=5)
+    second = tools.get_reddit_post("python", sort="new", limit=5, after=first.after)
+    assert stub.requests == 1
+    expected = upstream.get_reddit_post("python", sort="new", limit=10)
+    assert [post.id for post in first.posts + second.posts] == [post.id for post in expected.posts]
+
+    calls = stub.requests
+    top = tools.get_reddit_post("python", sort="top", limit=10, time="day")
+    assert stub.requests == calls + 2
+    scores = [post.score for post in top.posts]
+    assert scores == sorted(scores, reverse=True)
+    tools.get_reddit_post("python", sort="top", limit=10, time="day")
+    assert stub.requests == calls + 2
+    assert tools.windows.local_hits == 4
+
+
+def test_periods_longer_than_the_window_go_upstream(make_tools, stub):
+    tools = make_tools(listing_window=6 * 3600)
+    tools.get_reddit_post("python", sort="top", limit=5, time="week")
+    assert tools.windows.local_hits == 0
+    assert stub.requests == 1
+
+
+def test_window_refreshes_after_the_interval(make_tools, stub):
+    tools = make_tools(listing_window=86400, window_refresh=0.05)
+    tools.get_reddit_post("python", sort="new", limit=5)
+    tools.get_reddit_post("python", sort="new", limit=5)
+    assert stub.requests == 1
+    time.sleep(0.1)
+    tools.get_reddit_post("python", sort="new", limit=5)
+    assert stub.requests == 2
@@ -0,0 +1,96 @@
+import io
+import json
+import logging
+
+import pytest
+
+from tools import log_pipeline
+from tools.log_pipeline import event, parse_sample_rates
+
+logger = logging.getLogger("tests.log_pipeline")
+
+
+@pytest.fixture
+def pipeline():
+    """Configure the process-wide pipeline into a buffer, restoring the root logger afterwards"""
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    stream = io.StringIO()
+
+    def configure(**options):
+        return log_pipeline.configure(stream=stream, **options)
+
+    configure.stream = stream
+    yield configure
+    log_pipeline.shutdown()
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def written(pipeline):
+    log_pipeline.shutdown()
+    return pipeline.stream.getvalue().splitlines()
+
+
+def test_events_are_sampled_per_category(pipeline):
+    pipeline(format="json", sample_rates={"request": 0.25, "cache": 0})
+    for i in range(8):
+        event(logger, "request", "Handling request %d", i)
+        event(logger, "cache", "Cache lookup %d", i)
+    event(logger, "session", "Client connected: %s", "abc", client="abc")
+    stats = log_pipeline.stats()
+    assert stats["events"] == {"request": 8, "cache": 8, "session": 1}
+    assert stats["sampled_out"] == {"request": 6, "cache": 8}
+
+    entries = [json.loads(line) for line in written(pipeline)]
+    assert [entry["message"] for entry in entries] == ["Handling request 3", "Handling request 7",
+                                                       "Client connected: abc"]
+    assert entries[-1]["category"] == "session" and entries[-1]["client"] == "abc"
+
+
+def test_text_format_appends_fields(pipeline):
+    pipeline(format="text")
+    event(logger, "tool_error", "Error executing tool %s", "x", level=logging.ERROR, tool="x")
+    logger.info("plain %s", "record")
+    lines = written(pipeline)
+    assert lines[0].endswith("ERROR - Error executing tool x tool=x")
+    assert lines[1].endswith("INFO - plain record")
+
+
+def test_messages_are_formatted_only_when_written(pipeline):
+    class Expensive:
+        formatted = 0
+
+        def __str__(self):
+            Expensive.formatted += 1
+            return "expensive"
+
+    pipeline(level=logging.WARNING, sample_rates={"request": 0})
+    event(logger, "request", "Sampled out: %s", Expensive())
+    event(logger, "cache", "Below the level: %s", Expensive(), level=logging.DEBUG)
+    logger.info("Below the level: %s", Expensive())
+    assert written(pipeline) == []
+    assert Expensive.formatted == 0
+
+
+def test_full_queue_drops_instead_of_blocking():
+    stream = io.StringIO()
+    pipeline = log_pipeline.LogPipeline(stream=stream, max_queued=2)
+    # Not installed, so nothing drains the queue
+    record_logger = logging.getLogger("tests.log_pipeline.unattached")
+    record_logger.propagate = False
+    record_logger.addHandler(pipeline.handler)
+    try:
+        for i in range(5):
+            record_logger.warning("record %d", i)
+    finally:
+        record_logger.removeHandler(pipeline.handler)
+    assert pipeline.stats()["dropped"] == 3
+
+
+def test_parse_sample_rates():
+    assert parse_sample_rates(["request=0.1", " cache = 0 "]) == {"request": 0.1, "cache": 0.0}
+    assert parse_sample_rates(None) == {}
+    with pytest.raises(ValueError):
+        log_pipeline.LogPipeline(format="xml")
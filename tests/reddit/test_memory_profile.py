@@ -0,0 +1,69 @@
+import json
+import tracemalloc
+
+import pytest
+
+from tools.memory_profile import MemoryProfiler, deep_sizeof
+
+
+def allocate_blocks():
+    return [bytearray(1024) for _ in range(200)]
+
+
+def test_deep_sizeof_follows_references_and_skips_excluded_types():
+    class Store:
+        def __init__(self):
+            self.data = bytearray(100_000)
+
+    store = Store()
+    value = {"rows": [1, 2, 3], "store": store}
+    assert deep_sizeof(value) > 100_000
+    assert deep_sizeof(value, exclude_types=(Store,)) < 10_000
+
+
+def test_allocations_are_charged_to_their_region():
+    profiler = MemoryProfiler({"blocks": [allocate_blocks]}, retained=lambda: {"cache": 1})
+    profiler.start()
+    try:
+        kept = allocate_blocks()
+        summary = profiler.snapshot()
+    finally:
+        profiler.stop()
+    assert summary["regions"]["blocks"] >= 200 * 1024
+    assert not tracemalloc.is_tracing()
+    del kept
+
+    report = profiler.report(top=3)
+    assert report["running"] is False
+    assert len(report["top_allocators"]) == 3
+    assert report["retained"] == {"cache": 1}
+
+
+def test_control_actions():
+    profiler = MemoryProfiler({}, interval=60)
+    report = profiler.control("start", interval=30)
+    assert report["running"] and profiler.interval == 30
+    profiler.control("snapshot")
+    report = profiler.control("stop")
+    assert not report["running"]
+    # The loop's first snapshot and the one asked for
+    assert len(report["snapshots"]) == 2
+    assert "top_growth" in report
+    with pytest.raises(RuntimeError):
+        profiler.control("snapshot")
+    with pytest.raises(ValueError):
+        profiler.control("restart")
+
+
+def test_memory_profile_tool(make_server):
+    server = make_server()
+    call = {"name": "memory_profile", "arguments": {"action": "start", "interval": 60}}
+    started = json.loads(server._handle_tool_call(call, 1)["result"]["content"][0]["text"])
+    assert started["running"]
+    server._handle_tool_call({"name": "get_reddit_posts", "arguments": {"subreddit": "python"}}, 2)
+    server._handle_tool_call({"name": "memory_profile", "arguments": {"action": "snapshot"}}, 3)
+    call = {"name": "memory_profile", "arguments": {"action": "stop", "top": 5}}
+    report = json.loads(server._handle_tool_call(call, 4)["result"]["content"][0]["text"])
+    assert not report["running"]
+    assert "listings" in report["snapshots"][-1]["regions"]
+    assert report["retained"]["response_cache"]["posts"]["entries"] == 1
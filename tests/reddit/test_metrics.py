@@ -0,0 +1,70 @@
+import json
+
+from tools.metrics import Histogram, Metrics
+
+
+def test_histogram_percentiles_are_bucket_bounds():
+    histogram = Histogram(buckets=(1, 2, 5))
+    for value in (0.5, 1.5, 1.5, 4, 10):
+        histogram.observe(value)
+    assert histogram.percentile(50) == 2
+    assert histogram.percentile(100) == 5
+    assert histogram.snapshot()["count"] == 5
+    assert Histogram().percentile(50) == 0.0
+
+
+def test_snapshot_and_prometheus_text():
+    metrics = Metrics(prefix="test_")
+    metrics.describe("requests_total", "Requests served")
+    metrics.inc("requests_total", endpoint="listing")
+    metrics.inc("requests_total", 2, endpoint="listing")
+    metrics.set("entries", 7)
+    metrics.observe("latency_seconds", 0.3, buckets=(0.1, 1.0), endpoint="listing")
+    metrics.add_collector(lambda registry: registry.set("collected", 1))
+
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"]["requests_total"] == {"endpoint=listing": 3}
+    assert snapshot["gauges"]["entries"] == {"all": 7}
+    assert snapshot["gauges"]["collected"] == {"all": 1}
+    assert snapshot["histograms"]["latency_seconds"]["endpoint=listing"]["count"] == 1
+
+    text = metrics.to_prometheus()
+    assert "# HELP test_requests_total Requests served" in text
+    assert 'test_requests_total{endpoint="listing"} 3' in text
+    assert 'test_latency_seconds_bucket{endpoint="listing",le="0.1"} 0' in text
+    assert 'test_latency_seconds_bucket{endpoint="listing",le="+Inf"} 1' in text
+    assert 'test_latency_seconds_count{endpoint="listing"} 1' in text
+
+
+def test_write_prometheus(tmp_path):
+    metrics = Metrics()
+    metrics.inc("calls")
+    path = tmp_path / "metrics.prom"
+    metrics.write_prometheus(str(path))
+    assert "calls 1" in path.read_text()
+
+
+def test_a_failing_collector_does_not_break_reads():
+    metrics = Metrics()
+    metrics.add_collector(lambda registry: 1 / 0)
+    metrics.inc("calls")
+    assert metrics.snapshot()["counters"]["calls"] == {"all": 1}
+
+
+def test_server_stats_tool_reports_upstream_and_cache_metrics(make_server, stub):
+    server = make_server()
+    call = {"name": "get_reddit_posts", "arguments": {"subreddit": "python"}}
+    server._handle_tool_call(call, 1)
+    server._handle_tool_call(call, 2)
+    response = server._handle_tool_call({"name": "get_server_stats", "arguments": {}}, 3)
+    stats = json.loads(response["result"]["content"][0]["text"])
+
+    assert stats["server"]["tool_calls"] == 3
+    metrics = stats["metrics"]
+    assert metrics["counters"]["upstream_requests_total"] == {"endpoint=listing,outcome=ok": 1}
+    assert metrics["counters"]["cache_requests_total"] == {"kind=posts,result=hit": 1,
+                                                           "kind=posts,result=miss": 1}
+    assert metrics["histograms"]["upstream_latency_seconds"]["endpoint=listing"]["count"] == 1
+    assert metrics["histograms"]["tool_call_seconds"]["tool=get_reddit_posts"]["count"] == 2
+    assert metrics["gauges"]["cache_entries"] == {"all": 1}
+    assert stats["upstream"]["circuit_breaker"]["state"] == "closed"
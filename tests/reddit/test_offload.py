@@ -0,0 +1,42 @@
+import json
+
+from tools.offload import render_payload
+from tools.reddit_tools import RedditPostWithComments, Subreddit
+
+
+def offloads(tools):
+    histograms = tools.metrics.snapshot()["histograms"].get("offload_seconds", {})
+    return sum(summary["count"] for summary in histograms.values())
+
+
+def test_render_payload_matches_in_process_parsing(make_tools, stub):
+    tools = make_tools()
+    raw = tools._fetch(f"{stub.url}/r/python/about.json")
+    text = render_payload("subreddit", raw, {}, 2).decode()
+    assert Subreddit.model_validate_json(text) == tools._parse_payload("subreddit", json.loads(raw))
+
+
+def test_large_responses_are_rendered_in_worker_processes(make_tools):
+    tools = make_tools(offload_threshold=1, offload_workers=1)
+    post_id = tools.get_reddit_post("python", limit=1).posts[0].id
+    with tools.rendering(indent=None):
+        text = tools.get_post_with_comments("python", post_id)
+        listing = tools.get_reddit_post("python", limit=5)
+    assert isinstance(text, str)
+    # Listings are never offloaded: their posts go to the post store
+    assert offloads(tools) == 1
+    assert json.loads(listing)["count"] == 5
+
+    offloaded = RedditPostWithComments.model_validate_json(text)
+    local = make_tools().get_post_with_comments("python", post_id)
+    assert offloaded == local
+
+    # A cached rendered result still serves callers that want a model
+    assert tools.get_post_with_comments("python", post_id) == local
+
+
+def test_small_responses_stay_in_process(make_tools):
+    tools = make_tools(offload_threshold=10 ** 9)
+    with tools.rendering(indent=None):
+        tools.get_subreddit_about("python")
+    assert offloads(tools) == 0
@@ -0,0 +1,34 @@
+from tools.post_store import PostStore
+
+
+def post(post_id, score, created, author="alice", subreddit="python", **fields):
+    return dict(id=post_id, title=f"Post {post_id}", author=author, subreddit=subreddit, score=score,
+                num_comments=0, created_utc=created, url=f"https://example.com/{post_id}",
+                permalink=f"https://reddit.com/r/{subreddit}/comments/{post_id}/", selftext=None,
+                thumbnail=None, is_video=False, is_self=False, **fields)
+
+
+def test_round_trip_and_upsert():
+    store = PostStore(capacity=2)
+    rows = store.add_many([post("a", 1, 100.0), post("b", 2, 200.0), post("c", 3, 300.0)])
+    assert list(rows) == [0, 1, 2]
+    assert store.to_dict(1) == post("b", 2, 200.0)
+
+    again = post("b", 50, 200.0)
+    again["num_comments"] = 7
+    assert store.add(again) == 1
+    assert len(store) == 3
+    assert store.to_dict(1)["score"] == 50
+    assert store.to_dict(1)["num_comments"] == 7
+
+
+def test_filter_sort_and_top_k():
+    store = PostStore()
+    store.add_many([post("a", 10, 100.0, author="alice"), post("b", 30, 200.0, subreddit="Rust"),
+                    post("c", 20, 300.0, author="bob"), post("d", 5, 400.0)])
+    assert list(store.filter(subreddit="rust")) == [1]
+    assert list(store.filter(author="alice")) == [0, 1, 3]
+    assert list(store.filter(author="nobody")) == []
+    assert list(store.filter(min_score=10, created_before=300.0)) == [0, 1]
+    assert list(store.sort(store.rows(), by="created_utc", descending=False)) == [0, 1, 2, 3]
+    assert list(store.top_k(store.rows(), 2)) == [1, 2]
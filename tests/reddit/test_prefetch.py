@@ -0,0 +1,58 @@
+import time
+
+from tools.prefetch import PrefetchPolicy
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_hits_on_the_last_rank_grow_top_k():
+    policy = PrefetchPolicy(top_k=2, adjust_every=4)
+    for i in range(4):
+        assert policy.issue(("key", i), rank=1)
+        assert policy.record_request(("key", i))
+    assert policy.top_k == 3
+
+
+def test_unused_prefetches_shrink_top_k():
+    policy = PrefetchPolicy(top_k=3, adjust_every=4, horizon=0.01)
+    for i in range(4):
+        policy.issue(("key", i), rank=2)
+    time.sleep(0.02)
+    # Expired prefetches count as wasted once anything looks at the policy
+    assert not policy.record_request(("key", 0))
+    assert policy.top_k == 2
+    assert policy.stats()["hit_rate"] == 0.0
+
+
+def test_a_key_is_prefetched_once_while_outstanding():
+    policy = PrefetchPolicy()
+    assert policy.issue("key", 0)
+    assert not policy.issue("key", 0)
+    assert policy.record_request("key")
+    assert not policy.record_request("key")
+
+
+def test_listing_prefetches_top_comment_trees(make_tools, stub):
+    tools = make_tools(prefetch_comments=2)
+    listing = tools.get_reddit_post("python", limit=10)
+    wait_until(lambda: stub.requests == 3)
+    top = max(listing.posts, key=lambda post: post.score)
+    thread = tools.get_post_with_comments("python", top.id)
+    assert thread.post.id == top.id
+    assert stub.requests == 3
+    stats = tools.prefetch.stats()
+    assert stats["issued"] == 2
+    assert stats["by_rank"][0]["hits"] == 1
+
+
+def test_internal_pagination_does_not_prefetch(make_tools, stub):
+    tools = make_tools(prefetch_comments=2)
+    tools.analyze_posts("python", limit=150)
+    time.sleep(0.1)
+    assert stub.requests == 2
+    assert tools.prefetch.stats()["issued"] == 0
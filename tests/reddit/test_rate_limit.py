@@ -0,0 +1,23 @@
+import time
+
+from tools.rate_limit import RateLimiter
+
+
+def test_burst_then_sustained_rate():
+    limiter = RateLimiter(rate=20.0, burst=3)
+    assert [limiter.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    started = time.monotonic()
+    waited = limiter.acquire()
+    assert 0.03 < waited <= 0.05
+    assert time.monotonic() - started >= 0.03
+
+
+def test_reserve_leaves_tokens_for_interactive_callers():
+    limiter = RateLimiter(rate=20.0, burst=4)
+    limiter.acquire(reserve=2)
+    limiter.acquire(reserve=2)
+    # Two tokens are left: a reserving caller waits, an interactive one doesn't
+    started = time.monotonic()
+    limiter.acquire(reserve=2)
+    assert time.monotonic() - started >= 0.03
+    assert limiter.acquire() == 0.0
@@ -0,0 +1,105 @@
+import argparse
+import gzip
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from reddit_cli import export, open_output, parse_item
+from tools.scheduling import Priority
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+def export_args(**options):
+    defaults = dict(concurrency=2, sort="new", time="day", limit=5, comments=3,
+                    comment_sort="best", authors=False)
+    return argparse.Namespace(**{**defaults, **options})
+
+
+def test_parse_item():
+    assert parse_item("https://www.reddit.com/r/Python/comments/abc12/some_title/") == ("post", "Python", "abc12")
+    assert parse_item("python/abc12") == ("post", "python", "abc12")
+    assert parse_item("r/python abc12") == ("post", "python", "abc12")
+    assert parse_item("r/python") == ("subreddit", "python", None)
+    assert parse_item("python") == ("subreddit", "python", None)
+    assert parse_item("  ") is None and parse_item("# comment") is None
+    with pytest.raises(ValueError):
+        parse_item("not a / valid / item")
+
+
+def test_export_writes_one_line_per_item(make_tools, capsys):
+    tools = make_tools()
+    post_id = tools.get_reddit_post("python", sort="new", limit=1).posts[0].id
+    out = io.StringIO()
+    lines = ["r/python", f"python/{post_id}", "", "# skipped", "not a / valid / item"]
+    assert export(tools, lines, out, export_args()) == {"items": 2, "errors": 0}
+
+    results = {entry["item"]: entry["result"] for entry in map(json.loads, out.getvalue().splitlines())}
+    assert results["r/python"]["count"] == 5
+    assert results[f"python/{post_id}"]["post"]["id"] == post_id
+    assert results[f"python/{post_id}"]["comments"]
+    assert "line 5: Not a post or subreddit" in capsys.readouterr().err
+
+
+def test_failed_items_are_written_as_errors(make_tools, stub):
+    tools = make_tools()
+    stub.failing = True
+    out = io.StringIO()
+    assert export(tools, ["python", "rust"], out, export_args()) == {"items": 2, "errors": 2}
+    assert all("error" in json.loads(line) for line in out.getvalue().splitlines())
+
+
+def test_input_is_read_only_a_bounded_distance_ahead(make_tools, stub):
+    stub.latency = 0.02
+    tools = make_tools()
+    read = 0
+    ahead = []
+
+    def lines():
+        nonlocal read
+        for i in range(30):
+            read += 1
+            yield f"sub{i}"
+
+    class Output(io.StringIO):
+        def write(self, text):
+            ahead.append(read - (len(ahead) + 1))
+            return super().write(text)
+
+    export(tools, lines(), Output(), export_args(concurrency=2))
+    assert len(ahead) == 30
+    assert max(ahead) <= 2 * 2 + 1
+
+
+def test_export_runs_at_bulk_priority(make_tools):
+    tools = make_tools()
+    counts = export(tools, ["r/python", "rust"], io.StringIO(), export_args())
+    assert counts == {"items": 2, "errors": 0}
+    latencies = tools.scheduler.latencies
+    assert latencies[Priority.BULK].count == 2
+    assert latencies[Priority.INTERACTIVE].count == 0
+
+
+def test_gzip_output(tmp_path):
+    path = str(tmp_path / "export.ndjson.gz")
+    out = open_output(path, compress=False)
+    out.write('{"item": "python"}\n')
+    out.close()
+    with gzip.open(path, "rt") as f:
+        assert f.read() == '{"item": "python"}\n'
+
+
+def test_command_line(stub):
+    result = subprocess.run(
+        [sys.executable, "reddit_cli.py", "-", "--base-url", stub.url, "--limit", "3",
+         "--requests-per-minute", "6000"],
+        input="python\nrust\n", cwd=ROOT, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    entries = [json.loads(line) for line in result.stdout.splitlines()]
+    assert sorted(entry["item"] for entry in entries) == ["python", "rust"]
+    assert all(entry["result"]["count"] == 3 for entry in entries)
+    assert "Exported 2 items (0 failed)" in result.stderr
@@ -0,0 +1,213 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from tools.circuit_breaker import UpstreamUnavailable
+from tools.reddit_tools import RedditPost, RedditPosts, RedditPostWithComments, Subreddit
+
+
+def test_listing_search_about_and_thread(make_tools):
+    tools = make_tools()
+    posts = tools.get_reddit_post("python", sort="new", limit=5)
+    assert isinstance(posts, RedditPosts)
+    assert len(posts.posts) == 5
+    assert all(post.subreddit == "python" for post in posts.posts)
+    assert posts.after == f"t3_{posts.posts[-1].id}"
+
+    results = tools.search_post("async", subreddit="python", limit=3)
+    assert len(results.posts) == 3
+
+    about = tools.get_subreddit_about("python")
+    assert isinstance(about, Subreddit)
+    assert about.display_name == "python"
+
+    thread = tools.get_post_with_comments("python", posts.posts[0].id)
+    assert isinstance(thread, RedditPostWithComments)
+    assert thread.post.id == posts.posts[0].id
+    assert thread.comment_count == 5
+    assert all(len(comment.replies) == 1 for comment in thread.comments)
+
+
+def test_pagination_continues_after_token(make_tools):
+    tools = make_tools()
+    first = tools.get_reddit_post("python", sort="new", limit=10)
+    second = tools.get_reddit_post("python", sort="new", limit=10, after=first.after)
+    assert not {post.id for post in first.posts} & {post.id for post in second.posts}
+    assert first.posts[-1].created_utc > second.posts[0].created_utc
+
+
+def test_deduplicated_posts_return_the_next_page_token(make_tools):
+    tools = make_tools()
+    clusters = tools.get_deduplicated_posts(["python"], sort="new", limit=150)
+    first = tools.get_reddit_post("python", sort="new", limit=100)
+    second = tools.get_reddit_post("python", sort="new", limit=50, after=first.after)
+    assert clusters.after == second.after
+    following = tools.get_reddit_post("python", sort="new", limit=10, after=clusters.after)
+    assert following.posts[0].created_utc < second.posts[-1].created_utc
+
+
+def test_rendering_returns_the_model_as_json(make_tools):
+    tools = make_tools()
+    with tools.rendering(indent=None):
+        text = tools.get_reddit_post("python", limit=3)
+    assert RedditPosts.model_validate_json(text) == tools.get_reddit_post("python", limit=3)
+
+
+def test_repeat_requests_are_served_from_cache(make_tools, stub):
+    tools = make_tools()
+    tools.get_reddit_post("python", limit=5)
+    tools.get_reddit_post("Python", limit=5)
+    assert stub.requests == 1
+    assert tools.cache.hits == 1
+
+
+def test_concurrent_misses_share_one_fetch(make_tools, stub):
+    stub.latency = 0.2
+    tools = make_tools()
+    barrier = threading.Barrier(8)
+    results = []
+
+    def fetch():
+        barrier.wait()
+        results.append(tools.get_reddit_post("python", limit=5))
+
+    threads = [threading.Thread(target=fetch) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert stub.requests == 1
+    assert len(results) == 8
+    assert all(result == results[0] for result in results)
+
+
+def test_expired_result_is_served_stale_while_reddit_fails(make_tools, stub):
+    tools = make_tools(cache_ttl=0.05)
+    fresh = tools.get_reddit_post("python", limit=5)
+    time.sleep(0.1)
+    stub.failing = True
+    with tools.tracking_staleness() as staleness:
+        stale = tools.get_reddit_post("python", limit=5)
+    assert stale == fresh
+    assert staleness.stale
+    assert staleness.age >= 0.05
+
+
+def test_listing_window_is_served_stale_while_reddit_fails(make_tools, stub):
+    tools = make_tools(listing_window=86400, window_refresh=0.05)
+    fresh = tools.get_reddit_post("python", sort="new", limit=5)
+    time.sleep(0.1)
+    stub.failing = True
+    with tools.tracking_staleness() as staleness:
+        stale = tools.get_reddit_post("python", sort="new", limit=5)
+    assert stale == fresh
+    assert staleness.stale
+    assert staleness.age >= 0.05
+
+
+    stub.failing = False
+    with tools.tracking_staleness() as staleness:
+        tools.get_reddit_post("python", sort="new", limit=5)
+    assert not staleness.stale
+
+
+def test_empty_listing_window_lets_the_failure_through(make_tools, stub):
+    stub.failing = True
+    tools = make_tools(listing_window=86400)
+    with pytest.raises(requests.HTTPError):
+        tools.get_reddit_post("python", sort="new", limit=5)
+
+
+def test_failure_without_cached_result_raises(make_tools, stub):
+    stub.failing = True
+    tools = make_tools()
+    with pytest.raises(requests.HTTPError):
+        tools.get_reddit_post("python", limit=5)
+
+
+def test_breaker_opens_and_fails_fast(make_tools, stub):
+    stub.failing = True
+    tools = make_tools()
+    for _ in range(tools.breaker.min_calls):
+        with pytest.raises(requests.HTTPError):
+            tools.get_subreddit_about("python")
+    assert tools.breaker.state == tools.breaker.OPEN
+    calls = stub.requests
+    with pytest.raises(UpstreamUnavailable):
+        tools.get_subreddit_about("rust")
+    assert stub.requests == calls
+
+
+def test_post_store_holds_listing_posts(make_tools):
+    tools = make_tools()
+    posts = tools.get_reddit_post("python", sort="new", limit=20)
+    assert len(tools.post_store) == 20
+    row = tools.post_store.row_of(posts.posts[0].id)
+    assert RedditPost(**tools.post_store.to_dict(row)) == posts.posts[0]
+
+
+def test_posts_in_range_fetches_only_gaps(make_tools, stub):
+    tools = make_tools()
+    newest = tools.get_reddit_post("python", sort="new", limit=1).posts[0].created_utc
+    start, end = newest - 30 * 60, newest
+    posts = tools.get_posts_in_range("python", start, end)
+    assert posts.posts
+    assert all(start <= post.created_utc <= end for post in posts.posts)
+    calls = stub.requests
+    again = tools.get_posts_in_range("python", start + 60, end - 60)
+    assert stub.requests == calls
+    assert {post.id for post in again.posts} <= {post.id for post in posts.posts}
+
+
+def test_users_about_dedups_and_skips_missing_accounts(make_tools, stub):
+    tools = make_tools()
+    names = [f"user{i}" for i in range(60)]
+    users = tools.get_users_about(names + [name.upper() for name in names] + ["[deleted]"])
+    calls = stub.requests
+    assert calls == 60
+    assert set(users) <= set(names)
+    # The stub has no account page for about 2% of names
+    assert len(users) >= 50
+    assert all(user.name == name for name, user in users.items())
+
+    assert tools.get_users_about(users) == users
+    assert stub.requests == calls
+    assert tools.user_cache.hits == len(users)
+
+
+def test_thread_authors_enrichment(make_tools):
+    tools = make_tools()
+    post_id = tools.get_reddit_post("python", limit=1).posts[0].id
+    plain = tools.get_post_with_comments("python", post_id)
+    assert plain.authors is None
+    enriched = tools.get_post_with_comments("python", post_id, with_authors=True)
+    assert enriched.post == plain.post
+    assert enriched.post.author in enriched.authors
+    assert set(enriched.authors) <= set(tools._thread_authors(plain))
+    # The cached thread itself is left alone
+    assert tools.get_post_with_comments("python", post_id).authors is None
+
+
+def test_server_tool_exposes_author_enrichment(stub):
+    from reddit_mcp_server import RedditMCPServer
+    server = RedditMCPServer(base_url=stub.url, requests_per_minute=60_000, burst=100)
+    try:
+        arguments = {"subreddit": "python", "post_id": "abc", "with_authors": True}
+        result = server._call_tool("get_post_with_comments", arguments)
+        thread = RedditPostWithComments.model_validate_json(result) if isinstance(result, str) else result
+        assert thread.authors
+    finally:
+        server.reddit_tools.close()
+
+
+def test_memory_usage_does_not_charge_cached_listings_for_post_stores(make_tools):
+    tools = make_tools(max_stored_posts=100)
+    for subreddit in ("python", "rust", "golang"):
+        tools.get_reddit_post(subreddit, sort="new", limit=100)
+    old_store = tools.cache.get(next(key for key, _ in tools.cache.items())).store
+    assert old_store is not tools.post_store
+    listings = tools.memory_usage()["response_cache"]["posts"]
+    assert listings["entries"] == 3
+    assert listings["bytes"] < old_store.nbytes()
@@ -0,0 +1,77 @@
+import pytest
+
+from tools.refresh import ArrivalEstimate, RefreshScheduler, plan_intervals
+
+HOUR = 3600.0
+RATES = {"busy": 100 / HOUR, "mid": 10 / HOUR, "quiet": 1 / 86400, "dead": 0.0}
+
+
+def spent(intervals):
+    return sum(1 / interval for interval in intervals.values())
+
+
+def test_intervals_meet_the_target_within_bounds():
+    intervals, delay = plan_intervals(RATES, target_delay=300, budget=1.0, min_interval=30,
+                                      max_interval=6 * HOUR)
+    assert delay == pytest.approx(300, rel=0.01)
+    assert intervals["busy"] < intervals["mid"] < intervals["quiet"]
+    assert intervals["dead"] == 6 * HOUR
+    assert all(30 <= interval <= 6 * HOUR for interval in intervals.values())
+    # Square-root allocation: ten times the rate, a third of the interval
+    assert intervals["mid"] / intervals["busy"] == pytest.approx(10 ** 0.5, rel=0.01)
+
+
+def test_budget_is_a_hard_cap():
+    generous, _ = plan_intervals(RATES, 60, 1.0, 1, 6 * HOUR)
+    intervals, delay = plan_intervals(RATES, 60, budget=0.5 / 60, min_interval=1, max_interval=6 * HOUR)
+    assert spent(generous) > 0.5 / 60
+    assert spent(intervals) <= 0.5 / 60 * 1.001
+    assert delay > 60
+
+    # Even the longest intervals cost too much: all are stretched to fit
+    many = {f"sub{i}": 1.0 for i in range(100)}
+    intervals, _ = plan_intervals(many, 60, budget=1 / 60, min_interval=1, max_interval=600)
+    assert spent(intervals) == pytest.approx(1 / 60)
+
+
+def test_busy_subreddit_is_refreshed_before_a_page_fills():
+    intervals, _ = plan_intervals({"firehose": 2.0}, target_delay=3600, budget=1.0, min_interval=1,
+                                  max_interval=6 * HOUR, page_size=100, fill=0.8)
+    assert intervals["firehose"] == pytest.approx(40)
+
+
+def test_no_subreddits():
+    assert plan_intervals({}, 300, 1.0, 30, HOUR) == ({}, 0.0)
+
+
+def test_arrival_estimate_tracks_new_posts():
+    estimate = ArrivalEstimate()
+    now = 1_000_000.0
+    assert estimate.observe([now - 60 * i for i in range(100)], now, page_full=True) == 100
+    assert estimate.rate * HOUR == pytest.approx(60, rel=0.1)
+    # Only posts newer than any seen count
+    fresh = [now + 60 * i for i in range(1, 11)]
+    assert estimate.observe(fresh + [now - 60], now + 600, page_full=False) == 10
+    assert estimate.rate * HOUR == pytest.approx(60, rel=0.1)
+
+
+def test_scheduler_refresh_reports_new_posts(make_tools):
+    seen = []
+    scheduler = RefreshScheduler(make_tools(), ["Python"], min_interval=1,
+                                 on_posts=lambda subreddit, posts: seen.append((subreddit, len(posts))))
+    assert scheduler.refresh("python") == 100
+    assert scheduler.refresh("python") == 0
+    assert seen == [("python", 100)]
+    stats = scheduler.stats()
+    assert stats["refreshes"] == 2
+    assert stats["subreddits"]["python"]["posts_per_hour"] > 0
+
+
+def test_scheduler_bypasses_listing_windows(make_tools, stub):
+    tools = make_tools(listing_window=3600)
+    tools.get_reddit_post("python", sort="new")
+    scheduler = RefreshScheduler(tools, ["python"])
+    calls = stub.requests
+    scheduler.refresh("python")
+    scheduler.refresh("python")
+    assert stub.requests == calls + 2
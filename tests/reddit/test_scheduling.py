@@ -0,0 +1,99 @@
+import threading
+import time
+
+from tools.scheduling import (FairExecutor, Priority, RequestScheduler, RoundRobinQueue, client_scope,
+                              current_priority, priority_scope)
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def queued(scheduler):
+    return sum(stats["queued"] for stats in scheduler.stats().values())
+
+
+def start_waiter(scheduler, order, name, priority=Priority.INTERACTIVE, client="default"):
+    """Queue a thread for a slot; it records `name` once granted and frees the slot"""
+    def run():
+        with client_scope(client), priority_scope(priority):
+            with scheduler.slot():
+                order.append(name)
+
+    expected = queued(scheduler) + 1
+    thread = threading.Thread(target=run)
+    thread.start()
+    wait_until(lambda: queued(scheduler) == expected)
+    return thread
+
+
+def test_round_robin_queue_alternates_clients():
+    queue = RoundRobinQueue()
+    for item in ("a1", "a2", "a3"):
+        queue.push("a", item)
+    queue.push("b", "b1")
+    assert [queue.pop() for _ in range(4)] == ["a1", "b1", "a2", "a3"]
+    assert queue.pop() is None
+
+
+def test_interactive_waiters_go_before_bulk_and_background():
+    scheduler = RequestScheduler(max_concurrent=1)
+    order = []
+    scheduler.acquire(Priority.INTERACTIVE)
+    threads = [start_waiter(scheduler, order, "background", Priority.BACKGROUND),
+               start_waiter(scheduler, order, "bulk", Priority.BULK),
+               start_waiter(scheduler, order, "interactive", Priority.INTERACTIVE)]
+    scheduler.release(Priority.INTERACTIVE)
+    for thread in threads:
+        thread.join()
+    assert order == ["interactive", "bulk", "background"]
+
+
+def test_slots_go_round_robin_across_clients():
+    scheduler = RequestScheduler(max_concurrent=1)
+    order = []
+    scheduler.acquire(Priority.BULK)
+    threads = [start_waiter(scheduler, order, f"busy{i}", Priority.BULK, client="busy") for i in range(3)]
+    threads.append(start_waiter(scheduler, order, "quiet", Priority.BULK, client="quiet"))
+    scheduler.release(Priority.BULK)
+    for thread in threads:
+        thread.join()
+    assert order == ["busy0", "quiet", "busy1", "busy2"]
+
+
+def test_background_work_leaves_slots_free():
+    scheduler = RequestScheduler(max_concurrent=2, background_slots=1)
+    order = []
+    scheduler.acquire(Priority.BACKGROUND)
+    background = start_waiter(scheduler, order, "background", Priority.BACKGROUND)
+    # The second slot is free, but not to background work
+    with scheduler.slot():
+        order.append("interactive")
+    scheduler.release(Priority.BACKGROUND)
+    background.join()
+    assert order == ["interactive", "background"]
+
+
+def test_fair_executor_runs_clients_in_turn():
+    executor = FairExecutor(max_workers=1)
+    blocked = threading.Event()
+    order = []
+    blocker = executor.submit("other", blocked.wait)
+    futures = [executor.submit("busy", order.append, f"busy{i}") for i in range(3)]
+    futures.append(executor.submit("quiet", order.append, "quiet"))
+    blocked.set()
+    for future in [blocker] + futures:
+        future.result(timeout=5)
+    executor.shutdown()
+    assert order == ["busy0", "quiet", "busy1", "busy2"]
+
+
+def test_fair_executor_runs_in_the_submitter_context():
+    executor = FairExecutor(max_workers=2)
+    with client_scope("someone"), priority_scope(Priority.BULK):
+        future = executor.submit("someone", current_priority)
+    assert future.result(timeout=5) == Priority.BULK
+    executor.shutdown()
@@ -0,0 +1,63 @@
+import http.client
+import json
+import threading
+
+import pytest
+
+from tools.sse_transport import SSESession, SSETransport
+
+
+@pytest.fixture
+def transport():
+    received = []
+    dispatched = threading.Event()
+
+    def dispatch(message, write, client_id):
+        received.append(message)
+        dispatched.set()
+
+    server = SSETransport(dispatch, port=0)
+    server.received = received
+    server.dispatched = dispatched
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join(timeout=5)
+
+
+def open_session(server):
+    session = SSESession()
+    with server._lock:
+        server.sessions[session.id] = session
+    return session
+
+
+def post(connection, session_id, body):
+    connection.request("POST", f"/messages?session_id={session_id}", body=body,
+                       headers={"Content-Type": "application/json"})
+    response = connection.getresponse()
+    response.read()
+    return response.status
+
+
+def test_rejected_posts_leave_the_connection_usable(transport):
+    session = open_session(transport)
+    connection = http.client.HTTPConnection("127.0.0.1", transport.httpd.server_port, timeout=5)
+    message = json.dumps({"jsonrpc": "2.0", "method": "ping", "id": 1})
+
+    assert post(connection, "unknown", message) == 404
+    assert post(connection, session.id, message) == 202
+    # The 202 goes out before the message is dispatched
+    assert transport.dispatched.wait(5)
+    assert transport.received == [{"jsonrpc": "2.0", "method": "ping", "id": 1}]
+    connection.close()
+
+
+@pytest.mark.parametrize("body", ["[1, 2]", "\"text\"", "null", "{not json"])
+def test_bodies_that_are_not_objects_are_rejected(transport, body):
+    session = open_session(transport)
+    connection = http.client.HTTPConnection("127.0.0.1", transport.httpd.server_port, timeout=5)
+    assert post(connection, session.id, body) == 400
+    assert transport.received == []
+    connection.close()
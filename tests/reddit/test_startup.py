@@ -0,0 +1,51 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+HEAVY = ("requests", "pydantic", "numpy", "tools.reddit_tools")
+
+
+def run(code):
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True,
+                            timeout=60, env={**os.environ, "PYTHONPATH": ROOT})
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout)
+
+
+def test_initialize_and_tools_list_load_no_heavy_modules():
+    loaded = run(f"""
+import json, sys
+from reddit_mcp_server import RedditMCPServer
+server = RedditMCPServer()
+server.handle_request({{"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {{}}}})
+written = []
+server._dispatch({{"jsonrpc": "2.0", "id": 2, "method": "tools/list"}}, written.append)
+assert json.loads(written[0])["result"]["tools"]
+print(json.dumps([name for name in {HEAVY!r} if name in sys.modules]))
+""")
+    assert loaded == []
+
+
+def test_tools_package_resolves_exports_on_first_access():
+    loaded = run("""
+import json, sys
+import tools
+before = "tools.reddit_tools" in sys.modules
+tools.RedditTools
+print(json.dumps([before, "tools.reddit_tools" in sys.modules]))
+""")
+    assert loaded == [False, True]
+
+
+def test_server_builds_one_client_on_first_tool_call(make_server):
+    server = make_server()
+    assert server._reddit_tools is None
+    server.handle_request({"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+                           "params": {"name": "get_subreddit_info", "arguments": {"subreddit": "python"}}})
+    client = server._reddit_tools
+    assert client is not None
+    server.handle_request({"jsonrpc": "2.0", "id": 2, "method": "tools/call",
+                           "params": {"name": "get_subreddit_info", "arguments": {"subreddit": "rust"}}})
+    assert server._reddit_tools is client
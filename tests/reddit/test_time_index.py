@@ -0,0 +1,38 @@
+from tools.time_index import TimeIndex
+
+
+def page(ids_and_times):
+    return [dict(id=post_id, title=post_id, author="a", subreddit="python", score=1, num_comments=0,
+                 created_utc=created, url="", permalink="", selftext=None, thumbnail=None,
+                 is_video=False, is_self=False)
+            for post_id, created in ids_and_times]
+
+
+def test_pages_record_their_coverage():
+    index = TimeIndex("python")
+    index.add_page(page([("e", 500.0), ("d", 400.0)]), None, "t3_d", fetched_at=600.0)
+    assert index.covered == [[400.0, 600.0]]
+    assert index.gaps(0.0, 600.0) == [(0.0, 400.0)]
+
+    # The next page covers up to the post it was paged after
+    index.add_page(page([("c", 300.0), ("b", 200.0)]), "t3_d", "t3_b", fetched_at=610.0)
+    assert index.covered == [[200.0, 600.0]]
+    assert index.gaps(250.0, 550.0) == []
+    assert index.anchor(250.0) == "t3_c"
+
+
+def test_range_is_newest_first_and_end_of_listing_sets_floor():
+    index = TimeIndex("python")
+    index.add_page(page([("c", 300.0), ("b", 200.0), ("a", 100.0)]), None, None, fetched_at=400.0)
+    assert index.floor == 100.0
+    assert index.gaps(0.0, 400.0) == []
+    rows = index.range(150.0, 300.0)
+    assert [index.store.to_dict(int(row))["id"] for row in rows] == ["c", "b"]
+    assert len(index.range(0.0, 400.0, limit=1)) == 1
+
+
+def test_reposted_post_is_indexed_once():
+    index = TimeIndex("python")
+    index.add_page(page([("a", 100.0)]), None, "t3_a", fetched_at=200.0)
+    index.add_page(page([("a", 100.0)]), None, "t3_a", fetched_at=210.0)
+    assert len(index) == 1
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from tools import tracing
+
+
+@pytest.fixture
+def trace_file(tmp_path):
+    yield str(tmp_path / "trace.jsonl")
+    tracing.shutdown()
+
+
+def read_spans(path):
+    tracing.shutdown()
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_off_by_default_costs_a_shared_no_op():
+    assert tracing.span("anything") is tracing.span("else")
+
+
+def test_tool_call_is_traced_down_to_the_http_request(trace_file, make_server):
+    server = make_server()
+    tracing.configure(trace_file)
+    server._handle_tool_call({"name": "get_reddit_posts", "arguments": {"subreddit": "python"}}, 1)
+    spans = read_spans(trace_file)
+
+    by_id = {span["span_id"]: span for span in spans}
+    root = next(span for span in spans if span["parent_id"] is None)
+    assert root["name"] == "tool_call"
+    assert root["attrs"] == {"tool": "get_reddit_posts", "request_id": 1}
+    assert {span["trace_id"] for span in spans} == {root["trace_id"]}
+    assert all(span["parent_id"] in by_id for span in spans if span is not root)
+    names = {span["name"] for span in spans}
+    assert {"cache", "fetch", "rate_limit_wait", "http", "json_decode", "parse", "serialize"} <= names
+    http = next(span for span in spans if span["name"] == "http")
+    assert http["attrs"]["status"] == 200
+
+
+def test_errors_are_recorded_on_the_span(trace_file):
+    tracing.configure(trace_file)
+    with pytest.raises(KeyError):
+        with tracing.span("root"):
+            with tracing.span("child"):
+                raise KeyError("missing")
+    spans = read_spans(trace_file)
+    assert [span["attrs"] for span in spans] == [{"error": "KeyError"}, {"error": "KeyError"}]
+
+
+def test_sampling_and_min_duration_drop_traces(trace_file):
+    tracing.configure(trace_file, sample_rate=0.0)
+    with tracing.span("root"):
+        with tracing.span("child"):
+            pass
+    tracer = tracing.configure(trace_file, min_duration=60.0)
+    with tracing.span("root"):
+        pass
+    assert tracer.traces_dropped == 1
+    assert read_spans(trace_file) == []
+
+
+def test_chrome_format(tmp_path):
+    path = str(tmp_path / "trace.json")
+    tracing.configure(path)
+    with tracing.span("root", kind="test"):
+        with tracing.span("child"):
+            pass
+    tracing.shutdown()
+    with open(path) as f:
+        text = f.read()
+    # Viewers read the array without its closing bracket
+    events = json.loads(text.rstrip().rstrip(",") + "]")
+    assert [event["name"] for event in events] == ["child", "root"]
+    assert all(event["ph"] == "X" for event in events)
+    assert events[1]["args"]["kind"] == "test"
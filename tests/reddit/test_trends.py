@@ -0,0 +1,24 @@
+from tools.trends import TrendTracker
+
+HOUR = 3600
+
+
+def post(post_id, title, created):
+    return {"id": post_id, "title": title, "created_utc": created}
+
+
+def test_rising_term_is_found_and_posts_count_once():
+    tracker = TrendTracker()
+    now = 100 * HOUR
+    baseline = [post(f"b{i}", f"python release notes {i % 3}", now - 20 * HOUR + i * 60) for i in range(20)]
+    recent = [post(f"r{i}", "rustacean compiler release", now - HOUR + i * 60) for i in range(10)]
+    tracker.add_posts(baseline + recent)
+    tracker.add_posts(recent)
+    assert tracker.posts_seen == 30
+
+    rising = tracker.rising_terms(hours=2, baseline_hours=24, min_count=3, now=now)
+    terms = [term.term for term in rising.terms]
+    assert terms[0] in ("rustacean", "compiler")
+    assert "python" not in terms
+    first = rising.terms[0]
+    assert first.recent_count == 10 and first.baseline_count == 0
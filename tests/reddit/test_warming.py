@@ -0,0 +1,81 @@
+import json
+import logging
+import time
+
+from tools.scheduling import Priority
+from tools.warming import CacheWarmer, Watchlist
+
+
+def watchlist(**fields):
+    return Watchlist.model_validate({
+        "listings": [{"subreddit": "python"}, {"sort": "new"}],
+        "searches": [{"query": "async", "subreddit": "python"}],
+        "about": ["rust"],
+        **fields
+    })
+
+
+def test_load(tmp_path):
+    path = tmp_path / "watchlist.json"
+    path.write_text(json.dumps({"refresh_interval": 60, "listings": [{"subreddit": "python", "limit": 10}]}))
+    loaded = Watchlist.load(str(path))
+    assert loaded.refresh_interval == 60
+    assert loaded.listings[0].subreddit == "python" and loaded.listings[0].sort == "hot"
+
+
+def test_warmed_entries_serve_plain_calls(make_tools, stub):
+    tools = make_tools()
+    warmer = CacheWarmer(tools, watchlist())
+    assert warmer.warm_once() == {"warmed": 4, "failed": 0}
+    assert stub.requests == 4
+    assert tools.scheduler.latencies[Priority.BACKGROUND].count == 4
+
+    # The MCP tools' defaults look up the warmed entries
+    tools.get_reddit_post("python")
+    tools.get_all_post("new")
+    tools.search_post("async", "python")
+    tools.get_subreddit_about("rust")
+    assert stub.requests == 4
+
+
+def test_warming_does_not_prefetch_comments(make_tools, stub):
+    tools = make_tools(prefetch_comments=2)
+    CacheWarmer(tools, watchlist()).warm_once()
+    time.sleep(0.1)
+    assert stub.requests == 4
+    assert tools.prefetch.stats()["issued"] == 0
+
+
+def test_each_round_refetches_cached_entries(make_tools, stub):
+    tools = make_tools()
+    warmer = CacheWarmer(tools, watchlist())
+    warmer.warm_once()
+    warmer.warm_once()
+    assert stub.requests == 8
+    assert warmer.rounds == 2
+
+
+def test_failures_are_counted_and_the_round_goes_on(make_tools, stub, caplog):
+    tools = make_tools()
+    warmer = CacheWarmer(tools, watchlist())
+    warmer.warm_once()
+    stub.failing = True
+    # Inside reloading() nothing is served stale
+    with caplog.at_level(logging.WARNING, logger="tools.warming"):
+        assert warmer.warm_once() == {"warmed": 0, "failed": 4}
+    assert warmer.failures == 4
+    # Failures are sampled events, not plain records
+    assert [record.category for record in caplog.records] == ["warming"] * 4
+
+
+def test_start_and_stop(make_tools, stub):
+    tools = make_tools()
+    warmer = CacheWarmer(tools, watchlist(refresh_interval=60))
+    thread = warmer.start()
+    deadline = time.monotonic() + 5
+    while warmer.rounds == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    warmer.stop()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert warmer.rounds == 1
@@ -1,3 +1,30 @@
-from .reddit_tools import RedditTools, RedditPost, RedditPosts, Subreddit, Subreddits
+import importlib
 
-__all__ = ["RedditTools", "RedditPost", "RedditPosts", "Subreddit", "Subreddits"]
\ No newline at end of file
+# Submodules are imported on first attribute access, so a server can answer
+# `initialize` before pydantic and requests are loaded
+_EXPORTS = {
+    "RedditTools": ".reddit_tools",
+    "RedditPost": ".reddit_tools",
+    "RedditPosts": ".reddit_tools",
+    "Subreddit": ".reddit_tools",
+    "Subreddits": ".reddit_tools",
+    "RedditUser": ".reddit_tools",
+    "PostStore": ".post_store",
+    "CancelToken": ".cancellation",
+    "RequestCancelled": ".cancellation",
+    "Priority": ".scheduling",
+    "priority_scope": ".scheduling",
+    "Crawler": ".crawl",
+    "CrawlJournal": ".crawl",
+    "RefreshScheduler": ".refresh"
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
\ No newline at end of file
@@ -0,0 +1,80 @@
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from pydantic import BaseModel
+
+from .reddit_tools import RedditPost
+from .text import keywords
+
+
+class CountItem(BaseModel):
+    """A value and how often it occurred"""
+    value: str
+    count: int
+
+
+class PostAnalytics(BaseModel):
+    """Aggregates computed server-side over a set of posts"""
+    post_count: int
+    top_authors: List[CountItem]
+    score_percentiles: Dict[str, float]
+    comment_percentiles: Dict[str, float]
+    posts_by_hour: List[int]
+    top_keywords: List[CountItem]
+    earliest_utc: Optional[float] = None
+    latest_utc: Optional[float] = None
+
+
+def _top_counts(values: Iterable[str], top_n: int) -> List[CountItem]:
+    """Most frequent values, counted in one hash pass"""
+    return [CountItem(value=value, count=count) for value, count in Counter(values).most_common(top_n)]
+
+
+def _percentiles(values: np.ndarray, percentiles: Sequence[float]) -> Dict[str, float]:
+    if not values.size:
+        return {}
+    results = np.percentile(values, percentiles)
+    return {f"p{p:g}": float(v) for p, v in zip(percentiles, results)}
+
+
+def analyze_posts(posts: Sequence[RedditPost], top_n: int = 10,
+                  percentiles: Sequence[float] = (10, 25, 50, 75, 90, 99),
+                  include_selftext: bool = False) -> PostAnalytics:
+    """
+    Compute summary statistics over posts
+
+    Args:
+        posts: Posts to analyze
+        top_n: Number of authors and keywords to return
+        percentiles: Percentiles to compute for scores and comment counts
+        include_selftext: Count keywords in post bodies as well as titles
+
+    Returns:
+        PostAnalytics with top authors, score and comment percentiles,
+        posts per UTC hour of day and the most frequent title keywords
+    """
+    scores = np.fromiter((post.score for post in posts), dtype=np.int64, count=len(posts))
+    comments = np.fromiter((post.num_comments for post in posts), dtype=np.int64, count=len(posts))
+    created = np.fromiter((post.created_utc for post in posts), dtype=np.float64, count=len(posts))
+
+    hours = ((created // 3600) % 24).astype(np.int64)
+    posts_by_hour = np.bincount(hours, minlength=24) if hours.size else np.zeros(24, dtype=np.int64)
+
+    authors = [post.author for post in posts if post.author not in ("[deleted]", "[removed]")]
+
+    words: List[str] = []
+    for post in posts:
+        text = f"{post.title} {post.selftext or ''}" if include_selftext else post.title
+        words.extend(keywords(text))
+
+    return PostAnalytics(
+        post_count=len(posts),
+        top_authors=_top_counts(authors, top_n),
+        score_percentiles=_percentiles(scores, percentiles),
+        comment_percentiles=_percentiles(comments, percentiles),
+        posts_by_hour=[int(count) for count in posts_by_hour],
+        top_keywords=_top_counts(words, top_n),
+        earliest_utc=float(created.min()) if created.size else None,
+        latest_utc=float(created.max()) if created.size else None
+    )
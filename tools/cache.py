@@ -0,0 +1,138 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from .cancellation import RequestCancelled
+
+
+class _Load:
+    """An in-flight cache load that concurrent callers for the same key wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a time-to-live"""
+
+    def __init__(self, ttl: float = 60.0, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # key -> (expiry, value, time stored), all on the monotonic clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, float]]" = OrderedDict()
+        self._loads: Dict[Hashable, _Load] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, count: bool = False) -> Optional[Any]:
+        """Return the cached value for `key`, or None if missing or expired; `count` records a hit"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                return None
+            self._entries.move_to_end(key)
+            if count:
+                self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store `value` under `key` for `ttl` seconds (default: the cache TTL)"""
+        now = time.monotonic()
+        expires = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires, value, now)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_stale(self, key: Hashable, max_stale: float) -> Optional[Tuple[Any, float]]:
+        """
+        Return a value for `key` even if it has expired
+
+        Expired entries stay in the cache until they are evicted, so they
+        can stand in when a fresh value can't be loaded.
+
+        Args:
+            key: Cache key
+            max_stale: Seconds past its expiry a value may still be returned
+
+        Returns:
+            (value, seconds since it was stored), or None
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or now - entry[0] > max_stale:
+                return None
+            return entry[1], now - entry[2]
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], ttl: Optional[float] = None,
+                    refresh: bool = False) -> Any:
+        """
+        Return the cached value for `key`, calling `loader` on a miss
+
+        Concurrent misses for the same key share a single load, so many
+        clients asking for the same listing cause one upstream fetch.
+
+        Args:
+            key: Cache key
+            loader: Function producing the value on a miss
+            ttl: Time-to-live for the loaded value (default: the cache TTL)
+            refresh: Load even if a fresh value is cached; other callers keep
+                getting the cached value until the new one replaces it
+
+        Returns:
+            The cached or freshly loaded value
+        """
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if not refresh and entry is not None and entry[0] >= time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+
+                load = self._loads.get(key)
+                leader = load is None
+                if leader:
+                    load = _Load()
+                    self._loads[key] = load
+                    self.misses += 1
+
+            if leader:
+                try:
+                    load.value = loader()
+                    self.set(key, load.value, ttl)
+                    return load.value
+                except BaseException as e:
+                    load.error = e
+                    raise
+                finally:
+                    with self._lock:
+                        del self._loads[key]
+                    load.done.set()
+
+            load.done.wait()
+            if load.error is None:
+                return load.value
+            if not isinstance(load.error, RequestCancelled):
+                raise load.error
+            # The leading request was cancelled by its own client, load again
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """Snapshot of the cached keys and values, expired ones included"""
+        with self._lock:
+            return [(key, entry[1]) for key, entry in self._entries.items()]
+
+    def clear(self) -> None:
+        """Remove all entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,103 @@
+import contextvars
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, List, Optional
+
+
+class RequestCancelled(Exception):
+    """Raised when the client cancelled the request being served"""
+
+
+class CancelToken:
+    """Cancellation flag shared by a tool call and all work spawned for it"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether cancellation has been requested"""
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        """Request cancellation and run the registered abort callbacks"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def add_callback(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        Register a callback that aborts in-flight work on cancellation
+
+        Args:
+            callback: Function to call once the token is cancelled
+
+        Returns:
+            Function that unregisters the callback
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+
+                def remove():
+                    with self._lock:
+                        if callback in self._callbacks:
+                            self._callbacks.remove(callback)
+
+                return remove
+
+        # Already cancelled, abort right away
+        callback()
+        return lambda: None
+
+    def raise_if_cancelled(self) -> None:
+        """Raise RequestCancelled if cancellation has been requested"""
+        if self._event.is_set():
+            raise RequestCancelled("Request was cancelled")
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until cancelled or the timeout expires, returning the cancelled state"""
+        return self._event.wait(timeout)
+
+
+_current_token: contextvars.ContextVar[Optional[CancelToken]] = contextvars.ContextVar(
+    "reddit_cancel_token", default=None
+)
+
+
+def current_token() -> Optional[CancelToken]:
+    """Return the cancel token of the request being served, if any"""
+    return _current_token.get()
+
+
+def check_cancelled() -> None:
+    """Raise RequestCancelled if the current request has been cancelled"""
+    token = _current_token.get()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+@contextmanager
+def cancel_scope(token: Optional[CancelToken]):
+    """Make `token` the current cancel token for the duration of the block"""
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
+
+
+def run_with_token(token: Optional[CancelToken], fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Call `fn` with `token` as the current cancel token"""
+    with cancel_scope(token):
+        return fn(*args, **kwargs)
@@ -0,0 +1,109 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+
+class UpstreamUnavailable(Exception):
+    """Raised instead of calling upstream while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream that is failing or too slow
+
+    Closed, it lets every call through and keeps the outcomes of the last
+    `window` calls; a call fails if it errors or takes longer than
+    `latency_threshold`. Once at least `min_calls` are recorded and the
+    failure rate reaches `failure_rate` it opens: calls are refused for
+    `open_seconds`. It then goes half-open and lets a single probe call
+    through, closing again if the probe succeeds and reopening if not.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_rate: float = 0.5, latency_threshold: float = 10.0,
+                 window: int = 20, min_calls: int = 5, open_seconds: float = 30.0):
+        """
+        Args:
+            failure_rate: Share of failed calls in the window that opens the circuit
+            latency_threshold: Seconds after which a successful call counts as failed
+            window: Number of recent calls considered
+            min_calls: Calls needed in the window before it can open
+            open_seconds: How long the circuit stays open before probing
+        """
+        self.failure_rate = failure_rate
+        self.latency_threshold = latency_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.state = self.CLOSED
+        self.times_opened = 0
+        self.rejected = 0
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now; a True in half-open state makes it the probe"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, ok: bool, latency: float = 0.0) -> None:
+        """Record the outcome of an allowed call"""
+        failed = not ok or latency > self.latency_threshold
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                if not self._probing:
+                    return
+                self._probing = False
+                if failed:
+                    self._open()
+                else:
+                    self.state = self.CLOSED
+                    self._outcomes.clear()
+                return
+            if self.state == self.OPEN:
+                return
+            self._outcomes.append(failed)
+            if (len(self._outcomes) >= self.min_calls
+                    and sum(self._outcomes) / len(self._outcomes) >= self.failure_rate):
+                self._open()
+
+    def release(self) -> None:
+        """Give up an allowed call without an outcome (it was cancelled)"""
+        with self._lock:
+            self._probing = False
+
+    def _open(self) -> None:
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self.times_opened += 1
+        self._outcomes.clear()
+
+    def retry_after(self) -> Optional[float]:
+        """Seconds until the next probe is allowed, or None if not open"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return None
+            return max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+                "recent_failures": sum(self._outcomes),
+                "recent_calls": len(self._outcomes)
+            }
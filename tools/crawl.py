@@ -0,0 +1,234 @@
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Any, Dict, List, Optional, Set
+
+import requests
+
+from .circuit_breaker import UpstreamUnavailable
+from .log_pipeline import event
+from .reddit_tools import RedditTools
+from .scheduling import Priority, client_scope, priority_scope
+
+logger = logging.getLogger(__name__)
+
+
+class _Progress:
+    """Where a subreddit's crawl stands"""
+
+    __slots__ = ("cursor", "pages", "done")
+
+    def __init__(self):
+        self.cursor: Optional[str] = None
+        self.pages = 0
+        self.done = False
+
+
+class CrawlJournal:
+    """
+    Append-only record of finished crawl units
+
+    A unit is one listing page of one subreddit. Its line holds the
+    subreddit, the cursor it was fetched with and the one after it, the ids
+    of the posts written for it, and the length of the output once they
+    were written. A line torn by a crash is cut off when the journal is
+    next opened.
+    """
+
+    def __init__(self, path: str, sync: bool = True):
+        """
+        Args:
+            path: Journal file, created if missing
+            sync: fsync every line, so a unit survives a power loss as well
+                as a crash of the process
+        """
+        self.path = path
+        self.sync = sync
+        self.progress: Dict[str, _Progress] = {}
+        self.seen: Set[str] = set()
+        self.output_length = 0
+        self.units = 0
+        self._load()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        valid = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    unit = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                valid += len(line)
+                self._apply(unit)
+        if valid < os.path.getsize(self.path):
+            logger.warning("Dropping a torn unit at the end of %s", self.path)
+            os.truncate(self.path, valid)
+
+    def _apply(self, unit: Dict[str, Any]) -> None:
+        progress = self.progress.setdefault(unit["subreddit"], _Progress())
+        progress.cursor = unit["next"]
+        progress.pages += 1
+        progress.done = unit["done"]
+        self.seen.update(unit["post_ids"])
+        self.output_length = unit["output_length"]
+        self.units += 1
+
+    def commit(self, subreddit: str, cursor: Optional[str], next_cursor: Optional[str],
+               post_ids: List[str], output_length: int, done: bool) -> None:
+        """Record a unit whose output is already durably written"""
+        unit = {"subreddit": subreddit, "cursor": cursor, "next": next_cursor, "post_ids": post_ids,
+                "output_length": output_length, "done": done, "time": round(time.time(), 3)}
+        self._file.write(json.dumps(unit) + "\n")
+        self._file.flush()
+        if self.sync:
+            os.fsync(self._file.fileno())
+        self._apply(unit)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class Crawler:
+    """
+    Crawls subreddit listings into an NDJSON file, resumably and exactly once
+
+    Each subreddit is paged through with `after` cursors, one post per
+    output line. After each page the new posts are written and synced,
+    then the page is committed to the journal. On restart the output is
+    cut back to the length recorded by the last committed unit, dropping
+    posts written after it, and every subreddit carries on from its last
+    cursor. Finished pages are never fetched again, and each post appears
+    once in the output, even when a listing shifts and repeats a post on
+    the next page.
+
+    Failures are retried with backoff. A subreddit that still fails is
+    left unfinished and is picked up by the next run.
+    """
+
+    def __init__(self, reddit_tools: RedditTools, output: str, journal: Optional[str] = None,
+                 sort: str = "new", time_filter: str = "all", max_pages: Optional[int] = None,
+                 concurrency: int = 4, retries: int = 5, sync: bool = True):
+        """
+        Args:
+            reddit_tools: Client to fetch with
+            output: NDJSON file posts are appended to
+            journal: Journal file (default: the output path plus ".journal")
+            sort: Listing sort (new, hot, top, rising)
+            time_filter: Period for the top sort
+            max_pages: Pages of up to 100 posts per subreddit (None: until the listing ends)
+            concurrency: Subreddits crawled at once
+            retries: Attempts per page before a subreddit is given up for this run
+            sync: fsync output and journal after every page
+        """
+        self.reddit_tools = reddit_tools
+        self.output = output
+        self.sort = sort
+        self.time_filter = time_filter
+        self.max_pages = max_pages
+        self.concurrency = concurrency
+        self.retries = retries
+        self.sync = sync
+        self.journal = CrawlJournal(journal or output + ".journal", sync)
+        self.failed: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._out = self._open_output()
+
+    def _open_output(self) -> IO[bytes]:
+        committed = self.journal.output_length
+        length = os.path.getsize(self.output) if os.path.exists(self.output) else 0
+        if length < committed:
+            raise RuntimeError(f"{self.output} is shorter than its journal records "
+                               f"({length} < {committed} bytes); it can't be resumed")
+        if length > committed:
+            logger.info("Dropping %d bytes written after the last committed unit", length - committed)
+            os.truncate(self.output, committed)
+        return open(self.output, "ab")
+
+    def _fetch_page(self, subreddit: str, cursor: Optional[str]):
+        for attempt in range(self.retries):
+            try:
+                return self.reddit_tools.get_reddit_post(subreddit, self.sort, 100, self.time_filter, cursor)
+            except requests.HTTPError as e:
+                status = e.response.status_code if e.response is not None else 0
+                # Missing, private or banned subreddits won't come back on a retry
+                if status != 429 and status < 500 or attempt == self.retries - 1:
+                    raise
+                delay = 2.0 ** attempt
+            except UpstreamUnavailable:
+                if attempt == self.retries - 1:
+                    raise
+                delay = max(self.reddit_tools.breaker.retry_after() or 0.0, 2.0 ** attempt)
+            except Exception:
+                if attempt == self.retries - 1:
+                    raise
+                delay = 2.0 ** attempt
+            event(logger, "crawl_retry", "Retrying r/%s after %s in %.0fs", subreddit, cursor, delay)
+            time.sleep(delay)
+
+    def _crawl(self, subreddit: str) -> None:
+        # Bulk work: interactive calls sharing the client go first
+        with client_scope("crawler"), priority_scope(Priority.BULK):
+            self._crawl_pages(subreddit)
+
+    def _crawl_pages(self, subreddit: str) -> None:
+        progress = self.journal.progress.get(subreddit) or _Progress()
+        cursor, pages = progress.cursor, progress.pages
+        while not progress.done:
+            try:
+                page = self._fetch_page(subreddit, cursor)
+            except Exception as e:
+                logger.error("Giving up on r/%s for this run: %s", subreddit, e)
+                with self._lock:
+                    self.failed[subreddit] = str(e)
+                return
+            pages += 1
+            done = (page.after is None or not page.posts
+                    or (self.max_pages is not None and pages >= self.max_pages))
+            with self._lock:
+                fresh = [post for post in page.posts if post.id not in self.journal.seen]
+                data = b"".join(json.dumps(post.model_dump()).encode() + b"\n" for post in fresh)
+                self._out.write(data)
+                self._out.flush()
+                if self.sync:
+                    os.fsync(self._out.fileno())
+                self.journal.commit(subreddit, cursor, page.after, [post.id for post in fresh],
+                                    self._out.tell(), done)
+                progress = self.journal.progress[subreddit]
+            cursor = page.after
+
+    def run(self, subreddits: List[str]) -> Dict[str, Any]:
+        """
+        Crawl `subreddits`, resuming from the journal
+
+        Returns:
+            Dictionary with the pages and posts committed in all runs so far,
+            the subreddits finished and the ones that failed in this run
+        """
+        # Subreddit names are case-insensitive; crawl each once
+        names = list(dict.fromkeys(name.lower() for name in subreddits))
+        pending = [name for name in names
+                   if not (name in self.journal.progress and self.journal.progress[name].done)]
+        self.failed = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="crawl") as executor:
+            for future in [executor.submit(self._crawl, name) for name in pending]:
+                future.result()
+        return {
+            "pages": self.journal.units,
+            "posts": len(self.journal.seen),
+            "finished": sum(1 for name in names
+                            if name in self.journal.progress and self.journal.progress[name].done),
+            "subreddits": len(names),
+            "failed": dict(self.failed)
+        }
+
+    def close(self) -> None:
+        self._out.close()
+        self.journal.close()
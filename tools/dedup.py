@@ -0,0 +1,227 @@
+import re
+from typing import Dict, List, Optional, Sequence
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from pydantic import BaseModel, Field
+
+from .reddit_tools import RedditPost
+
+_PRIME = (1 << 31) - 1
+_SHINGLE = 5
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+_REDDIT_POST = re.compile(r"/comments/([a-z0-9]+)")
+_TRACKING_PARAMS = frozenset(("ref", "ref_source", "ref_src", "share_id", "context", "si", "feature"))
+_HOST_PREFIXES = ("www.", "m.", "old.", "new.", "np.", "amp.", "mobile.")
+
+
+class DuplicateRef(BaseModel):
+    """A post collapsed into another post's cluster"""
+    id: str
+    subreddit: str
+    permalink: str
+    score: int
+    match: str = Field(description="'url' if it shares a link with another post in the cluster "
+                                   "or is a crosspost of one, 'similar' for near-identical text")
+
+
+class PostCluster(BaseModel):
+    """A post and the duplicates collapsed into it"""
+    post: RedditPost
+    duplicates: List[DuplicateRef] = []
+
+
+class PostClusters(BaseModel):
+    """Posts with duplicates and crossposts collapsed into clusters"""
+    clusters: List[PostCluster]
+    post_count: int
+    cluster_count: int
+    after: Optional[str] = None
+
+
+def normalize_url(url: str) -> Optional[str]:
+    """
+    Canonical key for the link a post points to
+
+    Reddit post links (permalinks, redd.it short links, and so crossposts,
+    whose url is their parent's) reduce to the post id; other links lose
+    their scheme, common host prefixes, tracking parameters, fragment and
+    trailing slash.
+    """
+    if not url:
+        return None
+    parts = urlsplit(url.strip() if "://" in url else f"https://reddit.com{url.strip()}")
+    host = (parts.hostname or "").lower()
+    for prefix in _HOST_PREFIXES:
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    path = parts.path.rstrip("/")
+
+    if host in ("reddit.com", "redd.it"):
+        match = _REDDIT_POST.search(path.lower())
+        if match:
+            return f"reddit:{match.group(1)}"
+        if host == "redd.it" and path:
+            return f"reddit:{path.strip('/').lower()}"
+    if host == "youtu.be" and path:
+        return f"youtube:{path.strip('/')}"
+    query = [(key, value) for key, value in parse_qsl(parts.query)
+             if not key.lower().startswith("utm_") and key.lower() not in _TRACKING_PARAMS]
+    if host == "youtube.com" and path == "/watch":
+        video = dict(query).get("v")
+        if video:
+            return f"youtube:{video}"
+    query.sort()
+    return f"{host}{path}" + (f"?{urlencode(query)}" if query else "")
+
+
+def _shingle_hashes(text: str) -> np.ndarray:
+    """Hashes of the character 5-grams of normalized text"""
+    data = np.frombuffer(_NON_WORD.sub(" ", text.lower()).strip().encode(), dtype=np.uint8)
+    if not data.size:
+        return np.empty(0, dtype=np.uint64)
+    if data.size < _SHINGLE:
+        data = np.pad(data, (0, _SHINGLE - data.size))
+    powers = np.array([257 ** k for k in range(_SHINGLE - 1, -1, -1)], dtype=np.uint64)
+    return (sliding_window_view(data, _SHINGLE).astype(np.uint64) @ powers) % _PRIME
+
+
+def minhash_signatures(texts: Sequence[str], num_perm: int = 64, seed: int = 1,
+                       batch_size: int = 256) -> np.ndarray:
+    """
+    MinHash signatures of texts over their character 5-grams
+
+    Each batch of texts is hashed under all permutations at once: one
+    (permutations x shingles) matrix, reduced per text with minimum.reduceat.
+
+    Returns:
+        (len(texts), num_perm) array; rows of texts with no shingles are all
+        _PRIME and never match
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)[:, None]
+    b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)[:, None]
+    signatures = np.full((len(texts), num_perm), _PRIME, dtype=np.uint64)
+
+    for first in range(0, len(texts), batch_size):
+        shingles = [_shingle_hashes(text) for text in texts[first:first + batch_size]]
+        present = [i for i, hashes in enumerate(shingles) if hashes.size]
+        if not present:
+            continue
+        lengths = np.array([shingles[i].size for i in present])
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        hashed = (a * np.concatenate([shingles[i] for i in present])[None, :] + b) % _PRIME
+        signatures[first + np.array(present)] = np.minimum.reduceat(hashed, offsets, axis=1).T
+    return signatures
+
+
+def _similar_pairs(signatures: np.ndarray, threshold: float, bands: int) -> List[tuple]:
+    """Pairs of rows whose signatures agree on at least `threshold` of positions"""
+    valid = np.flatnonzero((signatures != _PRIME).any(axis=1))
+    if len(valid) < 2:
+        return []
+    rows_per_band = signatures.shape[1] // bands
+    pairs = set()
+    for band in range(bands):
+        chunk = np.ascontiguousarray(signatures[valid, band * rows_per_band:(band + 1) * rows_per_band])
+        keys = chunk.view(np.dtype((np.void, chunk.dtype.itemsize * rows_per_band))).ravel()
+        _, bucket, sizes = np.unique(keys, return_inverse=True, return_counts=True)
+        groups = np.split(valid[np.argsort(bucket, kind="stable")], np.cumsum(sizes)[:-1])
+        for members in groups:
+            if len(members) > 50:
+                # The same text many times over only needs linking to one member
+                pairs.update((int(members[0]), int(other)) for other in members[1:])
+            elif len(members) > 1:
+                pairs.update((int(left), int(right))
+                             for i, left in enumerate(members) for right in members[i + 1:])
+
+    return [(left, right) for left, right in pairs
+            if np.mean(signatures[left] == signatures[right]) >= threshold]
+
+
+class _UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, item: int) -> int:
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, left: int, right: int) -> None:
+        left, right = self.find(left), self.find(right)
+        if left != right:
+            self.parent[max(left, right)] = min(left, right)
+
+
+def cluster_posts(posts: Sequence[RedditPost], threshold: float = 0.7,
+                  include_selftext: bool = True, num_perm: int = 64,
+                  bands: int = 16) -> PostClusters:
+    """
+    Collapse duplicate posts into clusters
+
+    Posts sharing a normalized link (including crossposts, whose link is
+    their parent) are merged exactly; the rest are compared by MinHash/LSH
+    over their title and selftext.
+
+    Args:
+        posts: Posts to cluster, in listing order
+        threshold: Estimated Jaccard similarity of text needed to merge
+        include_selftext: Compare post bodies as well as titles
+        num_perm: MinHash signature length
+        bands: LSH bands; num_perm / bands rows each
+
+    Returns:
+        PostClusters in order of first appearance, each led by its highest
+        scoring post
+    """
+    clusters = _UnionFind(len(posts))
+    first_by_key: Dict[str, int] = {}
+    # Posts merged through a shared link rather than similar text
+    linked = set()
+    for i, post in enumerate(posts):
+        # A self post's link is its own permalink and a crosspost's is its parent's
+        key = normalize_url(post.url)
+        if key is None:
+            continue
+        if key in first_by_key:
+            clusters.union(first_by_key[key], i)
+            linked.update((first_by_key[key], i))
+        else:
+            first_by_key[key] = i
+        # Also index the post under its own id, for crossposts of it
+        own = f"reddit:{post.id.lower()}"
+        if own != key:
+            if own in first_by_key:
+                clusters.union(first_by_key[own], i)
+                linked.update((first_by_key[own], i))
+            else:
+                first_by_key[own] = i
+
+    texts = [f"{post.title} {post.selftext or ''}" if include_selftext else post.title for post in posts]
+    for left, right in _similar_pairs(minhash_signatures(texts, num_perm), threshold, bands):
+        clusters.union(left, right)
+
+    members: Dict[int, List[int]] = {}
+    for i in range(len(posts)):
+        members.setdefault(clusters.find(i), []).append(i)
+
+    result = []
+    for group in members.values():
+        lead = max(group, key=lambda i: (posts[i].score, -i))
+        duplicates = [
+            DuplicateRef(
+                id=posts[i].id,
+                subreddit=posts[i].subreddit,
+                permalink=posts[i].permalink,
+                score=posts[i].score,
+                match="url" if i in linked else "similar"
+            )
+            for i in group if i != lead
+        ]
+        result.append(PostCluster(post=posts[lead], duplicates=duplicates))
+
+    return PostClusters(clusters=result, post_count=len(posts), cluster_count=len(result))
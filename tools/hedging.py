@@ -0,0 +1,107 @@
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+import numpy as np
+
+# Seconds an upstream request may take, by endpoint, before it is abandoned
+DEFAULT_DEADLINES = {
+    "listing": 10.0,
+    "search": 15.0,
+    "about": 5.0,
+    "comments": 20.0
+}
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when an upstream request runs past its endpoint's deadline"""
+
+
+def endpoint_of(url: str) -> str:
+    """Classify a Reddit API URL as listing, search, about or comments"""
+    path = url.split("?", 1)[0]
+    if "/comments/" in path:
+        return "comments"
+    if path.endswith("/search.json"):
+        return "search"
+    if path.endswith("/about.json"):
+        return "about"
+    return "listing"
+
+
+class HedgePolicy:
+    """
+    When to send a second copy of a slow upstream request
+
+    Latencies of recent successful requests are kept per endpoint. Once an
+    endpoint has `min_samples` of them, a request still unanswered after
+    their `percentile`th percentile is hedged: an identical request is
+    sent and whichever answers first wins. Hedges are paid for from a
+    budget that grows by `budget` per request, so at most that share of
+    requests is ever doubled.
+    """
+
+    def __init__(self, percentile: float = 95.0, budget: float = 0.05, min_samples: int = 20,
+                 window: int = 200, min_delay: float = 0.05, max_credit: float = 10.0):
+        """
+        Args:
+            percentile: Latency percentile after which a request is hedged
+            budget: Hedges allowed per request, on average
+            min_samples: Latencies needed before an endpoint is hedged
+            window: Recent latencies kept per endpoint
+            min_delay: Never hedge sooner than this many seconds
+            max_credit: Most hedges that can be saved up for a burst
+        """
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.window = window
+        self.min_delay = min_delay
+        self.max_credit = max_credit
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._credit = 0.0
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._delays: Dict[str, Optional[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint: str, latency: float) -> None:
+        """Record the latency of a successful request"""
+        with self._lock:
+            latencies = self._latencies.setdefault(endpoint, deque(maxlen=self.window))
+            latencies.append(latency)
+            # Recomputing on every sample would cost more than it saves
+            if len(latencies) >= self.min_samples and len(latencies) % 10 == 0:
+                delay = float(np.percentile(np.fromiter(latencies, dtype=np.float64), self.percentile))
+                self._delays[endpoint] = max(self.min_delay, delay)
+
+    def delay(self, endpoint: str) -> Optional[float]:
+        """Seconds to wait before hedging a request, or None to never hedge it; counts the request"""
+        with self._lock:
+            self.requests += 1
+            self._credit = min(self.max_credit, self._credit + self.budget)
+            return self._delays.get(endpoint)
+
+    def try_hedge(self) -> bool:
+        """Spend budget on one hedge, if there is enough"""
+        with self._lock:
+            if self._credit < 1.0:
+                return False
+            self._credit -= 1.0
+            self.hedged += 1
+            return True
+
+    def won(self) -> None:
+        """Note that a hedge answered before the request it copied"""
+        with self._lock:
+            self.hedge_wins += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "delays": {endpoint: round(delay, 3) for endpoint, delay in self._delays.items()}
+            }
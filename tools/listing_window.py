@@ -0,0 +1,261 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .post_store import PostStore
+
+# fetch_page(after) -> (post field dicts, next after token) for one page of
+# a subreddit's `new` listing
+FetchPage = Callable[[Optional[str]], Tuple[List[Dict[str, Any]], Optional[str]]]
+
+# Seconds covered by each `top` time filter that can be answered locally
+TOP_PERIODS = {
+    "hour": 3600,
+    "day": 86400,
+    "week": 7 * 86400,
+    "month": 30 * 86400,
+    "year": 365 * 86400
+}
+
+# Reddit stops paginating a listing after about this many posts
+LISTING_CAP = 1000
+
+
+class ListingWindow:
+    """
+    Rolling local copy of one subreddit's newest posts
+
+    The window holds every post from `covered_from` up to its last sync,
+    fetched from the `new` listing. A refresh pages down from the head of
+    the listing until it meets a post it already has; extending the window
+    pages further back from where it stopped. Both `new` and `top` within a
+    time period are then answered by sorting and filtering the local set.
+
+    Scores and comment counts are as of the last time a post was fetched.
+    """
+
+    def __init__(self, subreddit: str, span: float):
+        """
+        Args:
+            subreddit: Name of the subreddit
+            span: Seconds of posts to keep; older posts are dropped on compaction
+        """
+        self.subreddit = subreddit
+        self.span = span
+        self.store = PostStore()
+        self.synced_at: Optional[float] = None
+        # Every post created at or after this is in the store
+        self.covered_from: Optional[float] = None
+        # Token to continue the `new` listing past the oldest stored post
+        self.next_after: Optional[str] = None
+        # The listing ended before Reddit's pagination cap
+        self.complete = False
+        self.lock = threading.Lock()
+
+    def _add(self, posts: List[Dict[str, Any]]) -> None:
+        self.store.add_many(posts)
+        if posts:
+            oldest = min(post["created_utc"] for post in posts)
+            if self.covered_from is None or oldest < self.covered_from:
+                self.covered_from = oldest
+
+    def _reset(self) -> None:
+        self.store = PostStore()
+        self.covered_from = None
+        self.next_after = None
+        self.complete = False
+
+    def refresh(self, fetch_page: FetchPage, now: float, max_pages: int = 10) -> None:
+        """
+        Pull posts newer than the window from the head of the listing
+
+        Stops at the first page overlapping the stored posts. If none does
+        within `max_pages`, the window has a gap and restarts from the pages
+        just fetched.
+        """
+        pages: List[Dict[str, Any]] = []
+        after = None
+        overlapped = self.synced_at is None
+        for _ in range(max_pages):
+            posts, after = fetch_page(after)
+            pages.extend(posts)
+            if any(self.store.row_of(post["id"]) is not None for post in posts):
+                overlapped = True
+                break
+            if self.synced_at is None or not after or not posts:
+                break
+
+        if not overlapped and after:
+            self._reset()
+        if self.synced_at is None or not overlapped:
+            self.next_after = after
+            self.complete = not after and len(pages) < LISTING_CAP
+        self._add(pages)
+        self.synced_at = now
+        self._compact(now)
+
+    def extend(self, fetch_page: FetchPage, start: float, max_pages: int = 10) -> None:
+        """Page further back through the listing until posts since `start` are covered"""
+        for _ in range(max_pages):
+            if self.covers(start) or self.complete or not self.next_after:
+                return
+            posts, after = fetch_page(self.next_after)
+            self._add(posts)
+            self.next_after = after
+            if not after or not posts:
+                self.complete = len(self.store) < LISTING_CAP
+                return
+
+    def covers(self, start: float) -> bool:
+        """Whether every post created since `start` is in the window"""
+        if self.complete:
+            return True
+        return self.covered_from is not None and self.covered_from <= start
+
+    def _compact(self, now: float) -> None:
+        """Rebuild the store without expired posts once they outnumber the live ones"""
+        cutoff = now - self.span
+        live = self.store.filter(created_after=cutoff)
+        if len(live) * 2 >= len(self.store):
+            return
+        store = PostStore(capacity=max(len(live), 1024))
+        store.add_many(self.store.to_dicts(live))
+        self.store = store
+        if self.covered_from is not None and self.covered_from < cutoff:
+            self.covered_from = cutoff
+        self.complete = False
+
+    def query(self, sort: str, limit: int, period: Optional[float], now: float,
+              after: Optional[str] = None) -> Optional[Tuple[PostStore, np.ndarray, Optional[str]]]:
+        """
+        Answer a `new` or `top` listing page locally
+
+        Args:
+            sort: "new" or "top"
+            limit: Page size
+            period: For `top`, seconds back from now to rank over
+            now: Current UTC timestamp
+            after: Pagination token of the previous page
+
+        Returns:
+            (store, rows, next after token), or None when the window can't
+            answer the page exactly
+        """
+        store = self.store
+        if sort == "top":
+            rows = store.sort(store.filter(created_after=now - period), "score")
+        else:
+            rows = store.sort(store.rows(), "created_utc")
+
+        start = 0
+        if after:
+            row = store.row_of(after.split("_", 1)[-1])
+            if row is None:
+                return None
+            matches = np.flatnonzero(rows == row)
+            if not len(matches):
+                return None
+            start = int(matches[0]) + 1
+
+        page = rows[start:start + limit]
+        more = start + limit < len(rows)
+        if sort == "new" and not more and len(page) < limit and not self.complete:
+            # The rest of the page is older than the window
+            return None
+        next_after = None
+        if len(page) and (more or (sort == "new" and not self.complete)):
+            next_after = f"t3_{store.to_dict(int(page[-1]))['id']}"
+        return store, page, next_after
+
+
+class ListingWindows:
+    """Rolling windows for the most recently used subreddits"""
+
+    def __init__(self, span: float, refresh_interval: float = 60.0, max_windows: int = 64):
+        """
+        Args:
+            span: Seconds of posts each window keeps
+            refresh_interval: Seconds before a window pulls new posts again
+            max_windows: Subreddits tracked at once; the least recently used is dropped
+        """
+        self.span = span
+        self.refresh_interval = refresh_interval
+        self.max_windows = max_windows
+        self.local_hits = 0
+        self.upstream_fallbacks = 0
+        self._windows: "OrderedDict[str, ListingWindow]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def window(self, subreddit: str) -> ListingWindow:
+        """Return the window for `subreddit`, creating it if needed"""
+        key = subreddit.lower()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                window = self._windows[key] = ListingWindow(subreddit, self.span)
+                while len(self._windows) > self.max_windows:
+                    self._windows.popitem(last=False)
+            self._windows.move_to_end(key)
+            return window
+
+    def age(self, subreddit: str) -> Optional[float]:
+        """Seconds since the subreddit's window last synced, or None if it never has"""
+        with self._lock:
+            window = self._windows.get(subreddit.lower())
+        if window is None or window.synced_at is None:
+            return None
+        return time.time() - window.synced_at
+
+    def refresh(self, subreddit: str, fetch_page: FetchPage) -> None:
+        """Pull new posts into the subreddit's window if it is due"""
+        window = self.window(subreddit)
+        with window.lock:
+            self._refresh_due(window, fetch_page, time.time())
+
+    def _refresh_due(self, window: ListingWindow, fetch_page: FetchPage, now: float) -> None:
+        if window.synced_at is None or now - window.synced_at >= self.refresh_interval:
+            window.refresh(fetch_page, now)
+
+    def query(self, subreddit: str, sort: str, limit: int, period_name: Optional[str],
+              fetch_page: FetchPage, after: Optional[str] = None,
+              sync: bool = True) -> Optional[Tuple[PostStore, np.ndarray, Optional[str]]]:
+        """
+        Answer a `new` or `top` page from the subreddit's window
+
+        Refreshes the window if it is stale and extends it back far enough
+        for a `top` period, unless `sync` is False: then the page is
+        answered from the posts already held. Returns None when the page
+        has to come from upstream: other sorts, periods longer than the
+        window, or a window that can't be extended far enough.
+        """
+        period = None
+        if sort == "top":
+            period = TOP_PERIODS.get(period_name or "")
+            if period is None or period > self.span:
+                return None
+        elif sort != "new":
+            return None
+
+        window = self.window(subreddit)
+        with window.lock:
+            now = time.time()
+            if sync:
+                self._refresh_due(window, fetch_page, now)
+            elif window.synced_at is None:
+                return None
+            if period is not None:
+                if sync:
+                    window.extend(fetch_page, now - period)
+                if not window.covers(now - period):
+                    self.upstream_fallbacks += 1
+                    return None
+            result = window.query(sort, limit, period, now, after)
+
+        if result is None:
+            self.upstream_fallbacks += 1
+        else:
+            self.local_hits += 1
+        return result
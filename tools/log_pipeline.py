@@ -0,0 +1,200 @@
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from typing import Any, Dict, List, Optional, TextIO
+
+# Same layout the servers used with logging.basicConfig
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+
+class _NonBlockingHandler(logging.handlers.QueueHandler):
+    """Hands records to the writer thread as they are, dropping them if it falls behind"""
+
+    def __init__(self, records: "queue.Queue[logging.LogRecord]"):
+        super().__init__(records)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # QueueHandler would format the message here, on the logging thread;
+        # the record stays in this process, so that can wait for the writer
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class TextFormatter(logging.Formatter):
+    """The usual text layout, with an event's fields appended as key=value"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record, for log shippers"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "category": getattr(record, "category", None),
+            "message": record.getMessage(),
+            **getattr(record, "fields", {})
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class LogPipeline:
+    """
+    Non-blocking logging for the whole process
+
+    Records are put on a bounded queue and formatted and written by a
+    background thread, so a log call costs the caller a record and a queue
+    put, whatever the output is. When the writer falls behind, records are
+    dropped and counted rather than making callers wait.
+
+    High-volume events go through `event()` with a category, each of
+    which can be sampled: at a rate of 0.01 one event in a hundred is kept
+    and the rest are skipped before a record is even built.
+    """
+
+    def __init__(self, level: int = logging.INFO, format: str = "text",
+                 sample_rates: Optional[Dict[str, float]] = None,
+                 stream: Optional[TextIO] = None, max_queued: int = 10_000):
+        """
+        Args:
+            level: Lowest level logged
+            format: "text" or "json"
+            sample_rates: Share of events kept per category, 0 to 1 (default: all)
+            stream: Where records are written (default: stderr)
+            max_queued: Records waiting for the writer before new ones are dropped
+        """
+        if format not in ("text", "json"):
+            raise ValueError(f"Unknown log format: {format}")
+        self.level = level
+        self.format = format
+        self.sample_rates = dict(sample_rates or {})
+        self.events: Dict[str, int] = {}
+        self._counters: Dict[str, Any] = {}
+        self._every = {category: (0 if rate <= 0 else max(1, round(1 / rate)))
+                       for category, rate in self.sample_rates.items()}
+        output = logging.StreamHandler(stream or sys.stderr)
+        output.setFormatter(JSONFormatter() if format == "json" else TextFormatter(TEXT_FORMAT))
+        self.handler = _NonBlockingHandler(queue.Queue(maxsize=max_queued))
+        self.listener = logging.handlers.QueueListener(self.handler.queue, output, respect_handler_level=False)
+
+    def install(self) -> None:
+        """Route every logger's records through the pipeline and start the writer"""
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(self.handler)
+        root.setLevel(self.level)
+        self.listener.start()
+
+    def keep(self, category: str) -> bool:
+        """Count an event of `category` and decide whether it is logged"""
+        counter = self._counters.get(category)
+        if counter is None:
+            counter = self._counters.setdefault(category, itertools.count(1))
+        # next() on a count is atomic, so no lock is needed
+        n = self.events[category] = next(counter)
+        every = self._every.get(category, 1)
+        return every == 1 or (every > 0 and n % every == 0)
+
+    def stats(self) -> Dict[str, Any]:
+        sampled_out = {}
+        for category, n in list(self.events.items()):
+            every = self._every.get(category, 1)
+            if every != 1:
+                sampled_out[category] = n - (n // every if every else 0)
+        return {
+            "format": self.format,
+            "queued": self.handler.queue.qsize(),
+            "dropped": self.handler.dropped,
+            "events": dict(self.events),
+            "sampled_out": sampled_out,
+            "sample_rates": dict(self.sample_rates)
+        }
+
+    def close(self) -> None:
+        """Write out queued records and stop the writer"""
+        self.listener.stop()
+        logging.getLogger().removeHandler(self.handler)
+
+
+_pipeline: Optional[LogPipeline] = None
+
+
+def configure(level: int = logging.INFO, format: str = "text",
+              sample_rates: Optional[Dict[str, float]] = None,
+              stream: Optional[TextIO] = None) -> LogPipeline:
+    """
+    Install the non-blocking pipeline for the whole process
+
+    Args:
+        level: Lowest level logged
+        format: "text" or "json"
+        sample_rates: Share of events kept per category, 0 to 1
+        stream: Where records are written (default: stderr)
+
+    Returns:
+        The process-wide LogPipeline
+    """
+    global _pipeline
+    if _pipeline is not None:
+        _pipeline.close()
+    _pipeline = LogPipeline(level, format, sample_rates, stream)
+    _pipeline.install()
+    return _pipeline
+
+
+def parse_sample_rates(specs: Optional[List[str]]) -> Dict[str, float]:
+    """Parse CATEGORY=RATE command-line values"""
+    rates = {}
+    for spec in specs or []:
+        category, _, rate = spec.partition("=")
+        rates[category.strip()] = float(rate)
+    return rates
+
+
+def event(logger: logging.Logger, category: str, msg: str, *args,
+          level: int = logging.INFO, **fields) -> None:
+    """
+    Log a structured event, subject to its category's sample rate
+
+    The message is %-formatted with `args` only if the record is written,
+    on the writer thread. `fields` are kept as structured data: appended
+    as key=value to text logs, as keys of JSON ones.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    if _pipeline is not None and not _pipeline.keep(category):
+        return
+    logger.log(level, msg, *args, extra={"category": category, "fields": fields})
+
+
+def stats() -> Optional[Dict[str, Any]]:
+    """Queue, drop and sampling counts of the pipeline, or None if it isn't installed"""
+    return _pipeline.stats() if _pipeline is not None else None
+
+
+def shutdown() -> None:
+    """Write out queued records and stop the writer"""
+    global _pipeline
+    if _pipeline is not None:
+        _pipeline.close()
+        _pipeline = None
@@ -0,0 +1,240 @@
+import gc
+import logging
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from types import CodeType, FunctionType, ModuleType
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Objects never counted as retained by a cache: shared, not owned
+_SHARED_TYPES = (type, ModuleType, FunctionType, CodeType)
+
+
+def deep_sizeof(obj: Any, exclude_types: Tuple[type, ...] = ()) -> int:
+    """
+    Bytes held by `obj` and everything it references
+
+    Classes, modules and functions are not followed, nor are instances of
+    `exclude_types` (e.g. stores that cached values point into but don't own).
+    """
+    skip = _SHARED_TYPES + tuple(exclude_types)
+    seen = set()
+    total = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, skip):
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        stack.extend(gc.get_referents(item))
+    return total
+
+
+def _code_lines(code: CodeType) -> Tuple[int, int]:
+    lines = [line for _, _, line in code.co_lines() if line is not None]
+    return code.co_firstlineno, max(lines, default=code.co_firstlineno)
+
+
+class _Region:
+    __slots__ = ("name", "filename", "first", "last")
+
+    def __init__(self, name: str, filename: str, first: int = 0, last: int = sys.maxsize):
+        self.name = name
+        self.filename = filename
+        self.first = first
+        self.last = last
+
+
+class MemoryProfiler:
+    """
+    Periodic tracemalloc snapshots, with live memory attributed to regions
+
+    A region is a function or a whole module. Each traced allocation
+    still alive at a snapshot is charged to the region of the innermost
+    frame of its traceback that falls inside one (so a comment parsed by
+    `_parse_comment` counts there, not under the fetch that called it);
+    the rest is "other". Each snapshot is summarized into a short history
+    (traced total and per-region bytes), and the latest one is kept for
+    top allocators and growth since the first.
+
+    Tracing allocations slows the process down, typically 1.5-3x, so the
+    profiler is meant to be switched on for a while and off again.
+    """
+
+    def __init__(self, regions: Dict[str, List[Any]],
+                 retained: Optional[Callable[[], Dict[str, Any]]] = None,
+                 interval: float = 60.0, frames: int = 25, history: int = 60):
+        """
+        Args:
+            regions: Region name -> functions and modules allocating on its behalf
+            retained: Returns the retained size of each cache, added to reports
+            interval: Seconds between snapshots
+            frames: Traceback depth recorded per allocation
+            history: Snapshot summaries kept
+        """
+        self.interval = interval
+        self.frames = frames
+        self.retained = retained
+        self._regions: List[_Region] = []
+        for name, targets in regions.items():
+            for target in targets:
+                if isinstance(target, ModuleType):
+                    self._regions.append(_Region(name, target.__file__))
+                else:
+                    code = target.__code__
+                    self._regions.append(_Region(name, code.co_filename, *_code_lines(code)))
+        self._by_file: Dict[str, List[_Region]] = {}
+        for region in self._regions:
+            self._by_file.setdefault(region.filename, []).append(region)
+        self._history: Deque[Dict[str, Any]] = deque(maxlen=history)
+        self._first: Optional[tracemalloc.Snapshot] = None
+        self._latest: Optional[tracemalloc.Snapshot] = None
+        self._started_tracing = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        """Start tracing allocations and taking snapshots"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.frames)
+                self._started_tracing = True
+            self._first = self._latest = None
+            self._history.clear()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="memory-profiler", daemon=True)
+            self._thread.start()
+        logger.info("Memory profiling on, snapshot every %gs", self.interval)
+
+    def stop(self) -> None:
+        """Stop snapshots and tracing; the last report stays available"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is None:
+                return
+            self._stop.set()
+        thread.join(timeout=self.interval + 5)
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        logger.info("Memory profiling off")
+
+    def _loop(self) -> None:
+        while True:
+            try:
+                self.snapshot()
+            except Exception as e:
+                logger.warning("Memory snapshot failed: %s", e)
+            if self._stop.wait(self.interval):
+                return
+
+    def _region_of(self, traceback: tracemalloc.Traceback, memo: Dict[Any, str]) -> str:
+        region = memo.get(traceback)
+        if region is not None:
+            return region
+        region = "other"
+        # Frames are stored oldest first; the innermost region wins
+        for frame in reversed(traceback):
+            for candidate in self._by_file.get(frame.filename, ()):
+                if candidate.first <= frame.lineno <= candidate.last:
+                    region = candidate.name
+                    break
+            else:
+                continue
+            break
+        memo[traceback] = region
+        return region
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Take a snapshot now and return its summary"""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("Memory profiling is not running")
+        taken = time.time()
+        # Not filtered: filter_traces costs seconds on a large heap, and
+        # tracemalloc's own allocations are small
+        snapshot = tracemalloc.take_snapshot()
+        regions: Dict[str, int] = {}
+        memo: Dict[Any, str] = {}
+        for stat in snapshot.statistics("traceback"):
+            region = self._region_of(stat.traceback, memo)
+            regions[region] = regions.get(region, 0) + stat.size
+        current, peak = tracemalloc.get_traced_memory()
+        summary = {
+            "time": round(taken, 1),
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "regions": dict(sorted(regions.items(), key=lambda item: -item[1])),
+            "seconds": round(time.time() - taken, 3)
+        }
+        with self._lock:
+            if self._first is None:
+                self._first = snapshot
+            self._latest = snapshot
+            self._history.append(summary)
+        return summary
+
+    def report(self, top: int = 15) -> Dict[str, Any]:
+        """
+        Summarize what the profiler has seen
+
+        Args:
+            top: Allocating lines listed, by size and by growth
+
+        Returns:
+            Dictionary with whether profiling is running, the snapshot
+            history, the top allocating lines of the latest snapshot, the
+            lines that grew most since the first, and retained cache sizes
+        """
+        with self._lock:
+            first, latest, history = self._first, self._latest, list(self._history)
+        report: Dict[str, Any] = {"running": self.running, "interval": self.interval,
+                                  "snapshots": history}
+        if latest is not None:
+            report["top_allocators"] = [
+                {"line": str(stat.traceback[0]), "bytes": stat.size, "blocks": stat.count}
+                for stat in latest.statistics("lineno")[:top]
+            ]
+        if first is not None and latest is not first:
+            report["top_growth"] = [
+                {"line": str(stat.traceback[0]), "bytes": stat.size, "growth_bytes": stat.size_diff}
+                for stat in latest.compare_to(first, "lineno")[:top]
+            ]
+        if self.retained is not None:
+            report["retained"] = self.retained()
+        return report
+
+    def control(self, action: str, interval: Optional[float] = None, top: int = 15) -> Dict[str, Any]:
+        """
+        Carry out a memory_profile tool call
+
+        Args:
+            action: "start", "stop", "snapshot" (take one now) or "report"
+            interval: New seconds between snapshots, applied on start
+            top: Allocating lines listed in the report
+
+        Returns:
+            The report after the action
+        """
+        if action == "start":
+            if interval is not None:
+                self.interval = interval
+            self.start()
+        elif action == "stop":
+            self.stop()
+        elif action == "snapshot":
+            self.snapshot()
+        elif action != "report":
+            raise ValueError(f"Unknown memory_profile action: {action}")
+        return self.report(top)
@@ -0,0 +1,267 @@
+import logging
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds, roughly log-spaced from 1ms to 30s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Upper bounds in seconds for in-process work such as parsing, 10us to 2.5s
+CPU_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005) + DEFAULT_BUCKETS[:-3]
+# Upper bounds for payload sizes, 1 KiB to 16 MiB
+BYTE_BUCKETS = tuple(1024 * 4 ** i for i in range(8))
+
+
+class Histogram:
+    """Fixed-bucket histogram, cheap enough to leave on in production"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """Record one observation"""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def percentile(self, q: float) -> float:
+        """
+        Estimate a percentile from the bucket counts
+
+        Args:
+            q: Percentile between 0 and 100
+
+        Returns:
+            Upper bound of the bucket holding the percentile (the largest
+            finite bound for the overflow bucket), or 0.0 with no observations
+        """
+        with self._lock:
+            counts = list(self.counts)
+            total = self.count
+        if total == 0:
+            return 0.0
+        rank = total * q / 100.0
+        seen = 0
+        for index, count in enumerate(counts):
+            seen += count
+            if seen >= rank and count:
+                return self.buckets[min(index, len(self.buckets) - 1)]
+        return self.buckets[-1]
+
+    def state(self) -> Tuple[List[int], int, float]:
+        """Copy of the bucket counts, total count and sum"""
+        with self._lock:
+            return list(self.counts), self.count, self.sum
+
+    def snapshot(self) -> Dict[str, float]:
+        """Summarize the histogram"""
+        with self._lock:
+            count, total = self.count, self.sum
+        return {
+            "count": count,
+            "mean": total / count if count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99)
+        }
+
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _label_key(labels: Labels) -> str:
+    return ",".join(f"{name}={value}" for name, value in labels) or "all"
+
+
+def _number(value: float) -> str:
+    if not math.isfinite(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Metrics:
+    """
+    Named counters, gauges and histograms with labels
+
+    Recording is a dictionary lookup plus an addition under a lock, so the
+    hot path can be instrumented unconditionally. Values that are cheaper
+    to read when needed than to keep updated (cache sizes, say) come from
+    collectors, called before every read. Read everything with snapshot(),
+    or as Prometheus text with to_prometheus().
+    """
+
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._gauges: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._help: Dict[str, str] = {}
+        self._collectors: List[Callable[["Metrics"], None]] = []
+        self._lock = threading.Lock()
+        self._dump_stop: Optional[threading.Event] = None
+
+    def describe(self, name: str, text: str) -> None:
+        """Set the help text exported for a metric"""
+        self._help[name] = text
+
+    def add_collector(self, collect: Callable[["Metrics"], None]) -> None:
+        """Call `collect(metrics)` before each read, to set gauges"""
+        self._collectors.append(collect)
+
+    def _collect(self) -> None:
+        for collect in self._collectors:
+            try:
+                collect(self)
+            except Exception as e:
+                logger.warning("Metrics collector failed: %s", e)
+
+    def inc(self, name: str, amount: float = 1, **labels) -> None:
+        """Add to a counter"""
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def add(self, name: str, amount: float, **labels) -> None:
+        """Add to a gauge (negative to subtract)"""
+        key = (name, _labels(labels))
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + amount
+
+    def set(self, name: str, value: float, **labels) -> None:
+        """Set a gauge"""
+        with self._lock:
+            self._gauges[(name, _labels(labels))] = value
+
+    def histogram(self, name: str, buckets: Sequence[float] = DEFAULT_BUCKETS, **labels) -> Histogram:
+        """The histogram for a name and labels, created with `buckets` on first use"""
+        key = (name, _labels(labels))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(buckets))
+        return histogram
+
+    def observe(self, name: str, value: float, buckets: Sequence[float] = DEFAULT_BUCKETS, **labels) -> None:
+        """Record a value in a histogram"""
+        self.histogram(name, buckets, **labels).observe(value)
+
+    @contextmanager
+    def timer(self, name: str, buckets: Sequence[float] = CPU_BUCKETS, **labels):
+        """Observe the seconds spent in the block (buckets default to in-process work)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, buckets, **labels)
+
+    @contextmanager
+    def in_flight(self, name: str, **labels):
+        """Count the block as in flight in a gauge while it runs"""
+        self.add(name, 1, **labels)
+        try:
+            yield
+        finally:
+            self.add(name, -1, **labels)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """All metrics as nested dicts: kind -> name -> labels ("a=1,b=2") -> value or summary"""
+        self._collect()
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = dict(self._histograms)
+        out: Dict[str, Dict[str, Any]] = {"counters": {}, "gauges": {}, "histograms": {}}
+        for section, items in (("counters", counters), ("gauges", gauges)):
+            for (name, labels), value in sorted(items.items()):
+                out[section].setdefault(name, {})[_label_key(labels)] = value
+        for (name, labels), histogram in sorted(histograms.items(), key=lambda item: item[0]):
+            out["histograms"].setdefault(name, {})[_label_key(labels)] = histogram.snapshot()
+        return out
+
+    def to_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        self._collect()
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+        lines: List[str] = []
+        described = set()
+
+        def header(name: str, kind: str) -> None:
+            if name in described:
+                return
+            described.add(name)
+            if name in self._help:
+                lines.append(f"# HELP {self.prefix}{name} {self._help[name]}")
+            lines.append(f"# TYPE {self.prefix}{name} {kind}")
+
+        for kind, items in (("counter", counters), ("gauge", gauges)):
+            for (name, labels), value in items:
+                header(name, kind)
+                lines.append(f"{self.prefix}{name}{_format_labels(labels)} {_number(value)}")
+        for (name, labels), histogram in histograms:
+            header(name, "histogram")
+            counts, count, total = histogram.state()
+            cumulative = 0
+            for bound, bucket_count in zip(list(histogram.buckets) + [math.inf], counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == math.inf else f"{bound:.12g}"
+                bucket_labels = _format_labels(labels, f'le="{le}"')
+                lines.append(f"{self.prefix}{name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.prefix}{name}_sum{_format_labels(labels)} {_number(total)}")
+            lines.append(f"{self.prefix}{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        """Write to_prometheus() to `path`, replacing it atomically"""
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as f:
+            f.write(self.to_prometheus())
+        os.replace(temporary, path)
+
+    def start_dump(self, path: str, interval: float = 15.0) -> threading.Thread:
+        """
+        Rewrite a Prometheus text file every `interval` seconds in a daemon thread
+
+        Point node_exporter's textfile collector (or anything that reads the
+        format) at `path`.
+        """
+        self._dump_stop = stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                try:
+                    self.write_prometheus(path)
+                except OSError as e:
+                    logger.warning("Cannot write metrics to %s: %s", path, e)
+
+        thread = threading.Thread(target=run, name="metrics-dump", daemon=True)
+        thread.start()
+        return thread
+
+    def stop_dump(self) -> None:
+        if self._dump_stop is not None:
+            self._dump_stop.set()
@@ -0,0 +1,33 @@
+import json
+from typing import Any, Dict, Optional
+
+_parser = None
+
+
+def _get_parser():
+    """Build the worker's parser once, on the first offloaded payload"""
+    global _parser
+    if _parser is None:
+        from .reddit_tools import RedditTools
+        _parser = RedditTools()
+    return _parser
+
+
+def render_payload(kind: str, raw: bytes, context: Dict[str, Any], indent: Optional[int]) -> bytes:
+    """
+    Decode a raw upstream response, build its models and serialize them
+
+    Runs in a worker process. Only the raw response bytes go in and only the
+    serialized JSON comes back, so the model graph is never pickled.
+
+    Args:
+        kind: Response kind, as passed to RedditTools._cached_request
+        raw: Raw response body
+        context: Extra arguments for the kind's parser
+        indent: JSON indentation of the output
+
+    Returns:
+        UTF-8 encoded JSON of the parsed result
+    """
+    model = _get_parser()._parse_payload(kind, json.loads(raw), **context)
+    return json.dumps(model.model_dump(), indent=indent).encode()
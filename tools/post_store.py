@@ -0,0 +1,229 @@
+import sys
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+# Text fields kept in the shared arena, in RedditPost field order
+TEXT_FIELDS = ("id", "title", "url", "permalink", "selftext", "thumbnail")
+
+_IS_VIDEO = 1
+_IS_SELF = 2
+
+
+class StringTable:
+    """Interns repeated strings (authors, subreddits) as small integer codes"""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def intern(self, value: str) -> int:
+        """Return the code for `value`, adding it on first sight"""
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def code(self, value: str) -> Optional[int]:
+        """Return the code for `value`, or None if never seen"""
+        return self._codes.get(value)
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the table"""
+        strings = sum(sys.getsizeof(value) for value in self.values)
+        return strings + sys.getsizeof(self.values) + sys.getsizeof(self._codes)
+
+
+class PostStore:
+    """
+    Compact columnar store for Reddit posts
+
+    Numeric fields live in typed numpy arrays, authors and subreddits are
+    interned into string tables, and all free text shares one UTF-8 arena
+    addressed by offset and length. Filters, sorts and top-k scans run over
+    the columns; RedditPost objects (or plain dicts, for serialization) are
+    only built for the rows asked for.
+
+    Posts are upserted by id: a post seen again keeps its row and gets its
+    score and comment count refreshed.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._size = 0
+        self._capacity = capacity
+        self.score = np.zeros(capacity, dtype=np.int64)
+        self.num_comments = np.zeros(capacity, dtype=np.int64)
+        self.created_utc = np.zeros(capacity, dtype=np.float64)
+        self.flags = np.zeros(capacity, dtype=np.uint8)
+        self.author = np.zeros(capacity, dtype=np.int32)
+        self.subreddit = np.zeros(capacity, dtype=np.int32)
+        self.authors = StringTable()
+        self.subreddits = StringTable()
+        self._arena = bytearray()
+        # Per text field: start offset in the arena and byte length (-1 for None)
+        self._offsets = {field: np.zeros(capacity, dtype=np.int64) for field in TEXT_FIELDS}
+        self._lengths = {field: np.zeros(capacity, dtype=np.int32) for field in TEXT_FIELDS}
+        self._rows: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _grow(self) -> None:
+        capacity = self._capacity * 2
+        for name in ("score", "num_comments", "created_utc", "flags", "author", "subreddit"):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self._capacity] = column
+            setattr(self, name, grown)
+        for columns in (self._offsets, self._lengths):
+            for field, column in list(columns.items()):
+                grown = np.zeros(capacity, dtype=column.dtype)
+                grown[:self._capacity] = column
+                columns[field] = grown
+        self._capacity = capacity
+
+    def _write_text(self, field: str, row: int, value: Optional[str]) -> None:
+        if value is None:
+            self._lengths[field][row] = -1
+            return
+        encoded = value.encode()
+        self._offsets[field][row] = len(self._arena)
+        self._lengths[field][row] = len(encoded)
+        self._arena += encoded
+
+    def _read_text(self, field: str, row: int) -> Optional[str]:
+        length = int(self._lengths[field][row])
+        if length < 0:
+            return None
+        offset = int(self._offsets[field][row])
+        return self._arena[offset:offset + length].decode()
+
+    def add(self, fields: Dict[str, Any]) -> int:
+        """
+        Insert or refresh one post
+
+        Args:
+            fields: RedditPost field values
+
+        Returns:
+            The post's row
+        """
+        with self._lock:
+            row = self._rows.get(fields["id"])
+            if row is None:
+                if self._size == self._capacity:
+                    self._grow()
+                row = self._size
+                for field in TEXT_FIELDS:
+                    self._write_text(field, row, fields.get(field))
+                self.created_utc[row] = float(fields["created_utc"] or 0)
+                self.author[row] = self.authors.intern(fields["author"])
+                self.subreddit[row] = self.subreddits.intern(fields["subreddit"])
+                self.flags[row] = ((_IS_VIDEO if fields.get("is_video") else 0)
+                                   | (_IS_SELF if fields.get("is_self") else 0))
+                self._rows[fields["id"]] = row
+                self._size += 1
+            self.score[row] = int(fields["score"] or 0)
+            self.num_comments[row] = int(fields["num_comments"] or 0)
+            return row
+
+    def add_many(self, posts: Iterable[Dict[str, Any]]) -> np.ndarray:
+        """Insert or refresh several posts, returning their rows in order"""
+        return np.fromiter((self.add(fields) for fields in posts), dtype=np.int64)
+
+    def row_of(self, post_id: str) -> Optional[int]:
+        """Return the row holding `post_id`, or None"""
+        return self._rows.get(post_id)
+
+    def to_dict(self, row: int) -> Dict[str, Any]:
+        """Materialize one row as a dict matching RedditPost.model_dump()"""
+        flags = int(self.flags[row])
+        return {
+            "id": self._read_text("id", row),
+            "title": self._read_text("title", row),
+            "author": self.authors.values[self.author[row]],
+            "subreddit": self.subreddits.values[self.subreddit[row]],
+            "score": int(self.score[row]),
+            "num_comments": int(self.num_comments[row]),
+            "created_utc": float(self.created_utc[row]),
+            "url": self._read_text("url", row),
+            "permalink": self._read_text("permalink", row),
+            "selftext": self._read_text("selftext", row),
+            "thumbnail": self._read_text("thumbnail", row),
+            "is_video": bool(flags & _IS_VIDEO),
+            "is_self": bool(flags & _IS_SELF)
+        }
+
+    def to_dicts(self, rows: Sequence[int]) -> List[Dict[str, Any]]:
+        """Materialize rows as dicts, ready to serialize"""
+        return [self.to_dict(int(row)) for row in rows]
+
+    def to_posts(self, rows: Sequence[int]) -> list:
+        """Materialize rows as RedditPost objects"""
+        from .reddit_tools import RedditPost
+        # The stored values were validated on the way in
+        return [RedditPost.model_construct(**self.to_dict(int(row))) for row in rows]
+
+    def rows(self) -> np.ndarray:
+        """All rows"""
+        return np.arange(self._size, dtype=np.int64)
+
+    def filter(self, rows: Optional[np.ndarray] = None, subreddit: Optional[str] = None,
+               author: Optional[str] = None, min_score: Optional[int] = None,
+               created_after: Optional[float] = None,
+               created_before: Optional[float] = None) -> np.ndarray:
+        """
+        Select rows matching all given conditions
+
+        Args:
+            rows: Rows to filter (default: all)
+            subreddit: Keep posts from this subreddit (case-insensitive)
+            author: Keep posts by this author
+            min_score: Keep posts scoring at least this much
+            created_after: Keep posts created at or after this UTC timestamp
+            created_before: Keep posts created before this UTC timestamp
+
+        Returns:
+            Matching rows, in their original order
+        """
+        rows = self.rows() if rows is None else np.asarray(rows, dtype=np.int64)
+        mask = np.ones(len(rows), dtype=bool)
+        if subreddit is not None:
+            codes = [code for code, name in enumerate(self.subreddits.values)
+                     if name.lower() == subreddit.lower()]
+            mask &= np.isin(self.subreddit[rows], codes)
+        if author is not None:
+            code = self.authors.code(author)
+            mask &= self.author[rows] == (-1 if code is None else code)
+        if min_score is not None:
+            mask &= self.score[rows] >= min_score
+        if created_after is not None:
+            mask &= self.created_utc[rows] >= created_after
+        if created_before is not None:
+            mask &= self.created_utc[rows] < created_before
+        return rows[mask]
+
+    def sort(self, rows: np.ndarray, by: str = "score", descending: bool = True) -> np.ndarray:
+        """Order rows by a numeric column (score, num_comments or created_utc)"""
+        rows = np.asarray(rows, dtype=np.int64)
+        keys = getattr(self, by)[rows]
+        order = np.argsort(-keys if descending else keys, kind="stable")
+        return rows[order]
+
+    def top_k(self, rows: np.ndarray, k: int, by: str = "score") -> np.ndarray:
+        """The `k` rows with the highest values of a numeric column, highest first"""
+        rows = np.asarray(rows, dtype=np.int64)
+        if k < len(rows):
+            keys = getattr(self, by)[rows]
+            rows = rows[np.argpartition(-keys, k)[:k]]
+        return self.sort(rows, by)
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the store"""
+        columns = [self.score, self.num_comments, self.created_utc, self.flags, self.author, self.subreddit]
+        columns += list(self._offsets.values()) + list(self._lengths.values())
+        return (sum(column.nbytes for column in columns) + len(self._arena)
+                + self.authors.nbytes() + self.subreddits.nbytes() + sys.getsizeof(self._rows))
@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Tuple
+
+
+class PrefetchPolicy:
+    """
+    Decides how many comment trees to prefetch after a listing, learning from hits
+
+    Each prefetch is remembered with the rank (by score) of its post in the
+    listing. A later real request for the same key is a hit for that rank;
+    a prefetch nobody asked for within `horizon` seconds is a waste. After
+    every `adjust_every` resolved prefetches the policy looks at the hit
+    rate of its last rank: below `low` it prefetches one post fewer, above
+    `high` one more.
+    """
+
+    def __init__(self, top_k: int = 3, min_k: int = 1, max_k: int = 10,
+                 horizon: float = 300.0, low: float = 0.1, high: float = 0.3,
+                 adjust_every: int = 20, max_tracked: int = 1000):
+        """
+        Args:
+            top_k: Posts to prefetch per listing to begin with
+            min_k: Fewest posts to prefetch (at least one, to keep learning)
+            max_k: Most posts to prefetch
+            horizon: Seconds a prefetched result can wait for its request
+            low: Hit rate of the last rank below which top_k shrinks
+            high: Hit rate of the last rank above which top_k grows
+            adjust_every: Resolved prefetches between adjustments
+            max_tracked: Outstanding prefetches remembered
+        """
+        self.top_k = top_k
+        self.min_k = max(1, min_k)
+        self.max_k = max_k
+        self.horizon = horizon
+        self.low = low
+        self.high = high
+        self.adjust_every = adjust_every
+        self.max_tracked = max_tracked
+        self.issued = 0
+        self.hits = [0] * max_k
+        self.wasted = [0] * max_k
+        self._resolved_since_adjust = 0
+        self._outstanding: "OrderedDict[Hashable, Tuple[int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def issue(self, key: Hashable, rank: int) -> bool:
+        """Record a prefetch of `key` for the post at `rank`; False if already outstanding"""
+        with self._lock:
+            self._expire(time.monotonic())
+            if key in self._outstanding:
+                return False
+            self._outstanding[key] = (rank, time.monotonic())
+            self.issued += 1
+            while len(self._outstanding) > self.max_tracked:
+                _, (old_rank, _) = self._outstanding.popitem(last=False)
+                self._resolve(old_rank, hit=False)
+            return True
+
+    def record_request(self, key: Hashable) -> bool:
+        """Note a real request for `key`, returning whether a prefetch covered it"""
+        with self._lock:
+            self._expire(time.monotonic())
+            entry = self._outstanding.pop(key, None)
+            if entry is None:
+                return False
+            self._resolve(entry[0], hit=True)
+            return True
+
+    def _expire(self, now: float) -> None:
+        while self._outstanding:
+            key, (rank, issued_at) = next(iter(self._outstanding.items()))
+            if now - issued_at < self.horizon:
+                break
+            self._outstanding.popitem(last=False)
+            self._resolve(rank, hit=False)
+
+    def _resolve(self, rank: int, hit: bool) -> None:
+        if rank < self.max_k:
+            (self.hits if hit else self.wasted)[rank] += 1
+        self._resolved_since_adjust += 1
+        if self._resolved_since_adjust >= self.adjust_every:
+            self._resolved_since_adjust = 0
+            self._adjust()
+
+    def _adjust(self) -> None:
+        """Move top_k by one according to how its last rank is doing"""
+        last = self.top_k - 1
+        resolved = self.hits[last] + self.wasted[last]
+        if not resolved:
+            return
+        rate = self.hits[last] / resolved
+        if rate < self.low and self.top_k > self.min_k:
+            self.top_k -= 1
+        elif rate > self.high and self.top_k < self.max_k:
+            self.top_k += 1
+            # The new rank starts from a clean record
+            self.hits[self.top_k - 1] = self.wasted[self.top_k - 1] = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Current top_k and hit rates per rank"""
+        with self._lock:
+            hits = sum(self.hits)
+            resolved = hits + sum(self.wasted)
+            by_rank: List[Dict[str, Any]] = [
+                {"rank": rank, "hits": self.hits[rank], "wasted": self.wasted[rank]}
+                for rank in range(self.max_k) if self.hits[rank] or self.wasted[rank]
+            ]
+            return {
+                "top_k": self.top_k,
+                "issued": self.issued,
+                "outstanding": len(self._outstanding),
+                "hit_rate": hits / resolved if resolved else None,
+                "by_rank": by_rank
+            }
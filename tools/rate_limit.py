@@ -0,0 +1,83 @@
+import threading
+import time
+
+from .cancellation import current_token
+
+
+class RateLimiter:
+    """Token bucket limiting the rate of upstream requests"""
+
+    def __init__(self, rate: float = 1.0, burst: int = 10):
+        """
+        Args:
+            rate: Sustained requests per second
+            burst: Maximum number of requests allowed back to back
+        """
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token, returning how long the caller must wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def available(self) -> float:
+        """Tokens in the bucket now; below 1, the next request has to wait"""
+        with self._lock:
+            now = time.monotonic()
+            return min(self.burst, self._tokens + (now - self._updated) * self.rate)
+
+    def acquire(self, reserve: float = 0.0) -> float:
+        """
+        Wait for permission to send one request
+
+        Callers passing a `reserve` only take a token while more than `reserve`
+        tokens would remain, so lower-priority work yields the bucket to
+        interactive requests instead of queueing ahead of them. The wait is
+        aborted if the current request is cancelled.
+
+        Args:
+            reserve: Tokens to leave in the bucket for higher-priority callers
+
+        Returns:
+            Seconds spent waiting
+        """
+        if reserve <= 0:
+            delay = self._reserve()
+            if delay > 0:
+                self._sleep(delay, refund=True)
+            return delay
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens - reserve >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 + reserve - self._tokens) / self.rate
+            self._sleep(delay, refund=False)
+            waited += delay
+
+    def _sleep(self, delay: float, refund: bool) -> None:
+        """Sleep for `delay` seconds, bailing out if the current request is cancelled"""
+        token = current_token()
+        if token is None:
+            time.sleep(delay)
+        elif token.wait(delay):
+            if refund:
+                # Give the unused token back before bailing out
+                with self._lock:
+                    self._tokens = min(self.burst, self._tokens + 1)
+            token.raise_if_cancelled()
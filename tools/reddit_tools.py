@@ -1,8 +1,49 @@
 import requests
 import random
-from typing import List, Optional, Dict, Any
+import json
+import contextvars
+import multiprocessing
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError, wait
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Iterable, List, Optional, Dict, Any, Hashable
 from pydantic import BaseModel, Field
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+
+from .cache import TTLCache
+from .cancellation import CancelToken, RequestCancelled, check_cancelled, current_token, run_with_token
+from .circuit_breaker import CircuitBreaker, UpstreamUnavailable
+from .hedging import DEFAULT_DEADLINES, DeadlineExceeded, HedgePolicy, endpoint_of
+from .listing_window import ListingWindows
+from .metrics import BYTE_BUCKETS, Metrics
+from .offload import render_payload
+from .post_store import PostStore
+from .prefetch import PrefetchPolicy
+from .rate_limit import RateLimiter
+from .scheduling import Priority, RequestScheduler, current_priority, priority_scope
+from .time_index import TimeIndex, TimeIndexes
+from .tracing import span
+from .trends import RisingTerms, TrendTracker
+
+if TYPE_CHECKING:
+    from .analytics import PostAnalytics
+    from .dedup import PostClusters
+
+
+# Subreddit listings and searches take different sorts
+LISTING_SORTS = ("hot", "new", "top", "rising")
+SEARCH_SORTS = ("relevance", "hot", "top", "new", "comments")
+
+
+def _check_sort(sort: str, query: Optional[str]) -> None:
+    """Raise ValueError if `sort` is not one the listing or search being made accepts"""
+    if query and sort not in SEARCH_SORTS:
+        raise ValueError(f"Sort '{sort}' does not apply to searches; use one of {', '.join(SEARCH_SORTS)}")
+    if not query and sort not in LISTING_SORTS:
+        raise ValueError(f"Sort '{sort}' does not apply to listings; use one of {', '.join(LISTING_SORTS)}"
+                         f" or pass a query to search")
 
 
 class RedditPost(BaseModel):
@@ -79,18 +120,160 @@ class RedditComment(BaseModel):
         return datetime.fromtimestamp(self.created_utc)
 
 
+class RedditUser(BaseModel):
+    """Model for a Reddit account"""
+    name: str
+    id: str = ""
+    link_karma: int = 0
+    comment_karma: int = 0
+    total_karma: int = 0
+    created_utc: float = 0
+    is_mod: bool = False
+    is_employee: bool = False
+    verified: bool = False
+    has_verified_email: bool = False
+    is_suspended: bool = False
+    icon_img: Optional[str] = None
+    
+    @property
+    def created_datetime(self) -> datetime:
+        """Convert UTC timestamp to datetime"""
+        return datetime.fromtimestamp(self.created_utc)
+
+
 class RedditPostWithComments(BaseModel):
     """Model for a Reddit post with its comments"""
     post: RedditPost
     comments: List[RedditComment]
     comment_count: int
+    # Accounts of the post's and comments' authors, when asked for
+    authors: Optional[Dict[str, RedditUser]] = None
+
+
+class _Rendered:
+    """Serialized result of an offloaded payload, cached in place of its model"""
+    
+    __slots__ = ("text", "indent")
+    
+    def __init__(self, text: str, indent: Optional[int]):
+        self.text = text
+        self.indent = indent
+
+
+class Staleness:
+    """Whether results returned inside RedditTools.tracking_staleness() were stale"""
+    
+    def __init__(self):
+        self.stale = False
+        self.age = 0.0
+    
+    def mark(self, age: float) -> None:
+        self.stale = True
+        self.age = max(self.age, age)
+
+
+class _Listing:
+    """A cached listing: rows in a PostStore plus its pagination tokens"""
+    
+    __slots__ = ("store", "rows", "after", "before")
+    
+    def __init__(self, store: PostStore, rows: Any, after: Optional[str], before: Optional[str]):
+        self.store = store
+        self.rows = rows
+        self.after = after
+        self.before = before
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """The listing as RedditPosts.model_dump() would produce it"""
+        return {
+            "posts": self.store.to_dicts(self.rows),
+            "after": self.after,
+            "before": self.before,
+            "count": len(self.rows)
+        }
+    
+    def to_model(self) -> RedditPosts:
+        """Materialize the listing as a RedditPosts collection"""
+        return RedditPosts.model_construct(
+            posts=self.store.to_posts(self.rows),
+            after=self.after,
+            before=self.before,
+            count=len(self.rows)
+        )
+
+
+# JSON indentation requested by RedditTools.rendering(), or None outside it
+_render_options: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar(
+    "reddit_render_options", default=None
+)
+
+# Inside RedditTools.reloading(): the TTL to re-cache fetched results with
+_cache_reload: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("reddit_cache_reload", default=None)
+
+# Collects whether stale results were served, inside RedditTools.tracking_staleness()
+_staleness: contextvars.ContextVar[Optional[Staleness]] = contextvars.ContextVar("reddit_staleness", default=None)
+
+# True while RedditTools calls its own fetch methods (pagination, prefetch)
+_internal_call: contextvars.ContextVar[bool] = contextvars.ContextVar("reddit_internal_call", default=False)
 
 
 class RedditTools:
     """Reddit API tools for fetching posts and subreddit information"""
     
-    def __init__(self):
-        self.base_url = "https://www.reddit.com"
+    # Response kind -> (parser method, result model)
+    _PARSERS = {
+        "posts": ("_parse_posts", RedditPosts),
+        "subreddits": ("_parse_subreddits", Subreddits),
+        "subreddit": ("_parse_subreddit", Subreddit),
+        "post": ("_parse_post_page", RedditPost),
+        "post_with_comments": ("_parse_post_with_comments", RedditPostWithComments),
+        "user": ("_parse_user", RedditUser)
+    }
+    
+    def __init__(self, cache_ttl: float = 60.0, requests_per_minute: float = 60.0,
+                 burst: int = 10, max_connections: int = 8,
+                 offload_threshold: Optional[int] = None, offload_workers: int = 2,
+                 max_stored_posts: int = 200_000, listing_window: Optional[float] = None,
+                 window_refresh: float = 60.0, prefetch_comments: int = 0,
+                 max_stale: float = 3600.0, deadlines: Optional[Dict[str, float]] = None,
+                 hedge: bool = False, base_url: str = "https://www.reddit.com",
+                 metrics: Optional[Metrics] = None, max_cache_entries: int = 1024,
+                 user_cache_ttl: float = 86400.0, max_cached_users: int = 10_000):
+        """
+        Args:
+            cache_ttl: Seconds a fetched result is served from cache
+            requests_per_minute: Sustained upstream request rate
+            burst: Upstream requests allowed back to back before throttling
+            max_connections: Maximum concurrent upstream requests (and pooled connections)
+            offload_threshold: Inside rendering(), decode, parse and serialize
+                responses of at least this many bytes in a process pool (None: never).
+                Listings are always parsed here, into the post store
+            offload_workers: Size of the offload process pool
+            max_stored_posts: Posts held in the columnar listing store before
+                it starts a new generation
+            listing_window: Keep this many seconds of each requested subreddit's
+                newest posts locally and answer `new` and `top` pages from them
+                (None: always go upstream)
+            window_refresh: Seconds before a subreddit's window pulls new posts again
+            prefetch_comments: After serving a listing, fetch the comment trees
+                of this many of its top-scoring posts in the background; the
+                number then adapts to how often they are requested (0: off)
+            max_stale: When Reddit is failing, serve cached results up to this
+                many seconds past their expiry, marked stale
+            deadlines: Seconds allowed per upstream request by endpoint
+                (listing, search, about, comments), overriding DEFAULT_DEADLINES
+            hedge: Send a second copy of requests slower than the endpoint's
+                recent 95th percentile latency, for up to 5% of requests
+            base_url: Where to send API requests, e.g. a local stub for benchmarks
+            metrics: Registry to record upstream, cache, parse and serialize
+                metrics in, e.g. one shared with the server (default: a new one)
+            max_cache_entries: Parsed responses kept in the cache, least
+                recently used evicted first
+            user_cache_ttl: Seconds an account's about page is served from
+                the user cache
+            max_cached_users: Accounts kept in the user cache
+        """
+        self.base_url = base_url.rstrip("/")
         self.user_agents = [
             "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
             "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
@@ -98,25 +281,602 @@ class RedditTools:
             "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:89.0) Gecko/20100101 Firefox/89.0",
             "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.1.1 Safari/605.1.15"
         ]
+        self.chunk_size = 64 * 1024
+        self.offload_threshold = offload_threshold
+        self.offload_workers = offload_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._offload_pool: Optional[ProcessPoolExecutor] = None
+        
+        # Shared by every caller of this instance: one connection pool, one
+        # cache, one rate limiter and a fair scheduler for upstream slots
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_connections, pool_maxsize=max_connections)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.cache = TTLCache(ttl=cache_ttl, max_entries=max_cache_entries)
+        # Karma and account age change slowly, and a thread can have hundreds
+        # of authors; they get their own long-lived cache so listings don't
+        # evict them, nor they the listings
+        self.user_cache = TTLCache(ttl=user_cache_ttl, max_entries=max_cached_users)
+        # Cached listings keep their posts here instead of as model objects
+        self.post_store = PostStore()
+        self.max_stored_posts = max_stored_posts
+        self._store_lock = threading.Lock()
+        self.windows = ListingWindows(listing_window, window_refresh) if listing_window else None
+        # Every full `new` page fetched is indexed by creation time
+        self.time_indexes = TimeIndexes()
+        # Title terms of every post seen, counted per hour for trend queries
+        self.trends = TrendTracker()
+        # A prefetched result is only useful while it is cached
+        self.prefetch = (PrefetchPolicy(top_k=prefetch_comments, horizon=cache_ttl)
+                         if prefetch_comments else None)
+        # Fails calls fast while Reddit is erroring or too slow
+        self.breaker = CircuitBreaker()
+        self.max_stale = max_stale
+        self.deadlines = {**DEFAULT_DEADLINES, **(deadlines or {})}
+        self.connect_timeout = 3.05
+        self.hedging = HedgePolicy() if hedge else None
+        self._hedge_pool: Optional[ThreadPoolExecutor] = None
+        self._revalidating = set()
+        self.rate_limiter = RateLimiter(rate=requests_per_minute / 60.0, burst=burst)
+        self.metrics = metrics if metrics is not None else Metrics(prefix="reddit_")
+        self.metrics.add_collector(self._collect_metrics)
+        self.scheduler = RequestScheduler(max_concurrent=max_connections)
+        # Share of the rate-limit burst that lower priority classes leave
+        # untouched, so interactive calls never queue behind them for tokens
+        self.rate_reserve = {
+            Priority.INTERACTIVE: 0.0,
+            Priority.BULK: burst * 0.25,
+            Priority.BACKGROUND: burst * 0.5
+        }
     
     def get_user_agent(self) -> str:
         """Rotate user agents for requests"""
         return random.choice(self.user_agents)
     
-    def _make_request(self, url: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Make a request to Reddit API"""
+    def _spawn(self, fn: Callable[..., Any], *args,
+               priority: Priority = Priority.BACKGROUND, **kwargs) -> Future:
+        """
+        Run work spawned by a request (pagination, prefetch) in the background
+        
+        The task inherits the caller's context, so cancelling the originating
+        request also cancels the spawned task's upstream fetches. Its upstream
+        requests are scheduled at `priority`.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="reddit-tools")
+        context = contextvars.copy_context()
+        
+        def run():
+            with priority_scope(priority):
+                return fn(*args, **kwargs)
+        
+        return self._executor.submit(context.run, run)
+    
+    def _fetch(self, url: str, params: Optional[Dict[str, Any]] = None) -> bytes:
+        """Fetch the raw response body, aborting if the current request is cancelled"""
+        endpoint = endpoint_of(url)
+        delay = self.hedging.delay(endpoint) if self.hedging is not None else None
+        with span("fetch", endpoint=endpoint, url=url) as fetch:
+            if delay is None:
+                body = self._fetch_once(url, params, endpoint)
+            else:
+                body = self._fetch_hedged(url, params, endpoint, delay)
+            fetch.set(bytes=len(body))
+            return body
+    
+    def _fetch_hedged(self, url: str, params: Optional[Dict[str, Any]], endpoint: str,
+                      delay: float) -> bytes:
+        """
+        Fetch, sending a second identical request if the first is slower than `delay`
+        
+        The delay runs from when the first request is sent. No hedge is sent
+        while the rate limiter has no token to spare.
+        """
+        if self._hedge_pool is None:
+            self._hedge_pool = ThreadPoolExecutor(max_workers=self.scheduler.max_concurrent * 2,
+                                                  thread_name_prefix="reddit-hedge")
+        parent = current_token()
+        attempts = []
+        
+        def start(sent: Optional[threading.Event] = None) -> Future:
+            # Each attempt has its own token, so the loser can be aborted alone
+            token = CancelToken()
+            remove = parent.add_callback(token.cancel) if parent is not None else None
+            future = self._hedge_pool.submit(contextvars.copy_context().run, run_with_token, token,
+                                             self._fetch_once, url, params, endpoint, sent)
+            attempts.append((future, token, remove))
+            return future
+        
+        sent = threading.Event()
+        first = start(sent)
+        first.add_done_callback(lambda _: sent.set())
+        try:
+            # Time the first attempt from when it went out, not from when it
+            # started queueing for a connection slot or rate-limit token
+            sent.wait()
+            if (not wait([first], timeout=delay).done and self._spare_token()
+                    and self.hedging.try_hedge()):
+                start()
+            pending = {future for future, _, _ in attempts}
+            error = None
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        if future is not first:
+                            self.hedging.won()
+                        return future.result()
+                    error = future.exception()
+            raise error
+        finally:
+            for future, token, remove in attempts:
+                if remove is not None:
+                    remove()
+                token.cancel()
+    
+    def _spare_token(self) -> bool:
+        """Whether a request at the current priority could be sent now without waiting"""
+        return self.rate_limiter.available() >= 1 + self.rate_reserve[current_priority()]
+    
+    def _fetch_once(self, url: str, params: Optional[Dict[str, Any]], endpoint: str,
+                    sent: Optional[threading.Event] = None) -> bytes:
+        """Make one upstream request, within the endpoint's deadline; sets `sent` once it goes out"""
+        deadline = self.deadlines.get(endpoint, self.deadlines["listing"])
+        token = current_token()
+        if token is not None:
+            token.raise_if_cancelled()
+        
         headers = {
             "User-Agent": self.get_user_agent()
         }
         
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        return response.json()
+        if not self.breaker.allow():
+            raise UpstreamUnavailable(
+                f"Reddit is failing, not retrying for {self.breaker.retry_after() or 0:.0f}s: {url}")
+        
+        started = None
+        metrics = self.metrics
+        try:
+            with self.scheduler.slot():
+                with span("rate_limit_wait"):
+                    waited = self.rate_limiter.acquire(self.rate_reserve[current_priority()])
+                metrics.observe("rate_limit_wait_seconds", waited)
+                started = time.monotonic()
+                if sent is not None:
+                    sent.set()
+                with metrics.in_flight("upstream_in_flight", endpoint=endpoint), \
+                        span("http", endpoint=endpoint) as http:
+                    try:
+                        # The read timeout bounds a stalled response; a slow
+                        # trickle is caught by the check between chunks
+                        response = self.session.get(url, headers=headers, params=params, stream=True,
+                                                    timeout=(min(self.connect_timeout, deadline), deadline))
+                    except requests.Timeout as e:
+                        raise DeadlineExceeded(f"No response within {deadline:.1f}s: {url}") from e
+                    # Closing the response tears down the connection and unblocks the read below
+                    remove_callback = token.add_callback(response.close) if token is not None else None
+                    try:
+                        http.set(status=response.status_code)
+                        response.raise_for_status()
+                        chunks = []
+                        for chunk in response.iter_content(self.chunk_size):
+                            if token is not None and token.cancelled:
+                                break
+                            if time.monotonic() - started > deadline:
+                                raise DeadlineExceeded(f"Response took over {deadline:.1f}s: {url}")
+                            chunks.append(chunk)
+                    except Exception as e:
+                        if token is not None and token.cancelled:
+                            raise RequestCancelled(f"Request was cancelled: {url}")
+                        if isinstance(e, requests.Timeout):
+                            raise DeadlineExceeded(f"Response took over {deadline:.1f}s: {url}") from e
+                        raise
+                    finally:
+                        if remove_callback is not None:
+                            remove_callback()
+                        response.close()
+            
+            if token is not None:
+                token.raise_if_cancelled()
+        except RequestCancelled:
+            self.breaker.release()
+            metrics.inc("upstream_requests_total", endpoint=endpoint, outcome="cancelled")
+            raise
+        except requests.HTTPError as e:
+            # Client errors (404, 403) say nothing about Reddit's health
+            status = e.response.status_code if e.response is not None else 0
+            self.breaker.record(status < 500 and status != 429)
+            metrics.inc("upstream_requests_total", endpoint=endpoint, outcome=str(status))
+            raise
+        except Exception as e:
+            if started is None:
+                self.breaker.release()
+            else:
+                self.breaker.record(False)
+            outcome = "deadline" if isinstance(e, DeadlineExceeded) else "error"
+            metrics.inc("upstream_requests_total", endpoint=endpoint, outcome=outcome)
+            raise
+        
+        body = b"".join(chunks)
+        latency = time.monotonic() - started
+        metrics.inc("upstream_requests_total", endpoint=endpoint, outcome="ok")
+        metrics.observe("upstream_latency_seconds", latency, endpoint=endpoint)
+        metrics.observe("response_bytes", len(body), BYTE_BUCKETS, endpoint=endpoint)
+        self.breaker.record(True, latency)
+        if self.hedging is not None:
+            self.hedging.observe(endpoint, latency)
+        return body
     
-    def _parse_post(self, post_data: Dict[str, Any]) -> RedditPost:
-        """Parse raw post data into RedditPost model"""
+    def _make_request(self, url: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Make a request to Reddit API"""
+        raw = self._fetch(url, params)
+        with self.metrics.timer("parse_seconds", kind="json"), span("json_decode", bytes=len(raw)):
+            return json.loads(raw)
+    
+    def _cache_key(self, kind: str, url: str, params: Optional[Dict[str, Any]] = None) -> Hashable:
+        """Build the cache key for a parsed response"""
+        # Subreddit names in paths are case-insensitive
+        return (kind, url.lower(), tuple(sorted((params or {}).items())))
+    
+    def _parse_payload(self, kind: str, data: Any, **context) -> Any:
+        """Parse a decoded response of the given kind into its model"""
+        return getattr(self, self._PARSERS[kind][0])(data, **context)
+    
+    @contextmanager
+    def rendering(self, indent: Optional[int] = None):
+        """
+        Make the fetch methods called in the block return JSON text instead of models
+        
+        This is the path for callers that only serialize the result, such as
+        the MCP servers. Responses of at least `offload_threshold` bytes are
+        then decoded, parsed and serialized in a worker process, keeping that
+        CPU work (and the GIL) off the threads serving other requests.
+        Listings are not offloaded: their posts must reach the post store,
+        trend counters and comment prefetch in this process.
+        """
+        reset = _render_options.set({"indent": indent})
+        try:
+            yield self
+        finally:
+            _render_options.reset(reset)
+    
+    @contextmanager
+    def reloading(self, ttl: Optional[float] = None):
+        """
+        Make the fetch methods called in the block refetch even cached results
+        
+        Used to keep entries warm: readers go on getting the cached result
+        until the refetched one replaces it, now cached for `ttl` seconds
+        (default: the cache TTL).
+        """
+        reset = _cache_reload.set(self.cache.ttl if ttl is None else ttl)
+        try:
+            yield self
+        finally:
+            _cache_reload.reset(reset)
+    
+    @contextmanager
+    def models_only(self):
+        """
+        Make the fetch methods called in the block return models, even inside rendering()
+        
+        Calls in the block count as the client's own work, not requests from
+        a user: listings fetched there don't set off comment prefetch. Used
+        for pagination and by background components such as the cache warmer
+        and the refresh scheduler.
+        """
+        reset = _render_options.set(None)
+        internal = _internal_call.set(True)
+        try:
+            yield self
+        finally:
+            _internal_call.reset(internal)
+            _render_options.reset(reset)
+    
+    def _collect_posts(self, fetch_page: Callable[[int, Optional[str]], RedditPosts],
+                       limit: int) -> List[RedditPost]:
+        """
+        Page through a listing until `limit` posts are collected
+        
+        Args:
+            fetch_page: Called with (page size, after token) to fetch one page
+            limit: Maximum number of posts to collect
+        
+        Returns:
+            The collected posts, in listing order
+        """
+        posts: List[RedditPost] = []
+        after = None
+        with self.models_only():
+            while len(posts) < limit:
+                page = fetch_page(min(limit - len(posts), 100), after)
+                posts.extend(page.posts)
+                after = page.after
+                if not after or not page.posts:
+                    break
+        return posts[:limit]
+    
+    def _offload(self, kind: str, raw: bytes, context: Dict[str, Any], indent: Optional[int]) -> str:
+        """Render a raw payload in the process pool, waiting without holding the GIL"""
+        if self._offload_pool is None:
+            # Spawned workers don't inherit this process' threads and locks
+            self._offload_pool = ProcessPoolExecutor(
+                max_workers=self.offload_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        future = self._offload_pool.submit(render_payload, kind, raw, context, indent)
+        while True:
+            try:
+                return future.result(timeout=0.1).decode()
+            except TimeoutError:
+                check_cancelled()
+    
+    def _cached_request(self, kind: str, url: str, params: Optional[Dict[str, Any]],
+                        cache: Optional[TTLCache] = None, **context) -> Any:
+        """Fetch and parse a response, serving repeat requests from `cache` (default: the shared cache)"""
+        cache = self.cache if cache is None else cache
+        options = _render_options.get()
+        key = self._cache_key(kind, url, params)
+        loaded = False
+        
+        def load() -> Any:
+            nonlocal loaded
+            loaded = True
+            raw = self._fetch(url, params)
+            # A rendered listing would bypass the post store, trends and prefetch
+            if (options is not None and self.offload_threshold is not None
+                    and kind != "posts" and len(raw) >= self.offload_threshold):
+                with self.metrics.timer("offload_seconds", kind=kind), \
+                        span("offload", kind=kind, bytes=len(raw)):
+                    text = self._offload(kind, raw, context, options["indent"])
+                return _Rendered(text, options["indent"])
+            with self.metrics.timer("parse_seconds", kind=kind):
+                with span("json_decode", bytes=len(raw)):
+                    data = json.loads(raw)
+                with span("parse", kind=kind):
+                    if kind == "posts":
+                        return self._store_posts(data)
+                    return self._parse_payload(kind, data, **context)
+        
+        reload_ttl = _cache_reload.get()
+        stale = False
+        try:
+            with span("cache", kind=kind) as lookup:
+                value = cache.get_or_load(key, load, ttl=reload_ttl, refresh=reload_ttl is not None)
+                lookup.set(hit=not loaded)
+        except RequestCancelled:
+            raise
+        except Exception:
+            # Reddit is failing: fall back to an expired result, if there is one
+            cached = cache.get_stale(key, self.max_stale) if reload_ttl is None else None
+            if cached is None:
+                raise
+            value, age = cached
+            stale = True
+            self._serve_stale(key, age, lambda: cache.get_or_load(key, load, refresh=True))
+        self.metrics.inc("cache_requests_total", kind=kind,
+                         result="stale" if stale else "miss" if loaded else "hit")
+        
+        if isinstance(value, _Listing):
+            return self._listing_result(value)
+        
+        if isinstance(value, _Rendered):
+            if options is not None and options["indent"] == value.indent:
+                return value.text
+            # A model is needed after all, rebuild it from the rendered JSON
+            value = self._PARSERS[kind][1].model_validate_json(value.text)
+            if not stale:
+                cache.set(key, value)
+        
+        if options is not None:
+            with self.metrics.timer("serialize_seconds", kind=kind), span("serialize", kind=kind):
+                return json.dumps(value.model_dump(), indent=options["indent"])
+        return value
+    
+    def _serve_stale(self, key: Hashable, age: float, refetch: Callable[[], Any]) -> None:
+        """Note a stale result for the caller and call `refetch` in the background, once per key"""
+        staleness = _staleness.get()
+        if staleness is not None:
+            staleness.mark(age)
+        
+        with self._store_lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+        
+        def revalidate():
+            try:
+                # Fails fast while the breaker is open; once it half-opens
+                # this may be the probe that closes it
+                refetch()
+            except Exception:
+                pass
+            finally:
+                with self._store_lock:
+                    self._revalidating.discard(key)
+        
+        self._spawn(revalidate)
+    
+    @contextmanager
+    def tracking_staleness(self):
+        """
+        Report whether the fetch methods called in the block served stale results
+        
+        Yields a Staleness whose `stale` is set once any result in the block
+        came from an expired cache entry because Reddit was failing, and
+        whose `age` is the oldest such result's age in seconds.
+        """
+        staleness = Staleness()
+        reset = _staleness.set(staleness)
+        try:
+            yield staleness
+        finally:
+            _staleness.reset(reset)
+    
+    def _listing_result(self, listing: "_Listing") -> Any:
+        """Return a listing as JSON text inside rendering(), else as a RedditPosts model"""
+        if self.prefetch is not None and not _internal_call.get():
+            self._prefetch_comments(listing)
+        options = _render_options.get()
+        if options is not None:
+            with self.metrics.timer("serialize_seconds", kind="posts"), span("serialize", kind="posts"):
+                return json.dumps(listing.to_dict(), indent=options["indent"])
+        return listing.to_model()
+    
+    def _prefetch_comments(self, listing: "_Listing") -> None:
+        """Start fetching comment trees of the listing's top posts into the cache"""
+        store = listing.store
+        for rank, row in enumerate(store.top_k(listing.rows, self.prefetch.top_k)):
+            post = store.to_dict(int(row))
+            url, params = self._comments_request(post["subreddit"], post["id"], "best", 10)
+            key = self._cache_key("post_with_comments", url, params)
+            if self.cache.get(key) is None and self.prefetch.issue(key, rank):
+                self._spawn(self._prefetch_one, url, params, post["id"])
+    
+    def _prefetch_one(self, url: str, params: Dict[str, Any], post_id: str) -> None:
+        with self.models_only():
+            self._cached_request("post_with_comments", url, params, post_id=post_id)
+    
+    def _window_query(self, subreddit: str, sort: str, limit: int, time_filter: Optional[str],
+                      after: Optional[str]):
+        """
+        Answer a listing page from the subreddit's window, or None to go upstream
+        
+        If syncing the window with Reddit fails, the page is answered from the
+        posts the window already holds, marked stale like an expired cache
+        entry, and the window is refreshed in the background.
+        """
+        fetch_page = lambda token: self._fetch_new_page(subreddit, token)
+        try:
+            return self.windows.query(subreddit, sort, limit, time_filter, fetch_page, after)
+        except RequestCancelled:
+            raise
+        except Exception:
+            age = self.windows.age(subreddit)
+            if age is None or age - self.windows.refresh_interval > self.max_stale:
+                raise
+            local = self.windows.query(subreddit, sort, limit, time_filter, fetch_page, after, sync=False)
+        if local is not None:
+            self._serve_stale(("window", subreddit.lower()), age,
+                              lambda: self.windows.refresh(subreddit, fetch_page))
+        return local
+    
+    def _fetch_new_page(self, subreddit: str, after: Optional[str]):
+        """Fetch one full page of a subreddit's `new` listing as post fields"""
+        params = {"limit": 100, "raw_json": 1}
+        if after:
+            params["after"] = after
+        fetched_at = time.time()
+        data = self._make_request(f"{self.base_url}/r/{subreddit}/new.json", params).get("data", {})
+        posts = [self._post_fields(child) for child in data.get("children", [])]
+        self.time_indexes.index(subreddit).add_page(posts, after, data.get("after"), fetched_at)
+        self.trends.add_posts(posts)
+        return posts, data.get("after")
+    
+    def _collect_metrics(self, metrics: Metrics) -> None:
+        """Set gauges that are read rather than updated on the hot path"""
+        metrics.set("cache_entries", len(self.cache))
+        metrics.set("post_store_bytes", self.post_store.nbytes())
+        metrics.set("circuit_open", 0 if self.breaker.state == CircuitBreaker.CLOSED else 1)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Cache, scheduling, circuit breaker and optional feature statistics"""
+        lookups = self.cache.hits + self.cache.misses
+        stats = {
+            "cache": {
+                "entries": len(self.cache),
+                "hits": self.cache.hits,
+                "misses": self.cache.misses,
+                "hit_ratio": round(self.cache.hits / lookups, 3) if lookups else None
+            },
+            "user_cache": {
+                "entries": len(self.user_cache),
+                "hits": self.user_cache.hits,
+                "misses": self.user_cache.misses
+            },
+            "post_store": {"posts": len(self.post_store), "bytes": self.post_store.nbytes()},
+            "scheduler": self.scheduler.stats(),
+            "circuit_breaker": self.breaker.stats()
+        }
+        if self.windows is not None:
+            stats["listing_windows"] = {"local_hits": self.windows.local_hits,
+                                        "upstream_fallbacks": self.windows.upstream_fallbacks}
+        if self.hedging is not None:
+            stats["hedging"] = self.hedging.stats()
+        if self.prefetch is not None:
+            stats["prefetch"] = self.prefetch.stats()
+        return stats
+
+    def memory_regions(self) -> Dict[str, List[Any]]:
+        """Functions and modules whose live allocations a MemoryProfiler charges to each region"""
+        from . import cache, listing_window, post_store, time_index, trends
+        return {
+            "response_bodies": [RedditTools._fetch_once, RedditTools._fetch_hedged],
+            "json_decode": [RedditTools._make_request, RedditTools._cached_request],
+            "listings": [RedditTools._store_posts, RedditTools._parse_posts, RedditTools._post_fields,
+                         RedditTools._parse_post, post_store],
+            "post_pages": [RedditTools._parse_post_page],
+            "comment_trees": [RedditTools._parse_post_with_comments, RedditTools._parse_comment],
+            "subreddits": [RedditTools._parse_subreddit, RedditTools._parse_subreddits],
+            "users": [RedditTools._parse_user],
+            "cache": [cache],
+            "time_indexes": [time_index],
+            "listing_windows": [listing_window],
+            "trends": [trends]
+        }
+
+    def memory_usage(self) -> Dict[str, Any]:
+        """
+        Bytes retained by each cache of this client
+
+        Walks every cached object, so it takes a while on a large cache.
+        Listings in the response cache point into post stores, which they
+        don't own; the current store's size is reported separately.
+        """
+        from .memory_profile import deep_sizeof
+        by_kind: Dict[str, Dict[str, int]] = {}
+        for key, value in self.cache.items():
+            kind = by_kind.setdefault(key[0], {"entries": 0, "bytes": 0})
+            kind["entries"] += 1
+            kind["bytes"] += deep_sizeof(value, exclude_types=(PostStore,))
+        usage = {
+            "response_cache": by_kind,
+            "user_cache": {"entries": len(self.user_cache),
+                           "bytes": sum(deep_sizeof(value) for _, value in self.user_cache.items())},
+            "post_store": {"posts": len(self.post_store), "bytes": self.post_store.nbytes()},
+            "time_indexes": deep_sizeof(self.time_indexes),
+            "trends": deep_sizeof(self.trends)
+        }
+        if self.windows is not None:
+            usage["listing_windows"] = deep_sizeof(self.windows)
+        return usage
+
+    def close(self) -> None:
+        """Release the connection pool and worker pools"""
+        self.session.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        if self._offload_pool is not None:
+            self._offload_pool.shutdown(wait=False)
+        if self._hedge_pool is not None:
+            self._hedge_pool.shutdown(wait=False)
+    
+    def _parse_posts(self, data: Dict[str, Any]) -> RedditPosts:
+        """Parse a raw listing into a RedditPosts collection"""
+        posts = [self._parse_post(child) for child in data.get("data", {}).get("children", [])]
+        
+        return RedditPosts(
+            posts=posts,
+            after=data.get("data", {}).get("after"),
+            before=data.get("data", {}).get("before"),
+            count=len(posts)
+        )
+    
+    def _post_fields(self, post_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Extract RedditPost field values from raw post data"""
         data = post_data.get("data", {})
-        return RedditPost(
+        return dict(
             id=data.get("id", ""),
             title=data.get("title", ""),
             author=data.get("author", "[deleted]"),
@@ -132,6 +892,27 @@ class RedditTools:
             is_self=data.get("is_self", False)
         )
     
+    def _parse_post(self, post_data: Dict[str, Any]) -> RedditPost:
+        """Parse raw post data into RedditPost model"""
+        return RedditPost(**self._post_fields(post_data))
+    
+    def _store_posts(self, data: Dict[str, Any]) -> "_Listing":
+        """Parse a raw listing straight into the columnar post store"""
+        store = self.post_store
+        if len(store) >= self.max_stored_posts:
+            # Start a new generation; listings still cached keep the old
+            # store alive until they expire
+            with self._store_lock:
+                if self.post_store is store:
+                    self.post_store = PostStore()
+                store = self.post_store
+        
+        listing = data.get("data", {})
+        posts = [self._post_fields(child) for child in listing.get("children", [])]
+        rows = store.add_many(posts)
+        self.trends.add_posts(posts)
+        return _Listing(store, rows, listing.get("after"), listing.get("before"))
+    
     def _parse_subreddit(self, sub_data: Dict[str, Any]) -> Subreddit:
         """Parse raw subreddit data into Subreddit model"""
         data = sub_data.get("data", {})
@@ -170,25 +951,24 @@ class RedditTools:
             "raw_json": 1
         }
         
+        # Inside reloading() the caller wants Reddit's current listing, not the window's copy
+        if self.windows is not None and sort in ("new", "top") and _cache_reload.get() is None:
+            local = self._window_query(subreddit, sort, min(limit, 100), time, after)
+            if local is not None:
+                store, rows, next_after = local
+                return self._listing_result(_Listing(store, rows, next_after, None))
+        
         if sort == "top" and time:
             params["t"] = time
         
         if after:
             params["after"] = after
         
-        data = self._make_request(url, params)
-        posts = [self._parse_post(child) for child in data.get("data", {}).get("children", [])]
-        
-        return RedditPosts(
-            posts=posts,
-            after=data.get("data", {}).get("after"),
-            before=data.get("data", {}).get("before"),
-            count=len(posts)
-        )
+        return self._cached_request("posts", url, params)
     
     def search_post(self, query: str, subreddit: Optional[str] = None, 
                    sort: str = "relevance", limit: int = 25, 
-                   time: str = "all") -> RedditPosts:
+                   time: str = "all", after: Optional[str] = None) -> RedditPosts:
         """
         Search for posts
         
@@ -198,6 +978,7 @@ class RedditTools:
             sort: Sort method (relevance, hot, top, new, comments)
             limit: Number of posts to retrieve
             time: Time period (hour, day, week, month, year, all)
+            after: Pagination token
         
         Returns:
             RedditPosts object containing search results
@@ -218,15 +999,10 @@ class RedditTools:
         if subreddit:
             params["restrict_sr"] = "true"
         
-        data = self._make_request(url, params)
-        posts = [self._parse_post(child) for child in data.get("data", {}).get("children", [])]
+        if after:
+            params["after"] = after
         
-        return RedditPosts(
-            posts=posts,
-            after=data.get("data", {}).get("after"),
-            before=data.get("data", {}).get("before"),
-            count=len(posts)
-        )
+        return self._cached_request("posts", url, params)
     
     def search_subreddits(self, query: str, limit: int = 25) -> Subreddits:
         """
@@ -246,7 +1022,10 @@ class RedditTools:
             "raw_json": 1
         }
         
-        data = self._make_request(url, params)
+        return self._cached_request("subreddits", url, params)
+    
+    def _parse_subreddits(self, data: Dict[str, Any]) -> Subreddits:
+        """Parse a raw listing into a Subreddits collection"""
         subreddits = [self._parse_subreddit(child) for child in data.get("data", {}).get("children", [])]
         
         return Subreddits(
@@ -266,8 +1045,103 @@ class RedditTools:
             Subreddit object with metadata
         """
         url = f"{self.base_url}/r/{subreddit}/about.json"
-        data = self._make_request(url)
-        return self._parse_subreddit(data)
+        return self._cached_request("subreddit", url, None)
+    
+    def _parse_user(self, user_data: Dict[str, Any]) -> RedditUser:
+        """Parse a raw account about page into a RedditUser model"""
+        data = user_data.get("data", {})
+        return RedditUser(
+            name=data.get("name", ""),
+            id=data.get("id", ""),
+            link_karma=data.get("link_karma", 0),
+            comment_karma=data.get("comment_karma", 0),
+            total_karma=data.get("total_karma", data.get("link_karma", 0) + data.get("comment_karma", 0)),
+            created_utc=data.get("created_utc", 0),
+            is_mod=data.get("is_mod", False),
+            is_employee=data.get("is_employee", False),
+            verified=data.get("verified", False),
+            has_verified_email=bool(data.get("has_verified_email")),
+            is_suspended=data.get("is_suspended", False),
+            icon_img=data.get("icon_img") if data.get("icon_img") else None
+        )
+    
+    def get_user_about(self, name: str) -> RedditUser:
+        """
+        Get a Reddit account's karma, age and status
+        
+        Served from the user cache, which keeps accounts for `user_cache_ttl`.
+        
+        Args:
+            name: Username, without the u/ prefix
+        
+        Returns:
+            RedditUser object; suspended accounts only have `name` and `is_suspended`
+        """
+        url = f"{self.base_url}/user/{name}/about.json"
+        return self._cached_request("user", url, None, cache=self.user_cache)
+    
+    def get_users_about(self, names: Iterable[str], max_concurrency: int = 8) -> Dict[str, RedditUser]:
+        """
+        Get many Reddit accounts at once, e.g. every author in a thread
+        
+        Names are deduplicated case-insensitively, and deleted authors are
+        skipped. Cached accounts are returned without a request; the rest
+        are fetched `max_concurrency` at a time through the shared rate
+        limiter. Reddit only serves account pages one by one, so a name is
+        never fetched twice, even by concurrent callers, but there is no
+        request covering several.
+        
+        Args:
+            names: Usernames, repeats allowed
+            max_concurrency: Most account pages fetched at once
+        
+        Returns:
+            RedditUser by name, as first spelled in `names`; accounts that
+            no longer exist are left out
+        """
+        unique: Dict[str, str] = {}
+        for name in names:
+            if name and name not in ("[deleted]", "[removed]"):
+                unique.setdefault(name.lower(), name)
+        users: Dict[str, RedditUser] = {}
+        missing: List[str] = []
+        for name in unique.values():
+            key = self._cache_key("user", f"{self.base_url}/user/{name}/about.json")
+            cached = self.user_cache.get(key, count=True) if _cache_reload.get() is None else None
+            if isinstance(cached, RedditUser):
+                self.metrics.inc("cache_requests_total", kind="user", result="hit")
+                users[name] = cached
+            else:
+                missing.append(name)
+        if not missing:
+            return users
+        
+        def fetch(name: str) -> Optional[RedditUser]:
+            with self.models_only():
+                try:
+                    return self.get_user_about(name)
+                except requests.HTTPError as e:
+                    # Deleted and shadowbanned accounts have no about page
+                    if e.response is not None and e.response.status_code == 404:
+                        return None
+                    raise
+        
+        # Each fetch runs in a copy of the caller's context, keeping its
+        # priority, client and cancellation token
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(missing)),
+                                thread_name_prefix="reddit-users") as executor:
+            futures = {name: executor.submit(contextvars.copy_context().run, fetch, name) for name in missing}
+            try:
+                for name, future in futures.items():
+                    user = future.result()
+                    if user is not None:
+                        users[name] = user
+            except BaseException:
+                for future in futures.values():
+                    future.cancel()
+                raise
+        # In the order asked for
+        return {name: users[name] for name in unique.values() if name in users}
     
     def get_popular_post(self, limit: int = 25, geo_filter: Optional[str] = None) -> RedditPosts:
         """
@@ -289,15 +1163,7 @@ class RedditTools:
         if geo_filter:
             params["geo_filter"] = geo_filter
         
-        data = self._make_request(url, params)
-        posts = [self._parse_post(child) for child in data.get("data", {}).get("children", [])]
-        
-        return RedditPosts(
-            posts=posts,
-            after=data.get("data", {}).get("after"),
-            before=data.get("data", {}).get("before"),
-            count=len(posts)
-        )
+        return self._cached_request("posts", url, params)
     
     def get_all_post(self, sort: str = "hot", limit: int = 25, 
                     time: str = "day", after: Optional[str] = None) -> RedditPosts:
@@ -325,15 +1191,7 @@ class RedditTools:
         if after:
             params["after"] = after
         
-        data = self._make_request(url, params)
-        posts = [self._parse_post(child) for child in data.get("data", {}).get("children", [])]
-        
-        return RedditPosts(
-            posts=posts,
-            after=data.get("data", {}).get("after"),
-            before=data.get("data", {}).get("before"),
-            count=len(posts)
-        )
+        return self._cached_request("posts", url, params)
     
     def get_post_by_id(self, subreddit: str, post_id: str) -> RedditPost:
         """
@@ -351,7 +1209,10 @@ class RedditTools:
             "raw_json": 1
         }
         
-        data = self._make_request(url, params)
+        return self._cached_request("post", url, params, post_id=post_id)
+    
+    def _parse_post_page(self, data: Any, post_id: str) -> RedditPost:
+        """Parse the post out of a raw comments page"""
         # The response contains the post in the first item of the array
         if data and len(data) > 0:
             post_data = data[0].get("data", {}).get("children", [])[0]
@@ -392,7 +1253,8 @@ class RedditTools:
         return comment
     
     def get_post_with_comments(self, subreddit: str, post_id: str, 
-                              sort: str = "best", limit: int = 10) -> RedditPostWithComments:
+                              sort: str = "best", limit: int = 10,
+                              with_authors: bool = False) -> RedditPostWithComments:
         """
         Get a specific post with its comments
         
@@ -401,19 +1263,52 @@ class RedditTools:
             post_id: The post ID
             sort: Comment sort method (best, top, new, controversial, old, qa)
             limit: Maximum number of top-level comments to retrieve
+            with_authors: Also fill in `authors` with the accounts of the post's
+                and comments' authors, from get_users_about()
         
         Returns:
             RedditPostWithComments object containing the post and its comments
         """
+        url, params = self._comments_request(subreddit, post_id, sort, limit)
+        if self.prefetch is not None and not _internal_call.get():
+            self.prefetch.record_request(self._cache_key("post_with_comments", url, params))
+        
+        if not with_authors:
+            return self._cached_request("post_with_comments", url, params, post_id=post_id)
+        
+        options = _render_options.get()
+        with self.models_only():
+            thread = self._cached_request("post_with_comments", url, params, post_id=post_id)
+        # The cached thread is shared, so the accounts go on a copy
+        thread = thread.model_copy(update={"authors": self.get_users_about(self._thread_authors(thread))})
+        if options is not None:
+            with self.metrics.timer("serialize_seconds", kind="post_with_comments"), \
+                    span("serialize", kind="post_with_comments"):
+                return json.dumps(thread.model_dump(), indent=options["indent"])
+        return thread
+    
+    def _thread_authors(self, thread: RedditPostWithComments) -> List[str]:
+        """Authors of a post and its whole comment tree, post author first"""
+        authors = [thread.post.author]
+        pending = list(reversed(thread.comments))
+        while pending:
+            comment = pending.pop()
+            authors.append(comment.author)
+            pending.extend(reversed(comment.replies))
+        return authors
+    
+    def _comments_request(self, subreddit: str, post_id: str, sort: str, limit: int):
+        """URL and parameters of a post's comments page"""
         url = f"{self.base_url}/r/{subreddit}/comments/{post_id}.json"
         params = {
             "raw_json": 1,
             "sort": sort,
             "limit": limit
         }
-        
-        data = self._make_request(url, params)
-        
+        return url, params
+    
+    def _parse_post_with_comments(self, data: Any, post_id: str) -> RedditPostWithComments:
+        """Parse a raw comments page into a RedditPostWithComments model"""
         if not data or len(data) < 2:
             raise ValueError(f"Invalid response for post: {post_id}")
         
@@ -434,4 +1329,155 @@ class RedditTools:
             post=post,
             comments=comments,
             comment_count=len(comments)
-        )
\ No newline at end of file
+        )
+    
+    def analyze_posts(self, subreddit: Optional[str] = None, query: Optional[str] = None,
+                      sort: str = "new", time: str = "day", limit: int = 500,
+                      top_n: int = 10, include_selftext: bool = False) -> "PostAnalytics":
+        """
+        Compute aggregates over a subreddit listing or search results server-side
+        
+        Pages through up to `limit` posts (served from cache where possible)
+        and returns only the summary, not the posts.
+        
+        Args:
+            subreddit: Subreddit to analyze (r/all when omitted without a query)
+            query: Analyze search results for this query instead of a listing
+            sort: Listing sort (hot, new, top, rising), or with a query a
+                search sort (relevance, hot, top, new, comments)
+            time: Time period for top posts and searches
+            limit: Maximum number of posts to analyze (max 1000)
+            top_n: Number of top authors and keywords to return
+            include_selftext: Count keywords in post bodies as well as titles
+        
+        Returns:
+            PostAnalytics with top authors, score and comment percentiles,
+            posts per UTC hour and the most frequent keywords
+        """
+        from .analytics import analyze_posts
+        
+        _check_sort(sort, query)
+        
+        def fetch_page(page_size: int, after: Optional[str]) -> RedditPosts:
+            if query:
+                return self.search_post(query, subreddit, sort, page_size, time, after)
+            if subreddit:
+                return self.get_reddit_post(subreddit, sort, page_size, time, after)
+            return self.get_all_post(sort, page_size, time, after)
+        
+        posts = self._collect_posts(fetch_page, min(limit, 1000))
+        return analyze_posts(posts, top_n=top_n, include_selftext=include_selftext)
+    
+    def get_rising_terms(self, hours: float = 6, baseline_hours: float = 48,
+                         top_n: int = 20, min_count: int = 3) -> RisingTerms:
+        """
+        Title terms appearing in more posts lately than before
+        
+        Answered from streaming counters fed by every listing RedditTools has
+        fetched, so it makes no upstream requests and only reflects
+        subreddits that have been polled.
+        
+        Args:
+            hours: Length of the recent period
+            baseline_hours: Length of the preceding period to compare with
+            top_n: Number of terms to return
+            min_count: Minimum number of recent posts a term must appear in
+        
+        Returns:
+            RisingTerms ordered by how much faster each term is appearing
+        """
+        return self.trends.rising_terms(hours, baseline_hours, top_n, min_count)
+    
+    def get_deduplicated_posts(self, subreddits: Optional[List[str]] = None,
+                               query: Optional[str] = None, sort: str = "hot",
+                               time: str = "day", limit: int = 100, threshold: float = 0.7,
+                               include_selftext: bool = True) -> "PostClusters":
+        """
+        Get posts from several subreddits or a search with duplicates collapsed
+        
+        Several subreddits are fetched as one combined listing. Posts linking
+        to the same normalized URL, crossposts and posts with near-identical
+        title and text are merged into clusters led by their highest scoring
+        post, with references to the others.
+        
+        Args:
+            subreddits: Subreddits to combine (r/all when omitted without a query)
+            query: Search for this query instead, across `subreddits` if given
+            sort: Listing sort (hot, new, top, rising), or with a query a
+                search sort (relevance, hot, top, new, comments)
+            time: Time period for top posts and searches
+            limit: Maximum number of posts to fetch before clustering (max 1000)
+            threshold: Text similarity (estimated Jaccard) needed to merge posts
+            include_selftext: Compare post bodies as well as titles
+        
+        Returns:
+            PostClusters in listing order, with the after token of the last
+            page fetched
+        """
+        from .dedup import cluster_posts
+        
+        _check_sort(sort, query)
+        
+        combined = "+".join(subreddits) if subreddits else None
+        last_page: List[RedditPosts] = []
+        
+        def fetch_page(page_size: int, after: Optional[str]) -> RedditPosts:
+            if query:
+                page = self.search_post(query, combined, sort, page_size, time, after)
+            elif combined:
+                page = self.get_reddit_post(combined, sort, page_size, time, after)
+            else:
+                page = self.get_all_post(sort, page_size, time, after)
+            last_page[:] = [page]
+            return page
+        
+        posts = self._collect_posts(fetch_page, min(limit, 1000))
+        clusters = cluster_posts(posts, threshold=threshold, include_selftext=include_selftext)
+        clusters.after = last_page[0].after if last_page else None
+        return clusters
+    
+    def get_posts_in_range(self, subreddit: str, start: float, end: Optional[float] = None,
+                           limit: int = 1000, max_pages: int = 10) -> RedditPosts:
+        """
+        Get a subreddit's posts created within a time range
+        
+        Answered from a local index of fetched posts ordered by creation
+        time. Only the parts of the range the index doesn't hold completely
+        are fetched, by paging the `new` listing from the nearest known post.
+        Reddit stops paginating after about 1000 posts, so ranges further
+        back than that may be incomplete.
+        
+        Args:
+            subreddit: Name of the subreddit
+            start: Earliest creation time, UTC timestamp
+            end: Latest creation time, UTC timestamp (default: now)
+            limit: Maximum number of posts to return
+            max_pages: Maximum upstream pages fetched per gap
+        
+        Returns:
+            RedditPosts with the posts in the range, newest first
+        """
+        index = self.time_indexes.index(subreddit)
+        end = time.time() if end is None else end
+        with index.lock:
+            for gap_start, gap_end in index.gaps(start, end):
+                self._fill_gap(index, subreddit, gap_start, gap_end, max_pages)
+            rows = index.range(start, end, limit)
+            store = index.store
+        return self._listing_result(_Listing(store, rows, None, None))
+    
+    def _fill_gap(self, index: TimeIndex, subreddit: str, gap_start: float, gap_end: float,
+                  max_pages: int) -> None:
+        """Page the `new` listing from just past `gap_end` until posts older than `gap_start`"""
+        after = index.anchor(gap_end)
+        for _ in range(max_pages):
+            posts, next_after = self._fetch_new_page(subreddit, after)
+            if not posts and after is not None and index.anchor(gap_end) == after:
+                # The anchor post is gone from the listing; read from the head instead
+                after = None
+                continue
+            if not posts or not next_after:
+                return
+            if min(post["created_utc"] or 0 for post in posts) < gap_start:
+                return
+            after = next_after
@@ -0,0 +1,300 @@
+import heapq
+import logging
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .reddit_tools import RedditPost, RedditTools
+from .scheduling import Priority, client_scope, priority_scope
+
+logger = logging.getLogger(__name__)
+
+
+class ArrivalEstimate:
+    """
+    A subreddit's rate of new posts, from what its `new` listing showed
+
+    Each refresh contributes the posts newer than any seen before and the
+    time they arrived over, both decayed with `half_life` so the estimate
+    follows a subreddit that gets busier or quieter. A weak prior keeps
+    a subreddit that has shown nothing yet from looking dead.
+    """
+
+    def __init__(self, half_life: float = 6 * 3600, prior_posts: float = 1 / 12, prior_seconds: float = 300.0):
+        """
+        Args:
+            half_life: Seconds after which an observation counts half
+            prior_posts: Posts assumed before anything is observed...
+            prior_seconds: ...over this many seconds
+        """
+        self.half_life = half_life
+        self.prior_posts = prior_posts
+        self.prior_seconds = prior_seconds
+        self.posts = 0.0
+        self.seconds = 0.0
+        self.newest: Optional[float] = None
+        self.checked: Optional[float] = None
+
+    @property
+    def rate(self) -> float:
+        """Estimated new posts per second"""
+        return (self.posts + self.prior_posts) / (self.seconds + self.prior_seconds)
+
+    def observe(self, created: List[float], now: float, page_full: bool) -> int:
+        """
+        Add one refresh of the listing
+
+        Args:
+            created: Creation times of the posts on the page, any order
+            now: When the page was fetched
+            page_full: Whether the page was full, so it may not reach back
+                to the previous refresh
+
+        Returns:
+            Number of posts not seen before
+        """
+        if not created:
+            fresh: List[float] = []
+        elif self.newest is None:
+            fresh = list(created)
+        else:
+            fresh = [t for t in created if t > self.newest]
+        if self.checked is None or (page_full and len(fresh) == len(created)):
+            # All we know is what the page covers: its posts since its oldest one
+            window = now - min(created) if created else 0.0
+        else:
+            window = now - self.checked
+        decay = 0.5 ** (max(window, 0.0) / self.half_life)
+        self.posts = self.posts * decay + len(fresh)
+        self.seconds = self.seconds * decay + max(window, 0.0)
+        if created:
+            self.newest = max(self.newest or 0.0, max(created))
+        self.checked = now
+        return len(fresh)
+
+
+def plan_intervals(rates: Dict[str, float], target_delay: float, budget: float,
+                   min_interval: float, max_interval: float, page_size: int = 100,
+                   fill: float = 0.8) -> Tuple[Dict[str, float], float]:
+    """
+    Choose refresh intervals for subreddits with the given arrival rates
+
+    A post waits half an interval on average to be seen. For a given
+    number of requests, the mean delay over all posts is least with
+    intervals proportional to 1 / sqrt(rate), each clamped to its bounds.
+    Intervals stay within [min_interval, max_interval]. None is so long
+    that more than `fill` of a page of new posts piles up, since the rest
+    would be missed. The common factor is found by bisection. It is the
+    largest factor that keeps the mean delay within `target_delay`, or the
+    smallest that spends no more than `budget` when the target needs more.
+    If the budget is too small even then, every interval is stretched
+    to fit it.
+
+    Args:
+        rates: Posts per second, by subreddit
+        target_delay: Mean seconds from a post's creation to a refresh seeing it
+        budget: Most refreshes per second, over all subreddits
+        min_interval: Shortest interval
+        max_interval: Longest interval
+        page_size: Posts per listing page
+        fill: Share of a page allowed to fill between refreshes
+
+    Returns:
+        (interval by subreddit, expected mean delay per post)
+    """
+    if not rates:
+        return {}, 0.0
+    names = list(rates)
+    upper = {name: min(max_interval, page_size * fill / rates[name]) if rates[name] > 0 else max_interval
+             for name in names}
+    lower = {name: min(min_interval, upper[name]) for name in names}
+    total_rate = sum(rates.values())
+
+    def intervals_for(scale: float) -> Dict[str, float]:
+        return {name: min(max(scale / math.sqrt(rates[name]), lower[name]), upper[name])
+                if rates[name] > 0 else upper[name] for name in names}
+
+    def mean_delay(intervals: Dict[str, float]) -> float:
+        return sum(rates[name] * intervals[name] / 2 for name in names) / total_rate if total_rate else 0.0
+
+    def spent(intervals: Dict[str, float]) -> float:
+        return sum(1 / interval for interval in intervals.values())
+
+    def boundary(below: Callable[[Dict[str, float]], bool]) -> Tuple[float, float]:
+        """Scales just under and over where `below` turns false, as the scale grows"""
+        low, high = math.log(1e-6), math.log(1e9)
+        for _ in range(60):
+            middle = (low + high) / 2
+            if below(intervals_for(math.exp(middle))):
+                low = middle
+            else:
+                high = middle
+        return math.exp(low), math.exp(high)
+
+    # Mean delay grows with the scale, and requests shrink with it
+    intervals = intervals_for(boundary(lambda planned: mean_delay(planned) <= target_delay)[0])
+    if spent(intervals) > budget:
+        intervals = intervals_for(boundary(lambda planned: spent(planned) > budget)[1])
+    over = spent(intervals)
+    if over > budget:
+        # Even the longest intervals are too many; a hard limit, whatever is missed
+        intervals = {name: interval * over / budget for name, interval in intervals.items()}
+    return intervals, mean_delay(intervals)
+
+
+class RefreshScheduler:
+    """
+    Refreshes subreddits' `new` listings as often as their post rate calls for
+
+    Subreddits wait in a priority queue ordered by when each is next due.
+    Every refresh updates the subreddit's ArrivalEstimate and re-plans all
+    intervals with plan_intervals(), so busy subreddits are checked often
+    enough to catch their posts within `target_delay` on average, and
+    quiet ones rarely, with the total staying under the request budget.
+    Refreshes run at background priority and are re-cached for twice their
+    interval, so readers of the same listing are served from cache.
+    """
+
+    def __init__(self, tools: RedditTools, subreddits: List[str], target_delay: float = 300.0,
+                 requests_per_minute: float = 20.0, min_interval: float = 30.0,
+                 max_interval: float = 6 * 3600.0,
+                 on_posts: Optional[Callable[[str, List[RedditPost]], None]] = None):
+        """
+        Args:
+            tools: Client to fetch with
+            subreddits: Subreddits to monitor
+            target_delay: Mean seconds from a post's creation until it is seen
+            requests_per_minute: Most refreshes per minute, over all subreddits
+            min_interval: Shortest refresh interval of any subreddit
+            max_interval: Longest refresh interval of any subreddit
+            on_posts: Called with a subreddit and its posts not seen before
+        """
+        self.tools = tools
+        self.target_delay = target_delay
+        self.budget = requests_per_minute / 60.0
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.on_posts = on_posts
+        self.refreshes = 0
+        self.failures = 0
+        self.expected_delay = 0.0
+        self.estimates: Dict[str, ArrivalEstimate] = {}
+        self.intervals: Dict[str, float] = {}
+        self._due: Dict[str, float] = {}
+        self._queue: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        for name in subreddits:
+            self.add(name)
+
+    def add(self, subreddit: str) -> None:
+        """Start monitoring a subreddit; it is refreshed straight away"""
+        name = subreddit.lower()
+        with self._lock:
+            if name in self.estimates:
+                return
+            self.estimates[name] = ArrivalEstimate()
+            self._due[name] = time.monotonic()
+            heapq.heappush(self._queue, (self._due[name], name))
+        self._wake.set()
+
+    def remove(self, subreddit: str) -> None:
+        """Stop monitoring a subreddit"""
+        name = subreddit.lower()
+        with self._lock:
+            self.estimates.pop(name, None)
+            self.intervals.pop(name, None)
+            self._due.pop(name, None)
+            self._replan()
+
+    def _replan(self) -> None:
+        """Recompute every interval and due time; call with the lock held"""
+        rates = {name: estimate.rate for name, estimate in self.estimates.items()}
+        self.intervals, self.expected_delay = plan_intervals(
+            rates, self.target_delay, self.budget, self.min_interval, self.max_interval)
+        for name, estimate in self.estimates.items():
+            if estimate.checked is not None:
+                # Due times are on the monotonic clock, estimates on the wall clock
+                since = time.time() - estimate.checked
+                self._due[name] = time.monotonic() - since + self.intervals[name]
+        self._queue = [(due, name) for name, due in self._due.items()]
+        heapq.heapify(self._queue)
+
+    def refresh(self, subreddit: str) -> int:
+        """Fetch a subreddit's newest posts now, returning how many were new"""
+        estimate = self.estimates[subreddit]
+        interval = self.intervals.get(subreddit, self.min_interval)
+        with client_scope("refresh-scheduler"), priority_scope(Priority.BACKGROUND), \
+                self.tools.reloading(interval * 2), self.tools.models_only():
+            page = self.tools.get_reddit_post(subreddit, "new", 100)
+        now = time.time()
+        with self._lock:
+            newest = estimate.newest
+            count = estimate.observe([post.created_utc for post in page.posts], now, len(page.posts) >= 100)
+            self.refreshes += 1
+            self._replan()
+        if self.on_posts is not None and count:
+            fresh = [post for post in page.posts if newest is None or post.created_utc > newest]
+            self.on_posts(subreddit, fresh)
+        return count
+
+    def _next_due(self) -> Optional[Tuple[float, str]]:
+        with self._lock:
+            while self._queue:
+                due, name = self._queue[0]
+                if self._due.get(name) != due:
+                    # Superseded by a re-plan or a removal
+                    heapq.heappop(self._queue)
+                    continue
+                return due, name
+        return None
+
+    def run(self) -> None:
+        """Refresh subreddits as they fall due until stop() is called"""
+        while not self._stop.is_set():
+            entry = self._next_due()
+            wait = self.max_interval if entry is None else entry[0] - time.monotonic()
+            if wait > 0:
+                self._wake.clear()
+                self._wake.wait(wait)
+                continue
+            name = entry[1]
+            with self._lock:
+                # Not due again until this refresh re-plans it
+                self._due[name] = time.monotonic() + self.intervals.get(name, self.min_interval)
+                heapq.heappush(self._queue, (self._due[name], name))
+            try:
+                self.refresh(name)
+            except Exception as e:
+                self.failures += 1
+                logger.warning("Refreshing r/%s failed: %s", name, e)
+
+    def start(self) -> threading.Thread:
+        """Run in a daemon thread"""
+        thread = threading.Thread(target=self.run, name="refresh-scheduler", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            subreddits = {
+                name: {
+                    "posts_per_hour": round(estimate.rate * 3600, 2),
+                    "interval_seconds": round(self.intervals.get(name, 0.0), 1)
+                }
+                for name, estimate in self.estimates.items()
+            }
+            planned = sum(1 / interval for interval in self.intervals.values() if interval > 0)
+        return {
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "requests_per_minute": round(planned * 60, 2),
+            "expected_delay_seconds": round(self.expected_delay, 1),
+            "subreddits": subreddits
+        }
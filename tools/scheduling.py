@@ -0,0 +1,290 @@
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional
+
+from .cancellation import current_token
+from .metrics import Histogram
+
+DEFAULT_CLIENT = "default"
+
+
+class Priority(IntEnum):
+    """Scheduling class of upstream work; lower values are served first"""
+    INTERACTIVE = 0
+    BULK = 1
+    BACKGROUND = 2
+
+
+_current_client: contextvars.ContextVar[Hashable] = contextvars.ContextVar(
+    "reddit_client_id", default=DEFAULT_CLIENT
+)
+
+_current_priority: contextvars.ContextVar[Priority] = contextvars.ContextVar(
+    "reddit_priority", default=Priority.INTERACTIVE
+)
+
+
+def current_client() -> Hashable:
+    """Return the id of the client whose request is being served"""
+    return _current_client.get()
+
+
+@contextmanager
+def client_scope(client_id: Hashable):
+    """Attribute upstream work in the block to `client_id` for fair scheduling"""
+    reset = _current_client.set(client_id)
+    try:
+        yield client_id
+    finally:
+        _current_client.reset(reset)
+
+
+def current_priority() -> Priority:
+    """Return the scheduling class of the work being done"""
+    return _current_priority.get()
+
+
+@contextmanager
+def priority_scope(priority: Priority):
+    """Run upstream work in the block at `priority`"""
+    reset = _current_priority.set(priority)
+    try:
+        yield priority
+    finally:
+        _current_priority.reset(reset)
+
+
+class RoundRobinQueue:
+    """Per-client FIFO queues served round-robin, so one busy client can't starve the rest"""
+
+    def __init__(self):
+        self._queues: Dict[Hashable, Deque[Any]] = {}
+        self._order: Deque[Hashable] = deque()
+        self._size = 0
+
+    def push(self, client_id: Hashable, item: Any) -> None:
+        """Queue `item` behind the client's earlier items"""
+        queue = self._queues.get(client_id)
+        if queue is None:
+            queue = self._queues[client_id] = deque()
+            self._order.append(client_id)
+        queue.append(item)
+        self._size += 1
+
+    def pop(self) -> Optional[Any]:
+        """Take the next item from the next client in turn, or None if empty"""
+        if not self._order:
+            return None
+        client_id = self._order.popleft()
+        queue = self._queues[client_id]
+        item = queue.popleft()
+        if queue:
+            self._order.append(client_id)
+        else:
+            del self._queues[client_id]
+        self._size -= 1
+        return item
+
+    def remove(self, client_id: Hashable, item: Any) -> bool:
+        """Drop a queued item, returning whether it was still queued"""
+        queue = self._queues.get(client_id)
+        if queue is None or item not in queue:
+            return False
+        queue.remove(item)
+        if not queue:
+            del self._queues[client_id]
+            self._order.remove(client_id)
+        self._size -= 1
+        return True
+
+    def __len__(self) -> int:
+        return self._size
+
+
+class _Waiter:
+    """A queued request for an upstream slot"""
+
+    __slots__ = ("event", "granted")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.granted = False
+
+
+class RequestScheduler:
+    """
+    Bounds concurrent upstream requests and hands out free slots by priority
+
+    Queued interactive requests always go before queued bulk and background
+    ones, and background work may hold at most `background_slots` slots, so
+    an interactive call never waits behind a backlog of prefetches. Within a
+    priority class, slots go round-robin across clients.
+    """
+
+    def __init__(self, max_concurrent: int = 8, background_slots: Optional[int] = None):
+        """
+        Args:
+            max_concurrent: Maximum concurrent upstream requests
+            background_slots: Slots background work may hold at once (default: half)
+        """
+        self.max_concurrent = max_concurrent
+        self.background_slots = background_slots or max(1, max_concurrent // 2)
+        self.wait_times = {priority: Histogram() for priority in Priority}
+        self.latencies = {priority: Histogram() for priority in Priority}
+        self._active = 0
+        self._background_active = 0
+        self._waiting = {priority: RoundRobinQueue() for priority in Priority}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self):
+        """Hold one upstream slot at the current priority for the duration of the block"""
+        priority = current_priority()
+        started = time.monotonic()
+        self.acquire(priority)
+        self.wait_times[priority].observe(time.monotonic() - started)
+        try:
+            yield
+        finally:
+            self.release(priority)
+            self.latencies[priority].observe(time.monotonic() - started)
+
+    def _can_start(self, priority: Priority) -> bool:
+        if self._active >= self.max_concurrent:
+            return False
+        return priority != Priority.BACKGROUND or self._background_active < self.background_slots
+
+    def _start(self, priority: Priority) -> None:
+        self._active += 1
+        if priority == Priority.BACKGROUND:
+            self._background_active += 1
+
+    def _queued_ahead(self, priority: Priority) -> bool:
+        return any(len(self._waiting[other]) for other in Priority if other <= priority)
+
+    def acquire(self, priority: Optional[Priority] = None) -> None:
+        """Wait for a free slot; aborted if the current request is cancelled"""
+        priority = current_priority() if priority is None else priority
+        client_id = current_client()
+        with self._lock:
+            if self._can_start(priority) and not self._queued_ahead(priority):
+                self._start(priority)
+                return
+            waiter = _Waiter()
+            self._waiting[priority].push(client_id, waiter)
+
+        token = current_token()
+        remove_callback = token.add_callback(waiter.event.set) if token is not None else None
+        try:
+            waiter.event.wait()
+        finally:
+            if remove_callback is not None:
+                remove_callback()
+
+        if token is not None and token.cancelled:
+            with self._lock:
+                if not waiter.granted:
+                    self._waiting[priority].remove(client_id, waiter)
+            if waiter.granted:
+                # The slot was handed over while we were being cancelled
+                self.release(priority)
+            token.raise_if_cancelled()
+
+    def release(self, priority: Optional[Priority] = None) -> None:
+        """Free a slot and hand free slots to the highest-priority waiters"""
+        priority = current_priority() if priority is None else priority
+        with self._lock:
+            self._active -= 1
+            if priority == Priority.BACKGROUND:
+                self._background_active -= 1
+            for waiting_priority in Priority:
+                queue = self._waiting[waiting_priority]
+                while len(queue) and self._can_start(waiting_priority):
+                    waiter = queue.pop()
+                    self._start(waiting_priority)
+                    waiter.granted = True
+                    waiter.event.set()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-priority queue depth, slot wait and end-to-end latency"""
+        with self._lock:
+            queued = {priority: len(self._waiting[priority]) for priority in Priority}
+        return {
+            priority.name.lower(): {
+                "queued": queued[priority],
+                "wait": self.wait_times[priority].snapshot(),
+                "latency": self.latencies[priority].snapshot()
+            }
+            for priority in Priority
+        }
+
+
+class FairExecutor:
+    """Thread pool that runs queued work round-robin across clients"""
+
+    def __init__(self, max_workers: int = 8, thread_name_prefix: str = "fair-executor"):
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self._queue = RoundRobinQueue()
+        self._condition = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._idle = 0
+        self._shutdown = False
+
+    def submit(self, client_id: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        Queue `fn(*args, **kwargs)` on behalf of `client_id`
+
+        Returns:
+            Future for the call's result
+        """
+        future: Future = Future()
+        context = contextvars.copy_context()
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("cannot submit after shutdown")
+            self._queue.push(client_id, (future, context, fn, args, kwargs))
+            if self._idle == 0 and len(self._threads) < self.max_workers:
+                thread = threading.Thread(
+                    target=self._worker,
+                    name=f"{self.thread_name_prefix}_{len(self._threads)}",
+                    daemon=True
+                )
+                self._threads.append(thread)
+                thread.start()
+            else:
+                self._condition.notify()
+        return future
+
+    def _worker(self) -> None:
+        while True:
+            with self._condition:
+                self._idle += 1
+                while not len(self._queue) and not self._shutdown:
+                    self._condition.wait()
+                self._idle -= 1
+                work = self._queue.pop()
+                if work is None:
+                    return
+
+            future, context, fn, args, kwargs = work
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(context.run(fn, *args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting work; queued work still runs before the workers exit"""
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+        if wait:
+            for thread in list(self._threads):
+                thread.join()
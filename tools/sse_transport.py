@@ -0,0 +1,203 @@
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Union
+from urllib.parse import parse_qs, urlparse
+
+from .log_pipeline import event
+
+logger = logging.getLogger(__name__)
+
+# A JSON-RPC message, either already serialized or as a dict
+Message = Union[str, Dict[str, Any]]
+
+# dispatch(request, write, client_id): handle one JSON-RPC message, calling
+# write(response) (possibly later, from another thread) for each response
+Dispatch = Callable[[Dict[str, Any], Callable[[Message], None], str], None]
+
+
+class SSESession:
+    """One connected client: the queue of messages waiting to go out on its event stream"""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.messages: "queue.Queue[Optional[Message]]" = queue.Queue()
+        self.closed = False
+
+    def send(self, message: Optional[Message]) -> None:
+        """Queue a JSON-RPC message for the client"""
+        if message is not None and not self.closed:
+            self.messages.put(message)
+
+    def close(self) -> None:
+        """End the event stream"""
+        self.closed = True
+        self.messages.put(None)
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    """Threaded HTTP server listening on a Unix domain socket"""
+
+    address_family = socket.AF_UNIX
+    daemon_threads = True
+
+    def server_bind(self):
+        socketserver.TCPServer.server_bind(self)
+        self.server_name = "localhost"
+        self.server_port = 0
+
+
+class SSETransport:
+    """
+    Local HTTP transport with Server-Sent Events for many concurrent MCP clients
+
+    A client opens `GET /sse`; the first event on the stream names the
+    endpoint to `POST` its JSON-RPC messages to, and responses arrive as
+    `message` events on the same stream. Every session is served by the same
+    process, so clients share its RedditTools connection pool, cache and
+    rate limiter.
+    """
+
+    keepalive_interval = 15.0
+
+    def __init__(self, dispatch: Dispatch, host: str = "127.0.0.1", port: int = 8765,
+                 unix_socket: Optional[str] = None,
+                 on_disconnect: Optional[Callable[[str], None]] = None):
+        """
+        Args:
+            dispatch: Handler for incoming JSON-RPC messages
+            host: Loopback address to listen on
+            port: TCP port to listen on
+            unix_socket: Listen on this Unix socket path instead of TCP
+            on_disconnect: Called with the session id when a client goes away
+        """
+        self.dispatch = dispatch
+        self.on_disconnect = on_disconnect
+        self.sessions: Dict[str, SSESession] = {}
+        self._lock = threading.Lock()
+
+        handler = self._make_handler()
+        if unix_socket:
+            if os.path.exists(unix_socket):
+                os.unlink(unix_socket)
+            self.httpd = _UnixHTTPServer(unix_socket, handler)
+            self.address = unix_socket
+        else:
+            self.httpd = ThreadingHTTPServer((host, port), handler)
+            self.httpd.daemon_threads = True
+            self.address = f"http://{host}:{self.httpd.server_port}"
+
+    def serve_forever(self) -> None:
+        """Serve clients until shutdown() is called"""
+        logger.info("SSE transport listening on %s", self.address)
+        try:
+            self.httpd.serve_forever()
+        finally:
+            with self._lock:
+                sessions = list(self.sessions.values())
+            for session in sessions:
+                session.close()
+            self.httpd.server_close()
+            if isinstance(self.httpd, _UnixHTTPServer) and os.path.exists(self.address):
+                os.unlink(self.address)
+
+    def shutdown(self) -> None:
+        """Stop serving; safe to call from another thread"""
+        self.httpd.shutdown()
+
+    def _open_session(self) -> SSESession:
+        session = SSESession()
+        with self._lock:
+            self.sessions[session.id] = session
+        event(logger, "session", "Client connected: %s", session.id)
+        return session
+
+    def _close_session(self, session: SSESession) -> None:
+        with self._lock:
+            self.sessions.pop(session.id, None)
+        session.close()
+        event(logger, "session", "Client disconnected: %s", session.id)
+        if self.on_disconnect is not None:
+            self.on_disconnect(session.id)
+
+    def _make_handler(self):
+        transport = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def address_string(self):
+                # Unix socket peers have no address
+                return self.client_address[0] if self.client_address else "unix"
+
+            def log_message(self, format, *args):
+                logger.debug(format, *args)
+
+            def do_GET(self):
+                if urlparse(self.path).path != "/sse":
+                    self.send_error(404)
+                    return
+
+                session = transport._open_session()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "keep-alive")
+                self.end_headers()
+                try:
+                    self._send_event("endpoint", f"/messages?session_id={session.id}")
+                    while True:
+                        try:
+                            message = session.messages.get(timeout=transport.keepalive_interval)
+                        except queue.Empty:
+                            self.wfile.write(b": keepalive\n\n")
+                            self.wfile.flush()
+                            continue
+                        if message is None:
+                            break
+                        if not isinstance(message, str):
+                            message = json.dumps(message)
+                        self._send_event("message", message)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    transport._close_session(session)
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                session_id = parse_qs(url.query).get("session_id", [""])[0]
+                with transport._lock:
+                    session = transport.sessions.get(session_id)
+                # Read the body even when rejecting it, so a keep-alive
+                # connection is left at the start of the next request
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length)
+                if url.path != "/messages" or session is None:
+                    self.send_error(404, "Unknown session")
+                    return
+
+                try:
+                    message = json.loads(body)
+                except ValueError:
+                    self.send_error(400, "Parse error")
+                    return
+                if not isinstance(message, dict):
+                    self.send_error(400, "Invalid request")
+                    return
+
+                self.send_response(202)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                transport.dispatch(message, session.send, session.id)
+
+            def _send_event(self, event: str, data: str):
+                self.wfile.write(f"event: {event}\ndata: {data}\n\n".encode())
+                self.wfile.flush()
+
+        return Handler
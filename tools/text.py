@@ -0,0 +1,19 @@
+import re
+from typing import List
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9'+#-]{2,}")
+
+STOPWORDS = frozenset("""
+    the and for are but not you all any can had her was one our out has him his how its
+    may new now old see two way who did get got let say she too use that with have this
+    will your from they know want been good much some time very when come here just like
+    long make many more only over such take than them well were what into about after
+    again also because before being could does doing down each even ever every first
+    most other should since still their there these those through under until where
+    which while would why i'm it's don't can't you're what's anyone someone
+    """.split())
+
+
+def keywords(text: str) -> List[str]:
+    """Lowercased words of `text` worth counting, in order, stopwords removed"""
+    return [word for word in _WORD.findall(text.lower()) if word not in STOPWORDS]
@@ -0,0 +1,176 @@
+import bisect
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .post_store import PostStore
+
+Interval = Tuple[float, float]
+
+
+class TimeIndex:
+    """
+    Posts of one subreddit ordered by `created_utc`, with known coverage
+
+    Posts are kept in a PostStore and indexed by creation time in two
+    parallel sorted lists, so range queries are two bisects. Alongside
+    the posts the index records which time intervals it holds completely:
+    a page of the `new` listing proves every post between its oldest entry
+    and the post it was paged after (or the fetch time, for the head of the
+    listing) is present. Range queries then only need upstream for the
+    gaps between those intervals.
+    """
+
+    def __init__(self, subreddit: str, max_posts: int = 100_000):
+        """
+        Args:
+            subreddit: Name of the subreddit
+            max_posts: Posts kept; past this the oldest half is dropped
+        """
+        self.subreddit = subreddit
+        self.max_posts = max_posts
+        self.store = PostStore()
+        self._times: List[float] = []
+        self._rows: List[int] = []
+        # Sorted, non-overlapping intervals known to be complete
+        self.covered: List[List[float]] = []
+        # The `new` listing ended here: nothing older can be fetched
+        self.floor: Optional[float] = None
+        self.lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._times)
+
+    def add(self, fields: Dict[str, Any]) -> None:
+        """Insert one post (or refresh its score and comment count)"""
+        with self.lock:
+            known = self.store.row_of(fields["id"]) is not None
+            row = self.store.add(fields)
+            if not known:
+                created = float(fields["created_utc"] or 0)
+                position = bisect.bisect_right(self._times, created)
+                self._times.insert(position, created)
+                self._rows.insert(position, row)
+
+    def add_page(self, posts: List[Dict[str, Any]], after: Optional[str],
+                 next_after: Optional[str], fetched_at: float) -> None:
+        """
+        Insert one page of the `new` listing and record what it covers
+
+        Args:
+            posts: Post fields, newest first
+            after: Token the page was requested after (None: head of the listing)
+            next_after: Token the listing returned for the next page
+            fetched_at: UTC time of the fetch
+        """
+        with self.lock:
+            newest = fetched_at
+            if after:
+                row = self.store.row_of(after.split("_", 1)[-1])
+                newest = float(self.store.created_utc[row]) if row is not None else None
+            for fields in posts:
+                self.add(fields)
+            if posts:
+                oldest = min(float(fields["created_utc"] or 0) for fields in posts)
+                if newest is None:
+                    newest = max(float(fields["created_utc"] or 0) for fields in posts)
+                self.mark_covered(oldest, newest)
+            if not next_after:
+                oldest = min((float(fields["created_utc"] or 0) for fields in posts), default=newest)
+                if oldest is not None:
+                    self.floor = oldest
+            self._trim()
+
+    def mark_covered(self, start: float, end: float) -> None:
+        """Record that every post created in [start, end] is in the index"""
+        with self.lock:
+            merged = [start, end]
+            kept = []
+            for interval in self.covered:
+                if interval[1] < merged[0] or interval[0] > merged[1]:
+                    kept.append(interval)
+                else:
+                    merged = [min(merged[0], interval[0]), max(merged[1], interval[1])]
+            kept.append(merged)
+            kept.sort()
+            self.covered = kept
+
+    def gaps(self, start: float, end: float) -> List[Interval]:
+        """Parts of [start, end] not known to be complete, newest first"""
+        with self.lock:
+            if self.floor is not None:
+                start = max(start, self.floor)
+            gaps = []
+            cursor = start
+            for low, high in self.covered:
+                if high < cursor:
+                    continue
+                if low > end:
+                    break
+                if low > cursor:
+                    gaps.append((cursor, low))
+                cursor = max(cursor, high)
+            if cursor < end:
+                gaps.append((cursor, end))
+            return gaps[::-1]
+
+    def anchor(self, at: float) -> Optional[str]:
+        """
+        Fullname of the oldest post created at or after `at`
+
+        Paging the `new` listing after it continues just past `at`; None
+        means the listing has to be read from the head.
+        """
+        with self.lock:
+            position = bisect.bisect_left(self._times, at)
+            if position == len(self._times):
+                return None
+            return f"t3_{self.store.to_dict(self._rows[position])['id']}"
+
+    def range(self, start: float, end: float, limit: Optional[int] = None) -> np.ndarray:
+        """Rows of posts created in [start, end], newest first"""
+        with self.lock:
+            low = bisect.bisect_left(self._times, start)
+            high = bisect.bisect_right(self._times, end)
+            rows = self._rows[low:high][::-1]
+            if limit is not None:
+                rows = rows[:limit]
+            return np.asarray(rows, dtype=np.int64)
+
+    def _trim(self) -> None:
+        """Drop the oldest half of the posts once the index is full"""
+        if len(self._times) <= self.max_posts:
+            return
+        keep = self.max_posts // 2
+        cutoff = self._times[-keep]
+        store = PostStore(capacity=keep)
+        rows = store.add_many(self.store.to_dicts(self._rows[-keep:]))
+        self.store = store
+        self._times = self._times[-keep:]
+        self._rows = [int(row) for row in rows]
+        self.covered = [[max(low, cutoff), high] for low, high in self.covered if high >= cutoff]
+        self.floor = None
+
+
+class TimeIndexes:
+    """Time indexes for the most recently used subreddits"""
+
+    def __init__(self, max_indexes: int = 64, max_posts: int = 100_000):
+        self.max_indexes = max_indexes
+        self.max_posts = max_posts
+        self._indexes: "OrderedDict[str, TimeIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def index(self, subreddit: str) -> TimeIndex:
+        """Return the index for `subreddit`, creating it if needed"""
+        key = subreddit.lower()
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None:
+                index = self._indexes[key] = TimeIndex(subreddit, self.max_posts)
+                while len(self._indexes) > self.max_indexes:
+                    self._indexes.popitem(last=False)
+            self._indexes.move_to_end(key)
+            return index
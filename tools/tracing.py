@@ -0,0 +1,262 @@
+import contextvars
+import itertools
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _Trace:
+    """The spans of one sampled root span and everything under it"""
+
+    __slots__ = ("trace_id", "spans", "done", "exported")
+
+    def __init__(self, trace_id: int):
+        self.trace_id = trace_id
+        self.spans: List["Span"] = []
+        self.done = False
+        self.exported = False
+
+
+class Span:
+    """A timed, named step of a request, with attributes"""
+
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start", "duration", "thread", "attrs")
+
+    def __init__(self, trace: _Trace, span_id: int, parent_id: Optional[int], name: str,
+                 attrs: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.attrs = attrs
+        self.thread = threading.get_native_id()
+        self.start = time.time()
+        self.duration = 0.0
+
+    def set(self, **attrs) -> None:
+        """Add attributes, e.g. ones only known once the step is done"""
+        self.attrs.update(attrs)
+
+
+class _NullSpan:
+    """Stands in for a span that isn't recorded; also its own context manager"""
+
+    def set(self, **attrs) -> None:
+        pass
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+# Current span, or _NULL_SPAN inside a root that wasn't sampled
+_current_span: contextvars.ContextVar[Any] = contextvars.ContextVar("reddit_span", default=None)
+
+
+class _SpanScope:
+    def __init__(self, tracer: "Tracer", name: str, attrs: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self) -> Any:
+        parent = _current_span.get()
+        if parent is _NULL_SPAN:
+            self.span = None
+            return _NULL_SPAN
+        if parent is None:
+            if random.random() >= self.tracer.sample_rate:
+                # Children of an unsampled root are skipped without a dice roll
+                self.span = None
+                self.reset = _current_span.set(_NULL_SPAN)
+                return _NULL_SPAN
+            trace = _Trace(self.tracer.next_id())
+            parent_id = None
+        else:
+            trace = parent.trace
+            parent_id = parent.span_id
+        self.span = Span(trace, self.tracer.next_id(), parent_id, self.name, self.attrs)
+        self.started = time.perf_counter()
+        self.reset = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self.span is None:
+            if hasattr(self, "reset"):
+                _current_span.reset(self.reset)
+            return
+        _current_span.reset(self.reset)
+        span = self.span
+        span.duration = time.perf_counter() - self.started
+        if exc_type is not None:
+            span.attrs["error"] = exc_type.__name__
+        self.tracer._finish(span)
+
+
+class Tracer:
+    """
+    Records spans of sampled requests and writes them to a file
+
+    A span opened with no span around it is a root; `sample_rate` of roots
+    are traced, along with every span opened under them in the same
+    context (including background work and hedges, which copy it). A trace
+    is written when its root ends, and only if the root took at least
+    `min_duration` seconds, so slow requests can be kept and fast ones
+    dropped. Writing happens on a background thread.
+
+    The file is JSON lines, one span per line, or with format="chrome" the
+    Trace Event format read by chrome://tracing and Perfetto.
+    """
+
+    def __init__(self, path: str, sample_rate: float = 1.0, min_duration: float = 0.0,
+                 format: str = "jsonl"):
+        """
+        Args:
+            path: File to append spans to
+            sample_rate: Share of root spans traced, 0 to 1
+            min_duration: Only write traces whose root took at least this many seconds
+            format: "jsonl" or "chrome"
+        """
+        if format not in ("jsonl", "chrome"):
+            raise ValueError(f"Unknown trace format: {format}")
+        self.path = path
+        self.sample_rate = sample_rate
+        self.min_duration = min_duration
+        self.format = format
+        self.traces_written = 0
+        self.traces_dropped = 0
+        self._ids = itertools.count(1)
+        self._pid = os.getpid()
+        self._queue: "queue.SimpleQueue[Optional[List[Span]]]" = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._write_loop, name="trace-writer", daemon=True)
+        self._writer.start()
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def span(self, name: str, **attrs) -> _SpanScope:
+        """Context manager timing the block as a span; yields it so attributes can be added"""
+        return _SpanScope(self, name, attrs)
+
+    def _finish(self, span: Span) -> None:
+        trace = span.trace
+        if span.parent_id is not None:
+            if trace.done:
+                # Outlived its root (background work): follows the root's fate
+                if trace.exported:
+                    self._queue.put([span])
+            else:
+                trace.spans.append(span)
+            return
+        trace.done = True
+        if span.duration < self.min_duration:
+            self.traces_dropped += 1
+            return
+        trace.exported = True
+        self.traces_written += 1
+        self._queue.put(trace.spans + [span])
+
+    def _record(self, span: Span) -> Dict[str, Any]:
+        if self.format == "chrome":
+            return {
+                "name": span.name,
+                "cat": "reddit",
+                "ph": "X",
+                "ts": span.start * 1e6,
+                "dur": span.duration * 1e6,
+                "pid": self._pid,
+                "tid": span.thread,
+                "args": {"trace_id": span.trace.trace_id, "span_id": span.span_id,
+                         "parent_id": span.parent_id, **span.attrs}
+            }
+        return {
+            "trace_id": span.trace.trace_id,
+            "span_id": span.span_id,
+            "parent_id": span.parent_id,
+            "name": span.name,
+            "start": span.start,
+            "duration_ms": round(span.duration * 1000, 3),
+            "thread": span.thread,
+            "attrs": span.attrs
+        }
+
+    def _write_loop(self) -> None:
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        with open(self.path, "a") as f:
+            if self.format == "chrome" and new_file:
+                # Viewers accept the array without its closing bracket, so
+                # events can be appended as they come
+                f.write("[\n")
+            while True:
+                spans = self._queue.get()
+                if spans is None:
+                    break
+                try:
+                    for span in spans:
+                        line = json.dumps(self._record(span), default=str)
+                        f.write(line + (",\n" if self.format == "chrome" else "\n"))
+                    if self._queue.empty():
+                        f.flush()
+                except Exception as e:
+                    logger.warning("Cannot write trace: %s", e)
+
+    def close(self) -> None:
+        """Write out pending spans and stop the writer"""
+        self._queue.put(None)
+        self._writer.join(timeout=5)
+
+
+_tracer: Optional[Tracer] = None
+
+
+def configure(path: str, sample_rate: float = 1.0, min_duration: float = 0.0,
+              format: Optional[str] = None) -> Tracer:
+    """
+    Start tracing to `path` for the whole process
+
+    Args:
+        path: File to append spans to
+        sample_rate: Share of requests traced, 0 to 1
+        min_duration: Only write requests taking at least this many seconds
+        format: "jsonl" or "chrome" (default: chrome for a .json path, else jsonl)
+
+    Returns:
+        The process-wide Tracer
+    """
+    global _tracer
+    if format is None:
+        format = "chrome" if path.endswith(".json") else "jsonl"
+    if _tracer is not None:
+        _tracer.close()
+    _tracer = Tracer(path, sample_rate, min_duration, format)
+    return _tracer
+
+
+def span(name: str, **attrs) -> Any:
+    """
+    Time the block as a span of the current trace
+
+    With tracing off this returns a shared no-op, so call sites cost a
+    global lookup and a function call.
+    """
+    if _tracer is None:
+        return _NULL_SPAN
+    return _tracer.span(name, **attrs)
+
+
+def shutdown() -> None:
+    """Stop tracing, writing out pending spans"""
+    global _tracer
+    if _tracer is not None:
+        _tracer.close()
+        _tracer = None
@@ -0,0 +1,174 @@
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+from .text import keywords
+
+_PRIME = (1 << 31) - 1
+
+
+class TrendingTerm(BaseModel):
+    """A term whose rate of appearance has gone up"""
+    term: str
+    recent_count: int
+    baseline_count: int
+    lift: float
+
+
+class RisingTerms(BaseModel):
+    """Terms appearing in more posts recently than in the preceding period"""
+    terms: List[TrendingTerm]
+    hours: float
+    baseline_hours: float
+    posts_seen: int
+
+
+class TrendTracker:
+    """
+    Streaming counts of title terms per time bucket, in constant memory
+
+    Each bucket (an hour by default) of a fixed ring has a count-min sketch
+    of how many posts each term appeared in, plus a bounded set of its
+    heaviest terms. Posts are bucketed by creation time and counted once
+    however often they are polled. Sketches add up, so the counts for any
+    run of buckets come from one summed table.
+    """
+
+    def __init__(self, bucket_seconds: float = 3600, num_buckets: int = 168,
+                 width: int = 2048, depth: int = 4, heavy_hitters: int = 200,
+                 remember_posts: int = 100_000):
+        """
+        Args:
+            bucket_seconds: Length of one time bucket
+            num_buckets: Buckets kept; older posts are ignored
+            width: Counters per sketch row
+            depth: Sketch rows (independent hashes)
+            heavy_hitters: Candidate terms tracked per bucket
+            remember_posts: Recent post ids remembered to avoid counting a post twice
+        """
+        self.bucket_seconds = bucket_seconds
+        self.num_buckets = num_buckets
+        self.width = width
+        self.depth = depth
+        self.heavy_hitters = heavy_hitters
+        self.remember_posts = remember_posts
+        self.posts_seen = 0
+        rng = np.random.default_rng(0)
+        self._a = rng.integers(1, _PRIME, size=(depth, 1), dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=(depth, 1), dtype=np.uint64)
+        self._tables = np.zeros((num_buckets, depth, width), dtype=np.int32)
+        self._bucket_ids = np.full(num_buckets, -1, dtype=np.int64)
+        self._candidates: List[Dict[str, int]] = [{} for _ in range(num_buckets)]
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _columns(self, terms: List[str]) -> np.ndarray:
+        """Sketch column of each term in each row, shape (depth, len(terms))"""
+        hashes = np.fromiter((zlib.crc32(term.encode()) for term in terms), dtype=np.uint64, count=len(terms))
+        return ((self._a * (hashes % _PRIME)[None, :] + self._b) % _PRIME) % self.width
+
+    def _estimate(self, table: np.ndarray, terms: List[str]) -> np.ndarray:
+        columns = self._columns(terms)
+        return table[np.arange(self.depth)[:, None], columns].min(axis=0)
+
+    def _slot(self, bucket: int) -> Optional[int]:
+        """Ring slot for an absolute bucket number, recycling it if needed"""
+        slot = bucket % self.num_buckets
+        held = self._bucket_ids[slot]
+        if held == bucket:
+            return slot
+        if held > bucket or bucket <= self._bucket_ids.max() - self.num_buckets:
+            return None
+        self._tables[slot] = 0
+        self._candidates[slot] = {}
+        self._bucket_ids[slot] = bucket
+        return slot
+
+    def add_posts(self, posts: Iterable[Dict[str, Any]]) -> None:
+        """
+        Count the title terms of posts not seen before
+
+        Args:
+            posts: Post fields (id, title, created_utc) as stored by RedditTools
+        """
+        by_bucket: Dict[int, List[str]] = {}
+        with self._lock:
+            for post in posts:
+                if post["id"] in self._seen:
+                    continue
+                self._seen[post["id"]] = None
+                if len(self._seen) > self.remember_posts:
+                    self._seen.popitem(last=False)
+                self.posts_seen += 1
+                bucket = int(float(post["created_utc"] or 0) // self.bucket_seconds)
+                # A term counts once per post
+                by_bucket.setdefault(bucket, []).extend(set(keywords(post["title"])))
+
+            for bucket, terms in by_bucket.items():
+                slot = self._slot(bucket)
+                if slot is None or not terms:
+                    continue
+                table = self._tables[slot]
+                columns = self._columns(terms)
+                for row in range(self.depth):
+                    np.add.at(table[row], columns[row], 1)
+                self._update_candidates(slot, sorted(set(terms)))
+
+    def _update_candidates(self, slot: int, terms: List[str]) -> None:
+        """Keep the bucket's heaviest terms, judged by their sketch estimates"""
+        candidates = self._candidates[slot]
+        for term, count in zip(terms, self._estimate(self._tables[slot], terms)):
+            candidates[term] = int(count)
+        if len(candidates) > self.heavy_hitters:
+            kept = sorted(candidates.items(), key=lambda item: -item[1])[:self.heavy_hitters]
+            self._candidates[slot] = dict(kept)
+
+    def rising_terms(self, hours: float = 6, baseline_hours: float = 48, top_n: int = 20,
+                     min_count: int = 3, now: Optional[float] = None) -> RisingTerms:
+        """
+        Terms rising in the last `hours` compared with the `baseline_hours` before
+
+        Args:
+            hours: Length of the recent period
+            baseline_hours: Length of the period it is compared with
+            top_n: Number of terms to return
+            min_count: Minimum posts a term must appear in recently
+            now: Current UTC timestamp (default: the clock)
+
+        Returns:
+            RisingTerms ordered by lift: recent posts per hour over baseline
+            posts per hour, smoothed by one occurrence over the baseline
+        """
+        now = time.time() if now is None else now
+        current = int(now // self.bucket_seconds)
+        recent_buckets = max(1, round(hours * 3600 / self.bucket_seconds))
+        baseline_buckets = max(1, round(baseline_hours * 3600 / self.bucket_seconds))
+
+        with self._lock:
+            ids = self._bucket_ids
+            recent = (ids > current - recent_buckets) & (ids <= current)
+            baseline = (ids > current - recent_buckets - baseline_buckets) & (ids <= current - recent_buckets)
+            terms = sorted(set().union(*(self._candidates[slot] for slot in np.flatnonzero(recent))))
+            if not terms:
+                return RisingTerms(terms=[], hours=hours, baseline_hours=baseline_hours,
+                                   posts_seen=self.posts_seen)
+            recent_counts = self._estimate(self._tables[recent].sum(axis=0), terms)
+            baseline_counts = self._estimate(self._tables[baseline].sum(axis=0), terms)
+
+        recent_rate = recent_counts / (recent_buckets * self.bucket_seconds / 3600)
+        baseline_span = baseline_buckets * self.bucket_seconds / 3600
+        lift = recent_rate / ((baseline_counts + 1) / baseline_span)
+        order = [i for i in np.argsort(-lift, kind="stable") if recent_counts[i] >= min_count][:top_n]
+        return RisingTerms(
+            terms=[TrendingTerm(term=terms[i], recent_count=int(recent_counts[i]),
+                                baseline_count=int(baseline_counts[i]), lift=round(float(lift[i]), 3))
+                   for i in order],
+            hours=hours,
+            baseline_hours=baseline_hours,
+            posts_seen=self.posts_seen
+        )
@@ -0,0 +1,128 @@
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from .log_pipeline import event
+from .reddit_tools import RedditTools
+from .refresh import RefreshScheduler
+from .scheduling import Priority, client_scope, priority_scope
+
+logger = logging.getLogger(__name__)
+
+
+class WatchListing(BaseModel):
+    """A listing to keep warm; r/all when no subreddit is given"""
+    subreddit: Optional[str] = None
+    sort: str = "hot"
+    time: str = "day"
+    limit: int = 25
+
+
+class WatchSearch(BaseModel):
+    """A search to keep warm"""
+    query: str
+    subreddit: Optional[str] = None
+    sort: str = "relevance"
+    time: str = "all"
+    limit: int = 25
+
+
+class Watchlist(BaseModel):
+    """
+    What to pre-fetch at startup and keep refreshed
+
+    Defaults match the MCP tools' defaults, so warmed entries are the ones
+    a plain tool call looks up. Subreddits under `monitor` have their `new`
+    listing refreshed as often as their post rate calls for, rather than
+    on the fixed interval (see RefreshScheduler).
+    """
+    refresh_interval: float = 300.0
+    listings: List[WatchListing] = []
+    searches: List[WatchSearch] = []
+    about: List[str] = []
+    monitor: List[str] = []
+    target_delay: float = 300.0
+    monitor_requests_per_minute: float = 20.0
+
+    @classmethod
+    def load(cls, path: str) -> "Watchlist":
+        """Read a watchlist from a JSON file"""
+        with open(path) as f:
+            return cls.model_validate_json(f.read())
+
+
+class CacheWarmer:
+    """
+    Keeps a watchlist's results in the RedditTools cache
+
+    Every `refresh_interval` seconds each entry is refetched at background
+    priority, as its own client of the fair scheduler, through the shared
+    rate limiter. Results are cached for twice the interval, so a slow or
+    failed round never leaves them expired.
+    """
+
+    def __init__(self, tools: RedditTools, watchlist: Watchlist):
+        self.tools = tools
+        self.watchlist = watchlist
+        self.rounds = 0
+        self.failures = 0
+        self.scheduler: Optional[RefreshScheduler] = None
+        self._stop = threading.Event()
+
+    def _entries(self) -> List[Callable[[], object]]:
+        tools = self.tools
+        entries: List[Callable[[], object]] = []
+        for listing in self.watchlist.listings:
+            if listing.subreddit:
+                entries.append(lambda l=listing: tools.get_reddit_post(l.subreddit, l.sort, l.limit, l.time))
+            else:
+                entries.append(lambda l=listing: tools.get_all_post(l.sort, l.limit, l.time))
+        for search in self.watchlist.searches:
+            entries.append(lambda s=search: tools.search_post(s.query, s.subreddit, s.sort, s.limit, s.time))
+        for subreddit in self.watchlist.about:
+            entries.append(lambda name=subreddit: tools.get_subreddit_about(name))
+        return entries
+
+    def warm_once(self) -> Dict[str, int]:
+        """Fetch every watchlist entry once, returning how many succeeded and failed"""
+        done = failed = 0
+        ttl = self.watchlist.refresh_interval * 2
+        # Internal calls: warmed listings don't set off comment prefetch
+        with client_scope("cache-warmer"), priority_scope(Priority.BACKGROUND), \
+                self.tools.reloading(ttl), self.tools.models_only():
+            for entry in self._entries():
+                if self._stop.is_set():
+                    break
+                try:
+                    entry()
+                    done += 1
+                except Exception as e:
+                    failed += 1
+                    event(logger, "warming", "Cache warming failed: %s", e, level=logging.WARNING)
+        self.rounds += 1
+        self.failures += failed
+        return {"warmed": done, "failed": failed}
+
+    def run(self) -> None:
+        """Warm now and then on every refresh interval until stop() is called"""
+        if self.watchlist.monitor and self.scheduler is None:
+            self.scheduler = RefreshScheduler(self.tools, self.watchlist.monitor, self.watchlist.target_delay,
+                                              self.watchlist.monitor_requests_per_minute)
+            self.scheduler.start()
+        while not self._stop.is_set():
+            result = self.warm_once()
+            event(logger, "warming", "Cache warming round %d: %s", self.rounds, result, **result)
+            self._stop.wait(self.watchlist.refresh_interval)
+
+    def start(self) -> threading.Thread:
+        """Run in a daemon thread"""
+        thread = threading.Thread(target=self.run, name="cache-warmer", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self.scheduler is not None:
+            self.scheduler.stop()